@@ -0,0 +1,202 @@
+"""
+CSW Savings Calculator - JSON HTTP API
+Serves the calculation engine to other tools (CRM, quoting) over HTTP
+
+Usage:
+    python api.py --port 8000 --workers 4
+    uvicorn api:app --port 8000
+
+Endpoints:
+    GET  /health                           liveness check
+    GET  /metrics                          Prometheus text (stage timings with CSW_METRICS=1)
+    GET  /weather?city=...&state=...       weather station and degree days
+    GET  /weather/search?q=...&state=...   station name suggestions
+    POST /calculate                        one building
+    POST /calculate/bulk                   {"buildings": [...]}, up to MAX_BULK
+
+Buildings are JSON objects with building_type plus the app's input fields.
+The location comes from hdd/cdd, latitude/longitude, or city (and state).
+Inputs are checked against the same ranges and option rules as the wizard;
+problems come back as 422 with a list of errors. Coefficient tables and the
+weather store load once per worker process at startup.
+"""
+
+import argparse
+import json
+from contextlib import asynccontextmanager
+
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from csw_engine import (
+    CoefficientNotFoundError,
+    InputValidationError,
+    METRICS,
+    ResultCache,
+    caches_to_prometheus,
+    calculate_savings,
+    calculate_savings_batch,
+    get_regression_index,
+    get_savings_lookup,
+    get_station_locator,
+    get_weather_store,
+    result_cache_key,
+    validate_inputs,
+)
+
+MAX_BULK = 10000
+RESULT_CACHE = ResultCache()
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def _clean(value):
+    """NaN as null; JSON has no NaN"""
+    return None if isinstance(value, float) and value != value else value
+
+def error_response(status, errors):
+    return JSONResponse({'errors': errors}, status_code=status)
+
+async def read_json(request):
+    """Request body as a JSON object, or None when it isn't one"""
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    return body if isinstance(body, dict) else None
+
+def calculate_one(building):
+    """(inputs, results) for one building dict; raises engine errors"""
+    building_type = building.get('building_type')
+    inputs = validate_inputs(building, building_type)
+    results = RESULT_CACHE.get_or_compute(
+        result_cache_key(inputs, building_type),
+        lambda: calculate_savings(inputs, building_type)
+    )
+    return inputs, {key: _clean(value) for key, value in results.items()}
+
+def calculate_bulk(buildings):
+    """One {'results'} or {'errors'} item per building, in order"""
+    items = [None] * len(buildings)
+    valid = []
+    for i, building in enumerate(buildings):
+        if not isinstance(building, dict):
+            items[i] = {'errors': ['building: must be an object']}
+            continue
+        try:
+            inputs = validate_inputs(building, building.get('building_type'))
+        except InputValidationError as exc:
+            items[i] = {'errors': exc.errors}
+            continue
+        valid.append((i, {**inputs, 'building_type': building['building_type']}))
+
+    if valid:
+        frame = pd.DataFrame([inputs for _, inputs in valid])
+        results = calculate_savings_batch(frame, errors='coerce')
+        columns = list(results.columns)
+        for (i, _), row in zip(valid, results.to_numpy().tolist()):
+            record = {column: _clean(value) for column, value in zip(columns, row)}
+            if record['total_cost_savings'] is None:
+                items[i] = {'errors': ['configuration: no regression coefficients for these inputs']}
+            else:
+                items[i] = {'results': record}
+    return items
+
+# ============================================================================
+# ENDPOINTS
+# ============================================================================
+
+async def health(request):
+    return JSONResponse({'status': 'ok', 'stations': len(get_weather_store())})
+
+async def metrics(request):
+    text = METRICS.to_prometheus() + caches_to_prometheus({'results': RESULT_CACHE.stats()})
+    return PlainTextResponse(text, media_type='text/plain; version=0.0.4')
+
+async def weather(request):
+    city = request.query_params.get('city')
+    if not city:
+        return error_response(400, ['city: required'])
+    station = get_weather_store().lookup(city, request.query_params.get('state'))
+    if station is None:
+        return error_response(404, [f"city: no weather station found for {city!r}"])
+    return JSONResponse({
+        'state': station['State'],
+        'city': station['City'],
+        'hdd': float(station['HDD']),
+        'cdd': float(station['CDD']),
+    })
+
+async def weather_search(request):
+    query = request.query_params.get('q', '')
+    matches = get_weather_store().search(query, request.query_params.get('state'))
+    return JSONResponse({'stations': [{'state': state, 'city': city} for state, city in matches]})
+
+async def calculate(request):
+    building = await read_json(request)
+    if building is None:
+        return error_response(400, ['body: must be a JSON object'])
+    try:
+        inputs, results = calculate_one(building)
+    except InputValidationError as exc:
+        return error_response(422, exc.errors)
+    except CoefficientNotFoundError as exc:
+        return error_response(422, [f"configuration: {exc}"])
+    return JSONResponse({'building_type': building['building_type'], 'inputs': inputs, 'results': results})
+
+async def calculate_many(request):
+    body = await read_json(request)
+    buildings = body.get('buildings') if body is not None else None
+    if not isinstance(buildings, list):
+        return error_response(400, ['buildings: must be a list of building objects'])
+    if len(buildings) > MAX_BULK:
+        return error_response(413, [f"buildings: at most {MAX_BULK:,} per request"])
+    # Large batches run off the event loop so single requests keep flowing
+    items = await run_in_threadpool(calculate_bulk, buildings)
+    return JSONResponse({'results': items})
+
+# ============================================================================
+# APPLICATION
+# ============================================================================
+
+@asynccontextmanager
+async def lifespan(app):
+    """Load coefficients and weather data once, before the first request"""
+    get_regression_index()
+    get_savings_lookup()
+    get_weather_store()
+    get_station_locator()
+    yield
+
+app = Starlette(
+    routes=[
+        Route('/health', health),
+        Route('/metrics', metrics),
+        Route('/weather', weather),
+        Route('/weather/search', weather_search),
+        Route('/calculate', calculate, methods=['POST']),
+        Route('/calculate/bulk', calculate_many, methods=['POST']),
+    ],
+    lifespan=lifespan,
+)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the CSW savings calculator as a JSON API.')
+    parser.add_argument('--host', default='127.0.0.1', help='Bind address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='Port (default: 8000)')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes (default: 1)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    import uvicorn
+
+    args = parse_args(argv)
+    uvicorn.run('api:app', host=args.host, port=args.port, workers=args.workers,
+                log_level='warning', access_log=False)
+
+if __name__ == '__main__':
+    main()
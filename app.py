@@ -5,9 +5,37 @@ Uses merged regression_coefficients.csv with both building types
 """
 
 import streamlit as st
-import pandas as pd
 import os
-import plotly.graph_objects as go
+import threading
+from time import perf_counter
+
+# Only the engine's light modules are imported here. pandas, plotly and the
+# calculation modules are imported by the steps and functions that use them,
+# so the first page renders without them on a cold start.
+from csw_engine import (
+    OFFICE_HVAC_SYSTEMS,
+    HOTEL_HVAC_SYSTEMS,
+    COOLING_OPTIONS,
+    WINDOW_TYPES,
+    BUILDING_AREA_RANGES,
+    NUM_FLOORS_RANGE,
+    MAX_CSW_AREA_FRACTION,
+    ELECTRIC_RATE_RANGE,
+    GAS_RATE_RANGE,
+    OPERATING_HOURS_RANGE,
+    OCCUPANCY_RANGE,
+    available_csw_types,
+    available_heating_fuels,
+    DataFileError,
+    CoefficientNotFoundError,
+    TariffError,
+    METRICS,
+    INSTRUMENTED,
+    enable_metrics,
+    disable_metrics,
+    stage_timer,
+    caches_to_prometheus,
+)
 
 # ============================================================================
 # CONFIGURATION
@@ -23,490 +51,598 @@ if 'step' not in st.session_state:
     st.session_state.step = 0  # Start at building type selection
 
 # ============================================================================
-# DATA: HVAC AND INPUT OPTIONS
+# LOAD DATA
 # ============================================================================
+# Nothing loads at import: weather data on the location step, regression
+# data on the results page, each once per process.
 
-# Office HVAC Systems
-OFFICE_HVAC_SYSTEMS = [
-    'Packaged VAV with electric reheat',
-    'Packaged VAV with hydronic reheat',
-    'Built-up VAV with hydronic reheat',
-    'Other'
-]
-
-# Hotel HVAC Systems
-HOTEL_HVAC_SYSTEMS = [
-    'PTAC',
-    'PTHP',
-    'Fan Coil Unit',
-    'Other'
-]
-
-HEATING_FUELS = ['Electric', 'Natural Gas', 'None']
-COOLING_OPTIONS = ['Yes', 'No']
-WINDOW_TYPES = ['Single pane', 'Double pane']
-CSW_TYPES = ['Winsert Lite', 'Winsert Plus']
-CSW_TYPE_MAPPING = {'Winsert Lite': 'Single', 'Winsert Plus': 'Double'}
-
-# Cooling adjustment polynomial coefficients for Office
-COOLING_MULT_COEFFICIENTS_OFFICE = {
-    'Mid': {'a': 0.6972151451662, 'b': -0.0001078176371, 'c': 3.60507e-8, 'd': -6.4e-12},
-    'Large': {'a': 0.779295373677, 'b': 0.000049630331, 'c': -2.8839e-8, 'd': 1e-12}
-}
+@st.cache_resource
+def load_shared_store(namespace):
+    """Host-wide store for namespace (see CSW_CACHE), or None to keep results per process"""
+    from csw_engine import shared_store
+    return shared_store(namespace)
 
-# ============================================================================
-# LOAD DATA FROM CSV FILES
-# ============================================================================
+def shared(namespace, key, compute):
+    """compute() through the host-wide store, so other replicas and restarts reuse it"""
+    store = load_shared_store(namespace)
+    return compute() if store is None else store.get_or_compute(key, compute)
 
 @st.cache_data
 def load_weather_data():
-    """Load weather data from CSV file"""
+    """Load weather data as {state: {city: {'HDD', 'CDD'}}}"""
+    from csw_engine import data as engine_data
     try:
-        df = pd.read_csv('weather_information.csv')
-        df['State'] = df['State'].replace('Aklaska', 'Alaska')
-        
-        weather_dict = {}
-        for _, row in df.iterrows():
-            state = row['State']
-            city = row['Cities']
-            hdd = row['Heating Degree Days (HDD)']
-            cdd = row['Cooling Degree Days (CDD)']
-            
-            if state not in weather_dict:
-                weather_dict[state] = {}
-            
-            weather_dict[state][city] = {'HDD': hdd, 'CDD': cdd}
-        
-        return weather_dict
-    except FileNotFoundError:
+        return shared('dataset', 'weather_by_state', engine_data.load_weather_data)
+    except DataFileError:
         st.error("⚠️ Weather data file not found")
         return {}
 
 @st.cache_data
 def load_regression_coefficients():
-    """Load merged regression coefficients from CSV (Office + Hotel)"""
+    """Load merged regression coefficients (Office + Hotel)"""
+    import pandas as pd
+    from csw_engine import data as engine_data
     try:
-        # CRITICAL: keep_default_na=False prevents pandas from converting 'N/A' string to NaN
-        df = pd.read_csv('regression_coefficients.csv', keep_default_na=False, na_values=[''])
-        return df
-    except FileNotFoundError:
+        return shared('dataset', 'regression_coefficients', engine_data.load_regression_coefficients)
+    except DataFileError:
         st.error("⚠️ Regression coefficients file not found")
         return pd.DataFrame()
 
-# Load data
-WEATHER_DATA_BY_STATE = load_weather_data()
-REGRESSION_COEFFICIENTS = load_regression_coefficients()
+@st.cache_resource
+def load_regression_index():
+    """Compile the regression table into a hashed lookup index once per process"""
+    from csw_engine import RegressionIndex
+    return RegressionIndex(load_regression_coefficients())
+
+@st.cache_resource
+def load_savings_cube():
+    """Memory-map the precomputed savings cube, or None if it has not been built"""
+    from csw_engine import get_savings_cube
+    try:
+        return get_savings_cube()
+    except DataFileError:
+        return None
+
+@st.cache_resource
+def load_tariffs():
+    """Tariffs from the tariffs/ directory, compiled once per process"""
+    from csw_engine import get_tariffs
+    try:
+        return get_tariffs()
+    except TariffError as exc:
+        st.error(f"⚠️ {exc}")
+        return {}
+
+@st.cache_resource
+def load_intensity_cache():
+    """LRU of per-SF intensities for every session in this process, over the host-wide store"""
+    from csw_engine import open_cache
+    return open_cache('intensity')
 
 # ============================================================================
-# HELPER FUNCTIONS
+# CALCULATIONS
 # ============================================================================
 
-def calculate_wwr(csw_area, building_area, num_floors):
-    """Calculate Window-to-Wall Ratio"""
-    if num_floors == 0 or building_area == 0:
-        return 0
-    floor_area = building_area / num_floors
-    wall_area = (floor_area ** 0.5) * 4 * 15 * num_floors
-    return csw_area / wall_area if wall_area > 0 else 0
-
-def calculate_cooling_multiplier_office(cdd, building_size):
-    """Calculate cooling adjustment multiplier for Office based on CDD"""
-    coeffs = COOLING_MULT_COEFFICIENTS_OFFICE[building_size]
-    a, b, c, d = coeffs['a'], coeffs['b'], coeffs['c'], coeffs['d']
-    multiplier = a + b * cdd + c * (cdd ** 2) + d * (cdd ** 3)
-    return max(0.0, min(1.0, multiplier))
-
-def build_lookup_config_office(inputs, hours):
-    """Build configuration for finding Office regression row"""
-    base = 'Single' if inputs['existing_window'] == 'Single pane' else 'Double'
-    csw_type = CSW_TYPE_MAPPING.get(inputs['csw_type'], inputs['csw_type'])
-    
-    if inputs['building_area'] > 30000 and inputs['hvac_system'] == 'Built-up VAV with hydronic reheat':
-        size = 'Large'
-    else:
-        size = 'Mid'
-    
-    heating_fuel = inputs['heating_fuel']
-    if size == 'Mid':
-        hvac_fuel = 'PVAV_Elec' if heating_fuel in ['Electric', 'None'] else 'PVAV_Gas'
-    else:
-        hvac_fuel = 'VAV'
-    
-    fuel = 'Electric' if heating_fuel == 'None' else heating_fuel
-    
-    return {
-        'base': base,
-        'csw': csw_type,
-        'size': size,
-        'hvac_fuel': hvac_fuel,
-        'fuel': fuel,
-        'occupancy': '',
-        'hours': hours
-    }
+def compute_intensity(inputs, building_type):
+    """Read the savings cube when available, otherwise run the regression engine"""
+    from csw_engine import calculate_intensity
+    cube = load_savings_cube()
+    if cube is not None:
+        intensity = cube.calculate_intensity(inputs, building_type)
+        if intensity is not None:
+            return intensity
+    return calculate_intensity(inputs, building_type, load_regression_index())
 
-def build_lookup_config_hotel(inputs, occupancy_level):
-    """Build configuration for finding Hotel CSW regression row"""
-    base = 'Single' if inputs['existing_window'] == 'Single pane' else 'Double'
-    csw_type = CSW_TYPE_MAPPING.get(inputs['csw_type'], inputs['csw_type'])
-    
-    hvac_system = inputs['hvac_system']
-    size = 'Small' if hvac_system in ['PTAC', 'PTHP'] else 'Large'
-    
-    hvac_mapping = {'PTAC': 'PTAC', 'PTHP': 'PTHP', 'Fan Coil Unit': '', 'Other': ''}
-    hvac_fuel = hvac_mapping.get(hvac_system, '')
-    
-    heating_fuel = inputs['heating_fuel']
-    if hvac_system in ['PTAC', 'PTHP'] or heating_fuel == 'None':
-        fuel = 'Electric'
-    else:
-        fuel = 'Gas' if heating_fuel == 'Natural Gas' else 'Electric'
-    
-    return {
-        'base': base,
-        'csw': csw_type,
-        'size': size,
-        'hvac_fuel': hvac_fuel,
-        'fuel': fuel,
-        'occupancy': occupancy_level,
-        'hours': ''
-    }
+def run_calculation(inputs, building_type):
+    """
+    Run the calculation, reporting lookup failures in the page.
 
-def build_baseline_config_hotel(inputs, occupancy_level):
-    """Build configuration for finding Hotel BASELINE row - uses different logic than CSW lookup"""
-    base = 'Single' if inputs['existing_window'] == 'Single pane' else 'Double'
-    
-    hvac_system = inputs['hvac_system']
-    heating_fuel = inputs['heating_fuel']
-    
-    # Determine size and hvac_fuel for baseline lookup
-    # Small hotel (PTAC/PTHP with Electric/None) uses PTAC/PTHP baseline
-    # Large hotel uses Gas or Electric baseline based on heating fuel
-    if hvac_system == 'PTAC':
-        size = 'Small'
-        hvac_fuel_baseline = 'PTAC'
-    elif hvac_system == 'PTHP':
-        size = 'Small'
-        hvac_fuel_baseline = 'PTHP'
+    The regression stage is cached on configuration, location and
+    hours/occupancy, so area and rate edits only rescale the cached intensity.
+    """
+    from csw_engine import intensity_cache_key, scale_savings
+    key = intensity_cache_key(inputs, building_type)
+    try:
+        intensity = load_intensity_cache().get_or_compute(key, lambda: compute_intensity(inputs, building_type))
+    except CoefficientNotFoundError as exc:
+        st.error(f"⚠️ {exc}")
+        return None
+    return scale_savings(inputs, *intensity)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def run_sweep(sweep_inputs, building_type):
+    """Savings across the full hours/occupancy range, cached per configuration"""
+    from csw_engine import sensitivity_sweep
+    return shared('sweep', (sweep_inputs, building_type),
+                  lambda: sensitivity_sweep(sweep_inputs, building_type, index=load_regression_index()))
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def run_comparison(compare_inputs, building_type, locations, products):
+    """Fan the building out over stations and/or product options, cached per inputs"""
+    from csw_engine import compare_savings
+    return shared('compare', (compare_inputs, building_type, locations, products),
+                  lambda: compare_savings(compare_inputs, building_type, locations, products,
+                                          index=load_regression_index()))
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def run_uncertainty(uncertainty_inputs, building_type):
+    """P10/P50/P90 savings from a seeded Monte Carlo run, cached per inputs"""
+    from csw_engine import monte_carlo_savings
+    return shared('uncertainty', (uncertainty_inputs, building_type),
+                  lambda: monte_carlo_savings(uncertainty_inputs, building_type, index=load_regression_index()))
+
+def tariff_options(fuel):
+    """{tariff id: Tariff} for one fuel"""
+    return {tariff_id: tariff for tariff_id, tariff in load_tariffs().items() if tariff.fuel == fuel}
+
+def tariff_label(tariffs, tariff_id):
+    return 'Flat rate' if tariff_id is None else tariffs[tariff_id].name
+
+def tariff_select(fuel, label, key):
+    """Tariff picker for one fuel, 'Flat rate' first"""
+    tariffs = tariff_options(fuel)
+    if not tariffs:
+        return
+    options = [None] + list(tariffs)
+    current = st.session_state.get(f'{fuel}_tariff')
+    choice = st.selectbox(label, options=options, index=options.index(current) if current in options else 0,
+                          format_func=lambda tariff_id: tariff_label(tariffs, tariff_id), key=key)
+    st.session_state[f'{fuel}_tariff'] = choice
+
+def selected_tariffs():
+    """(electric, gas) tariffs chosen in the wizard; None where the flat rate applies"""
+    tariffs = load_tariffs()
+    return tuple(tariffs.get(st.session_state.get(f'{fuel}_tariff')) for fuel in ('electric', 'gas'))
+
+def price_results(results, tariffs):
+    """Results (dict or frame) re-priced under the selected tariffs"""
+    from csw_engine import apply_tariffs
+    if results is None or tariffs == (None, None):
+        return results
+    with stage_timer('app_tariff'):
+        return apply_tariffs(results, *tariffs)
+
+# ============================================================================
+# RESULTS PAGE INPUTS
+# ============================================================================
+# The step-4 sidebar is bound to the wizard's values through on_change
+# callbacks. Streamlit runs a callback before the script, so the page is
+# calculated once with the new value, rather than once with the old value
+# and again after an st.rerun().
+
+SIDEBAR_DEFAULTS = {
+    'building_area': 75000,
+    'num_floors': 5,
+    'existing_window': 'Single pane',
+    'csw_area': 12000,
+    'operating_hours': 8000,
+    'occupancy_percent': 70,
+    'cooling_installed': 'Yes',
+    'electric_rate': 0.12,
+    'gas_rate': 0.80,
+}
+SIDEBAR_INPUTS = list(SIDEBAR_DEFAULTS) + ['csw_type', 'hvac_system', 'heating_fuel', 'electric_tariff', 'gas_tariff']
+
+def constrain_inputs(building_type):
+    """Fill in missing values and pull dependent ones back within their options and limits"""
+    state = st.session_state
+    for name, default in SIDEBAR_DEFAULTS.items():
+        if state.get(name) is None:
+            state[name] = default
+    min_area, max_area = BUILDING_AREA_RANGES[building_type]
+    state.building_area = min(max(state.building_area, min_area), max_area)
+    state.csw_area = min(state.csw_area, int(state.building_area * MAX_CSW_AREA_FRACTION))
+
+    products = available_csw_types(state.existing_window)
+    if state.get('csw_type') not in products:
+        state.csw_type = products[0]
+    hvac_systems = OFFICE_HVAC_SYSTEMS if building_type == 'Office' else HOTEL_HVAC_SYSTEMS
+    if state.get('hvac_system') not in hvac_systems:
+        state.hvac_system = hvac_systems[0]
+    fuels = available_heating_fuels(building_type, state.hvac_system)
+    if state.get('heating_fuel') not in fuels:
+        state.heating_fuel = fuels[0]
+    for fuel in ('electric', 'gas'):
+        if state.get(f'{fuel}_tariff') not in tariff_options(fuel):
+            state[f'{fuel}_tariff'] = None
+
+def bind_sidebar():
+    """Point the sidebar widgets at the current values (before the widgets are drawn)"""
+    for name in SIDEBAR_INPUTS:
+        st.session_state[f'sidebar_{name}'] = st.session_state.get(name)
+
+def sidebar_changed(name):
+    """on_change callback: copy a sidebar widget's value into the wizard's value"""
+    st.session_state[name] = st.session_state[f'sidebar_{name}']
+
+# ============================================================================
+# DIAGNOSTICS (hidden page, open with ?diagnostics=1)
+# ============================================================================
+
+SHARED_NAMESPACES = ['dataset', 'sweep', 'compare', 'uncertainty']
+
+def shared_stores():
+    """{name: SQLiteCache} for every host-wide store in use; empty with CSW_CACHE=memory"""
+    intensity = load_intensity_cache()
+    stores = {'intensity': intensity.back} if hasattr(intensity, 'back') else {}
+    for namespace in SHARED_NAMESPACES:
+        store = load_shared_store(namespace)
+        if store is not None:
+            stores[namespace] = store
+    return stores
+
+def prometheus_text():
+    """Stage timings, counters and cache stats for a Prometheus scrape file"""
+    caches = {'intensity': load_intensity_cache().stats()}
+    caches.update({f'{name}_shared': store.stats() for name, store in shared_stores().items()})
+    return METRICS.to_prometheus() + caches_to_prometheus(caches)
+
+def render_diagnostics():
+    import pandas as pd
+    import plotly.graph_objects as go
+    
+    st.header('🩺 Diagnostics')
+    st.caption('Timings are shared by every session in this server process.')
+    
+    recording = st.toggle('Record timings', value=METRICS.enabled, key='metrics_recording')
+    if recording != METRICS.enabled:
+        enable_metrics() if recording else disable_metrics()
+    if not INSTRUMENTED:
+        st.info('Engine functions are not instrumented. Start the app with CSW_METRICS=1 to also time '
+                'data loads, regression lookups and calculations; page stages are timed while recording is on.')
+    
+    stages = METRICS.stages()
+    if stages:
+        to_ms = lambda seconds: seconds * 1000
+        table = pd.DataFrame([{
+            'Stage': stats.stage,
+            'Calls': stats.count,
+            'Mean (ms)': to_ms(stats.total / stats.count),
+            'P50 (ms)': to_ms(stats.p50),
+            'P90 (ms)': to_ms(stats.p90),
+            'P99 (ms)': to_ms(stats.p99),
+            'Max (ms)': to_ms(stats.max),
+            'Total (s)': stats.total,
+        } for stats in stages])
+        st.dataframe(table, use_container_width=True, hide_index=True,
+                     column_config={column: st.column_config.NumberColumn(format='%.3f')
+                                    for column in table.columns if column not in ('Stage', 'Calls')})
+        
+        stage = st.selectbox('Latency histogram', [stats.stage for stats in stages], key='diagnostics_stage')
+        histogram = METRICS.histogram(stage)
+        labels = [f"≤ {bound * 1000:g} ms" for bound in histogram.buckets] + [f"> {histogram.buckets[-1] * 1000:g} ms"]
+        fig_histogram = go.Figure(go.Bar(x=labels, y=histogram.counts, marker_color='#2C5F6F'))
+        fig_histogram.update_layout(height=300, margin=dict(t=20, b=60, l=60, r=20), yaxis_title='Calls',
+                                    plot_bgcolor='white', paper_bgcolor='white')
+        st.plotly_chart(fig_histogram, use_container_width=True)
     else:
-        # Large hotel (Fan Coil, Other)
-        size = 'Large'
-        hvac_fuel_baseline = 'Gas' if heating_fuel == 'Natural Gas' else 'Electric'
-    
+        st.info('No timings recorded yet. Turn recording on and use the calculator in another tab.')
+    
+    counters = METRICS.counters()
+    if counters:
+        st.markdown('**Counters**')
+        st.dataframe(pd.DataFrame({'Event': list(counters), 'Count': list(counters.values())}), hide_index=True)
+    
+    cache = load_intensity_cache().stats()
+    lookups = cache.hits + cache.misses
+    st.markdown('**Intensity Cache**')
+    cache_cols = st.columns(4)
+    cache_cols[0].metric('Hit Rate', f"{cache.hits / lookups:.0%}" if lookups else 'n/a')
+    cache_cols[1].metric('Hits / Misses', f"{cache.hits:,} / {cache.misses:,}")
+    cache_cols[2].metric('Entries', f"{cache.size:,} of {cache.maxsize:,}")
+    cache_cols[3].metric('Evictions', f"{cache.evictions:,}")
+    
+    stores = shared_stores()
+    if stores:
+        st.markdown('**Host-wide Cache**')
+        store_stats = {name: store.stats() for name, store in stores.items()}
+        st.dataframe(pd.DataFrame({
+            'Namespace': list(store_stats),
+            'Hits': [stats.hits for stats in store_stats.values()],
+            'Misses': [stats.misses for stats in store_stats.values()],
+            'Entries': [stats.size for stats in store_stats.values()],
+            'Version': [store.version for store in stores.values()],
+        }), hide_index=True)
+        any_store = next(iter(stores.values()))
+        st.caption(f"{any_store.path} · "
+                   f"{any_store.size_bytes() / 1e6:.1f} of {any_store.max_bytes / 1e6:.0f} MB. "
+                   'Hits and misses count this process; entries are shared by the host.')
+    
+    col_export, col_reset = st.columns([3, 1])
+    with col_export:
+        st.download_button('⬇️ Prometheus Metrics', data=prometheus_text(), file_name='csw_metrics.prom', mime='text/plain')
+    with col_reset:
+        if st.button('Reset Timings'):
+            METRICS.reset()
+            st.rerun()
+
+if 'diagnostics' in st.query_params:
+    render_diagnostics()
+    st.stop()
+
+# ============================================================================
+# CHARTS
+# ============================================================================
+# Building and validating a styled Plotly figure takes ~16 ms, so the EUI
+# waterfall is built once and each result only patches its three values.
+# CSW_CHARTS=vega draws it as a Vega-Lite spec instead, without Plotly.
+
+CHART_RENDERER = os.environ.get('CSW_CHARTS', 'plotly').lower()
+WATERFALL_LABELS = ['Baseline EUI\nBefore Winsert', 'Savings with\nWinsert', 'EUI After\nWinsert']
+INCREASE_COLORS = ('#D32F2F', '#B71C1C')
+DECREASE_COLORS = ('#FF9800', '#F57C00')
+TOTAL_COLORS = ('#4CAF50', '#388E3C')
+
+@st.cache_resource
+def load_waterfall_template():
+    """(styled EUI waterfall, lock); sessions share the figure, so patch and draw it under the lock"""
+    import plotly.graph_objects as go
+    fig = go.Figure(go.Waterfall(
+        orientation = "v",
+        measure = ["absolute", "relative", "total"],
+        x = [label.replace('\n', '<br>') for label in WATERFALL_LABELS],
+        y = [0, 0, 0],
+        text = ['', '', ''],
+        textposition = ["inside", "outside", "inside"],
+        textfont = dict(size=12, color="white"),
+        increasing = {"marker":{"color":INCREASE_COLORS[0], "line":{"color":INCREASE_COLORS[1], "width":2}}},
+        decreasing = {"marker":{"color":DECREASE_COLORS[0], "line":{"color":DECREASE_COLORS[1], "width":2}}},
+        totals = {"marker":{"color":TOTAL_COLORS[0], "line":{"color":TOTAL_COLORS[1], "width":2}}},
+        connector = {"line":{"color":"rgb(100, 100, 100)", "width":1}},
+        width = [0.5, 0.5, 0.5]
+    ))
+    fig.update_layout(
+        height=320,
+        showlegend=False,
+        yaxis=dict(title='kBtu/SF-yr', title_font=dict(size=11), gridcolor='#E0E0E0', rangemode='tozero'),
+        xaxis=dict(title_font=dict(size=11)),
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        margin=dict(t=30, b=80, l=60, r=20)
+    )
+    return fig, threading.Lock()
+
+def waterfall_text(baseline_eui, savings_eui, new_eui):
+    return [f"{baseline_eui:.1f}", f"−{savings_eui:.1f}", f"{new_eui:.1f}"]
+
+def waterfall_vega_spec(baseline_eui, savings_eui, new_eui):
+    """Vega-Lite spec of the EUI waterfall, coloured as the Plotly one"""
+    text = waterfall_text(baseline_eui, savings_eui, new_eui)
+    bars = [
+        (0.0, baseline_eui, INCREASE_COLORS if baseline_eui >= 0 else DECREASE_COLORS),
+        (baseline_eui, new_eui, DECREASE_COLORS if savings_eui >= 0 else INCREASE_COLORS),
+        (0.0, new_eui, TOTAL_COLORS),
+    ]
+    rows = []
+    for position, (label, label_text, (start, end, (fill, line))) in enumerate(zip(WATERFALL_LABELS, text, bars)):
+        rows.append({'position': position, 'label': label, 'start': start, 'end': end, 'fill': fill, 'line': line, 'text': label_text,
+                     'middle': (start + end) / 2, 'top': max(start, end)})
+    # Labels sit inside the end bars and above the savings bar, as in the Plotly chart
+    inside = 'datum.position != 1'
     return {
-        'base': base,
-        'size': size,
-        'hvac_fuel': hvac_fuel_baseline,
-        'occupancy': occupancy_level,
-        'hours': ''
+        'height': 320,
+        'data': {'values': rows},
+        'encoding': {'x': {'field': 'label', 'type': 'nominal', 'sort': None, 'title': None,
+                           'axis': {'labelAngle': 0, 'labelExpr': "split(datum.label, '\\n')"}}},
+        'layer': [
+            {'mark': {'type': 'bar', 'width': {'band': 0.5}, 'strokeWidth': 2},
+             'encoding': {'y': {'field': 'start', 'type': 'quantitative', 'title': 'kBtu/SF-yr'},
+                          'y2': {'field': 'end'},
+                          'fill': {'field': 'fill', 'type': 'nominal', 'scale': None},
+                          'stroke': {'field': 'line', 'type': 'nominal', 'scale': None}}},
+            {'transform': [{'filter': inside}],
+             'mark': {'type': 'text', 'fontSize': 12, 'color': 'white'},
+             'encoding': {'y': {'field': 'middle', 'type': 'quantitative'}, 'text': {'field': 'text'}}},
+            {'transform': [{'filter': f'!({inside})'}],
+             'mark': {'type': 'text', 'fontSize': 12, 'dy': -8},
+             'encoding': {'y': {'field': 'top', 'type': 'quantitative'}, 'text': {'field': 'text'}}},
+        ],
     }
 
-def find_regression_row(config, building_type):
-    """Find matching regression row for CSW savings"""
-    if REGRESSION_COEFFICIENTS.empty:
-        return None
-    
-    if building_type == 'Office':
-        # Check occupancy column - it should be empty string or NaN for Office
-        mask = (
-            (REGRESSION_COEFFICIENTS['base'] == config['base']) &
-            (REGRESSION_COEFFICIENTS['csw'] == config['csw']) &
-            (REGRESSION_COEFFICIENTS['size'] == config['size']) &
-            (REGRESSION_COEFFICIENTS['hvac_fuel'] == config['hvac_fuel']) &
-            (REGRESSION_COEFFICIENTS['hours'] == config['hours']) &
-            ((REGRESSION_COEFFICIENTS['occupancy'] == '') | (REGRESSION_COEFFICIENTS['occupancy'].isna()))
-        )
-        if pd.notna(config['fuel']) and config['fuel'] != '':
-            mask = mask & (REGRESSION_COEFFICIENTS['fuel'] == config['fuel'])
-        
-        result = REGRESSION_COEFFICIENTS[mask]
-    else:  # Hotel
-        mask = (
-            (REGRESSION_COEFFICIENTS['base'] == config['base']) &
-            (REGRESSION_COEFFICIENTS['csw'] == config['csw']) &
-            (REGRESSION_COEFFICIENTS['size'] == config['size']) &
-            (REGRESSION_COEFFICIENTS['occupancy'] == config['occupancy']) &
-            ((REGRESSION_COEFFICIENTS['hours'] == '') | (REGRESSION_COEFFICIENTS['hours'].isna()))
+def render_waterfall(baseline_eui, savings_eui, new_eui):
+    """Draw the EUI waterfall with the configured renderer"""
+    if CHART_RENDERER == 'vega':
+        with stage_timer('app_chart_build'):
+            spec = waterfall_vega_spec(baseline_eui, savings_eui, new_eui)
+        with stage_timer('app_chart_render'):
+            st.vega_lite_chart(spec, use_container_width=True)
+        return
+    
+    fig, lock = load_waterfall_template()
+    with lock:
+        with stage_timer('app_chart_build'):
+            # Assigning the two properties checks just those values (update() walks the trace)
+            waterfall = fig.data[0]
+            waterfall.y = [baseline_eui, -savings_eui, new_eui]
+            waterfall.text = waterfall_text(baseline_eui, savings_eui, new_eui)
+        with stage_timer('app_chart_render'):
+            st.plotly_chart(fig, use_container_width=True)
+
+# ============================================================================
+# RESULTS PAGE SECTIONS
+# ============================================================================
+# Sections with their own widgets are fragments: editing one reruns only that
+# section, with the inputs and results of the last full run.
+
+@st.fragment
+def render_lifecycle(inputs, results):
+    """Financial assumptions, lifecycle metrics and the cumulative cash flow chart"""
+    import pandas as pd
+    import plotly.graph_objects as go
+    from csw_engine import (
+        calculate_lifecycle,
+        cash_flows,
+        discount_factors,
+        LIFECYCLE_DEFAULTS,
+        LIFECYCLE_YEARS,
+        LIFECYCLE_YEARS_RANGE,
+    )
+    
+    with stage_timer('app_lifecycle_section'):
+        st.markdown('<h4 style="text-align: center;">Lifecycle Cost & Payback</h4>', unsafe_allow_html=True)
+        with st.expander('Financial Assumptions'):
+            fin_col1, fin_col2, fin_col3 = st.columns(3)
+            with fin_col1:
+                installed_cost_per_sf = st.number_input('Installed Cost ($/SF of CSW)', min_value=0.0, max_value=200.0, value=LIFECYCLE_DEFAULTS['installed_cost_per_sf'], step=1.0, key='installed_cost_per_sf')
+                analysis_years = st.slider('Analysis Period (years)', min_value=LIFECYCLE_YEARS_RANGE[0], max_value=LIFECYCLE_YEARS_RANGE[1], value=LIFECYCLE_YEARS, step=1, key='analysis_years')
+            with fin_col2:
+                discount_rate = st.number_input('Discount Rate (%)', min_value=0.0, max_value=20.0, value=LIFECYCLE_DEFAULTS['discount_rate'] * 100, step=0.5, key='discount_rate')
+                degradation = st.number_input('Savings Degradation (%/yr)', min_value=0.0, max_value=5.0, value=LIFECYCLE_DEFAULTS['degradation'] * 100, step=0.1, key='degradation')
+            with fin_col3:
+                electric_escalation = st.number_input('Electric Rate Escalation (%/yr)', min_value=-5.0, max_value=15.0, value=LIFECYCLE_DEFAULTS['electric_escalation'] * 100, step=0.5, key='electric_escalation')
+                gas_escalation = st.number_input('Gas Rate Escalation (%/yr)', min_value=-5.0, max_value=15.0, value=LIFECYCLE_DEFAULTS['gas_escalation'] * 100, step=0.5, key='gas_escalation')
+
+        assumptions = {
+            'installed_cost_per_sf': installed_cost_per_sf,
+            'electric_escalation': electric_escalation / 100,
+            'gas_escalation': gas_escalation / 100,
+            'discount_rate': discount_rate / 100,
+            'degradation': degradation / 100,
+        }
+        with stage_timer('app_lifecycle'):
+            lifecycle = calculate_lifecycle(inputs, results, analysis_years, **assumptions)
+
+        irr = lifecycle['irr']
+        simple = lifecycle['simple_payback_years']
+        discounted = lifecycle['discounted_payback_years']
+        fin_cols = st.columns(4)
+        fin_cols[0].metric(f'{analysis_years}-Year NPV', f"{'-' if lifecycle['npv'] < 0 else ''}${abs(lifecycle['npv']):,.0f}")
+        fin_cols[1].metric('IRR', f"{irr:.1%}" if pd.notna(irr) else 'n/a')
+        fin_cols[2].metric('Simple Payback', f"{simple:.1f} yrs" if pd.notna(simple) else 'n/a')
+        fin_cols[3].metric('Discounted Payback', f"{discounted:.1f} yrs" if pd.notna(discounted) else f"> {analysis_years} yrs")
+
+        yearly = cash_flows(
+            results['electric_cost_savings'], results['gas_cost_savings'], analysis_years,
+            assumptions['electric_escalation'], assumptions['gas_escalation'], assumptions['degradation']
+        )[0]
+        cumulative = (yearly * discount_factors(assumptions['discount_rate'], analysis_years)[0]).cumsum() - lifecycle['installed_cost']
+        fig_lifecycle = go.Figure(go.Bar(
+            x=list(range(1, analysis_years + 1)),
+            y=cumulative,
+            marker_color=['#2C5F6F' if value >= 0 else '#D32F2F' for value in cumulative],
+            hovertemplate='Year %{x}<br>Cumulative: $%{y:,.0f}<extra></extra>'
+        ))
+        fig_lifecycle.update_layout(
+            title=dict(text='Cumulative Discounted Cash Flow', x=0.5, font=dict(size=14)),
+            xaxis_title='Year',
+            yaxis=dict(title='$', tickformat='$,.0f'),
+            height=320,
+            margin=dict(t=40, b=40, l=60, r=20),
+            plot_bgcolor='white',
+            paper_bgcolor='white'
         )
-        if config['hvac_fuel']:
-            mask = mask & (REGRESSION_COEFFICIENTS['hvac_fuel'] == config['hvac_fuel'])
-        else:
-            mask = mask & ((REGRESSION_COEFFICIENTS['hvac_fuel'] == '') | (REGRESSION_COEFFICIENTS['hvac_fuel'].isna()))
-        if pd.notna(config['fuel']):
-            mask = mask & (REGRESSION_COEFFICIENTS['fuel'] == config['fuel'])
-    
-        result = REGRESSION_COEFFICIENTS[mask]
-    
-    return result.iloc[0] if not result.empty else None
+        with stage_timer('app_chart_render'):
+            st.plotly_chart(fig_lifecycle, use_container_width=True)
 
-def find_baseline_eui_row(config, building_type):
-    """Find baseline EUI regression row"""
-    if REGRESSION_COEFFICIENTS.empty:
-        return None
-    
-    if building_type == 'Office':
-        fuel_type = 'Gas' if config['fuel'] == 'Natural Gas' else 'Electric'
-        
-        # Office baseline: csw='N/A', occupancy is NaN or empty, hours must match
-        mask = (
-            (REGRESSION_COEFFICIENTS['base'] == config['base']) &
-            (REGRESSION_COEFFICIENTS['csw'] == 'N/A') &
-            (REGRESSION_COEFFICIENTS['size'] == config['size']) &
-            (REGRESSION_COEFFICIENTS['hvac_fuel'] == fuel_type) &
-            (REGRESSION_COEFFICIENTS['hours'] == config['hours']) &
-            ((REGRESSION_COEFFICIENTS['occupancy'] == '') | (REGRESSION_COEFFICIENTS['occupancy'].isna()))
+@st.fragment
+def render_uncertainty(inputs, building_type):
+    """P10/P50/P90 savings behind a toggle"""
+    with stage_timer('app_uncertainty_section'):
+        show_range = st.toggle(
+            'Show savings range (P10–P90)',
+            key='show_uncertainty',
+            help='Varies weather, utility rate escalation and '
+                 f"{'operating hours' if building_type == 'Office' else 'occupancy'} "
+                 'over 100,000 draws, at the flat rates'
         )
-        
-        result = REGRESSION_COEFFICIENTS[mask]
-        
-        # If no exact match, try with N/A fuel
-        if result.empty:
-            mask = (
-                (REGRESSION_COEFFICIENTS['base'] == config['base']) &
-                (REGRESSION_COEFFICIENTS['csw'] == 'N/A') &
-                (REGRESSION_COEFFICIENTS['size'] == config['size']) &
-                (REGRESSION_COEFFICIENTS['hvac_fuel'] == fuel_type) &
-                (REGRESSION_COEFFICIENTS['fuel'] == 'N/A') &
-                (REGRESSION_COEFFICIENTS['hours'] == config['hours']) &
-                ((REGRESSION_COEFFICIENTS['occupancy'] == '') | (REGRESSION_COEFFICIENTS['occupancy'].isna()))
-            )
-            result = REGRESSION_COEFFICIENTS[mask]
-    
-    else:  # Hotel
-        # Hotel baseline lookup uses the hvac_fuel from the baseline config
-        mask = (
-            (REGRESSION_COEFFICIENTS['base'] == config['base']) &
-            (REGRESSION_COEFFICIENTS['csw'] == 'N/A') &
-            (REGRESSION_COEFFICIENTS['size'] == config['size']) &
-            (REGRESSION_COEFFICIENTS['hvac_fuel'] == config['hvac_fuel']) &
-            (REGRESSION_COEFFICIENTS['occupancy'] == config['occupancy']) &
-            ((REGRESSION_COEFFICIENTS['hours'] == '') | (REGRESSION_COEFFICIENTS['hours'].isna()))
+        if show_range:
+            with st.spinner('Running simulation...'):
+                ranges = run_uncertainty(inputs, building_type)
+            range_cols = st.columns(3)
+            range_metrics = [
+                ('total_cost_savings', 'Annual Savings', '${:,.0f}'),
+                ('electric_savings_kwh', 'Electric Savings', '{:,.0f} kWh/yr'),
+                ('gas_savings_therms', 'Gas Savings', '{:,.0f} therms/yr'),
+            ]
+            for col, (metric, label, fmt) in zip(range_cols, range_metrics):
+                with col:
+                    st.metric(f'{label} (P50)', fmt.format(ranges.loc['P50', metric]))
+                    st.caption(f"P10 {fmt.format(ranges.loc['P10', metric])} · "
+                               f"P90 {fmt.format(ranges.loc['P90', metric])}")
+
+@st.fragment
+def render_comparison(inputs, building_type, tariffs):
+    """Savings across stations and/or product options, as a table, CSV and state map"""
+    import plotly.graph_objects as go
+    from csw_engine import summarize_by_state
+    
+    with stage_timer('app_comparison_section'):
+        st.markdown('<h4 style="text-align: center;">Compare Locations & Products</h4>', unsafe_allow_html=True)
+        compare_mode = st.radio(
+            'Compare this building across',
+            ['Off', 'All locations', 'All products & HVAC options', 'Both'],
+            horizontal=True,
+            key='compare_mode'
         )
-        
-        result = REGRESSION_COEFFICIENTS[mask]
-    
-    return result.iloc[0] if not result.empty else None
 
-def calculate_from_regression(row, degree_days, is_heating=True):
-    """Calculate value using regression formula: value = a + b*DD + c*DD²"""
-    if row is None:
-        return 0
-    
-    if is_heating:
-        a, b, c = row['heat_a'], row['heat_b'], row['heat_c']
-    else:
-        a, b, c = row['cool_a'], row['cool_b'], row['cool_c']
-    
-    return a + b * degree_days + c * (degree_days ** 2)
-
-def interpolate_values(value_param, val_high, val_low, param_high, param_low):
-    """Generic interpolation formula"""
-    if value_param <= param_low:
-        return val_low
-    elif value_param >= param_high:
-        return val_high
-    else:
-        return ((value_param - param_low) / (param_high - param_low)) * (val_high - val_low) + val_low
-
-def calculate_savings_office(inputs):
-    """Calculate savings for Office buildings"""
-    building_area = inputs['building_area']
-    csw_area = inputs['csw_area']
-    operating_hours = inputs['operating_hours']
-    num_floors = inputs['num_floors']
-    electric_rate = inputs['electric_rate']
-    gas_rate = inputs['gas_rate']
-    cooling_installed = inputs['cooling_installed']
-    heating_fuel = inputs['heating_fuel']
-    hdd = inputs.get('hdd', 0)
-    cdd = inputs.get('cdd', 0)
-    
-    # Determine operating hours brackets
-    hours_high = 8760 if operating_hours > 2912 else 2912
-    hours_low = 2912 if hours_high == 8760 else 2080
-    
-    config_high = build_lookup_config_office(inputs, hours_high)
-    config_low = build_lookup_config_office(inputs, hours_low)
-    
-    row_high = find_regression_row(config_high, 'Office')
-    row_low = find_regression_row(config_low, 'Office')
-    
-    if row_high is None or row_low is None:
-        st.error(f"⚠️ Could not find Office regression coefficients")
-        return None
-    
-    # Calculate heating savings
-    if heating_fuel == 'Natural Gas':
-        heating_high = calculate_from_regression(row_high, hdd, is_heating=True)
-        heating_low = calculate_from_regression(row_low, hdd, is_heating=True)
-        gas_savings_high, gas_savings_low = heating_high, heating_low
-        electric_heating_high, electric_heating_low = 0, 0
-    else:
-        electric_heating_high = calculate_from_regression(row_high, hdd, is_heating=True)
-        electric_heating_low = calculate_from_regression(row_low, hdd, is_heating=True)
-        gas_savings_high, gas_savings_low = 0, 0
-    
-    # Calculate cooling savings
-    cooling_high = calculate_from_regression(row_high, cdd, is_heating=False)
-    cooling_low = calculate_from_regression(row_low, cdd, is_heating=False)
-    
-    # Interpolate
-    if heating_fuel == 'Natural Gas':
-        c31 = 0
-        c33 = interpolate_values(operating_hours, gas_savings_high, gas_savings_low, hours_high, hours_low)
-    else:
-        c31 = interpolate_values(operating_hours, electric_heating_high, electric_heating_low, hours_high, hours_low)
-        c33 = 0
-    
-    c32_base = interpolate_values(operating_hours, cooling_high, cooling_low, hours_high, hours_low)
-    
-    # Apply cooling multiplier
-    if cooling_installed == "Yes":
-        w24 = 1.0
-    else:
-        w24 = calculate_cooling_multiplier_office(cdd, config_high['size'])
-    
-    c32 = c32_base * w24
-    
-    # Find baseline EUI
-    baseline_row_high = find_baseline_eui_row(config_high, 'Office')
-    baseline_row_low = find_baseline_eui_row(config_low, 'Office')
-    
-    if baseline_row_high is None or baseline_row_low is None:
-        st.error("⚠️ Could not find Office baseline EUI coefficients")
-        return None
-    
-    baseline_eui_high = calculate_from_regression(baseline_row_high, hdd, is_heating=True)
-    baseline_eui_low = calculate_from_regression(baseline_row_low, hdd, is_heating=True)
-    baseline_eui = interpolate_values(operating_hours, baseline_eui_high, baseline_eui_low, hours_high, hours_low)
-    
-    # Calculate final savings
-    electric_savings_kwh = (c31 + c32) * csw_area
-    gas_savings_therms = c33 * csw_area
-    electric_cost_savings = electric_savings_kwh * electric_rate
-    gas_cost_savings = gas_savings_therms * gas_rate
-    total_cost_savings = electric_cost_savings + gas_cost_savings
-    total_savings_kbtu_sf = (electric_savings_kwh * 3.413 + gas_savings_therms * 100) / building_area
-    new_eui = baseline_eui - total_savings_kbtu_sf
-    percent_eui_savings = (total_savings_kbtu_sf / baseline_eui * 100) if baseline_eui > 0 else 0
-    wwr = calculate_wwr(csw_area, building_area, num_floors) if csw_area > 0 and num_floors > 0 else None
-    
-    return {
-        'electric_savings_kwh': electric_savings_kwh,
-        'gas_savings_therms': gas_savings_therms,
-        'electric_cost_savings': electric_cost_savings,
-        'gas_cost_savings': gas_cost_savings,
-        'total_cost_savings': total_cost_savings,
-        'total_savings_kbtu_sf': total_savings_kbtu_sf,
-        'baseline_eui': baseline_eui,
-        'new_eui': new_eui,
-        'percent_eui_savings': percent_eui_savings,
-        'wwr': wwr,
-        'hdd': hdd,
-        'cdd': cdd,
-        'heating_per_sf': c31,
-        'cooling_per_sf': c32,
-        'gas_per_sf': c33
-    }
+        if compare_mode != 'Off':
+            compare_locations = compare_mode in ('All locations', 'Both')
+            compare_products = compare_mode in ('All products & HVAC options', 'Both')
 
-def calculate_savings_hotel(inputs):
-    """Calculate savings for Hotel buildings"""
-    building_area = inputs['building_area']
-    csw_area = inputs['csw_area']
-    occupancy_percent = inputs['occupancy_percent']
-    num_floors = inputs['num_floors']
-    electric_rate = inputs['electric_rate']
-    gas_rate = inputs['gas_rate']
-    cooling_installed = inputs['cooling_installed']
-    heating_fuel = inputs['heating_fuel']
-    hdd = inputs.get('hdd', 0)
-    cdd = inputs.get('cdd', 0)
-    
-    # Hotel uses occupancy interpolation (33% = Low, 100% = High)
-    occupancy_high = 100
-    occupancy_low = 33
-    
-    # CSW savings lookup - uses standard config
-    config_high = build_lookup_config_hotel(inputs, 'High')
-    config_low = build_lookup_config_hotel(inputs, 'Low')
-    
-    row_high = find_regression_row(config_high, 'Hotel')
-    row_low = find_regression_row(config_low, 'Hotel')
-    
-    if row_high is None or row_low is None:
-        st.error(f"⚠️ Could not find Hotel regression coefficients")
-        return None
-    
-    # Calculate heating savings
-    if heating_fuel == 'Natural Gas':
-        heating_high = calculate_from_regression(row_high, hdd, is_heating=True)
-        heating_low = calculate_from_regression(row_low, hdd, is_heating=True)
-        gas_savings_high, gas_savings_low = heating_high, heating_low
-        electric_heating_high, electric_heating_low = 0, 0
-    else:
-        electric_heating_high = calculate_from_regression(row_high, hdd, is_heating=True)
-        electric_heating_low = calculate_from_regression(row_low, hdd, is_heating=True)
-        gas_savings_high, gas_savings_low = 0, 0
-    
-    # Calculate cooling savings
-    cooling_high = calculate_from_regression(row_high, cdd, is_heating=False)
-    cooling_low = calculate_from_regression(row_low, cdd, is_heating=False)
-    
-    # Interpolate based on occupancy
-    if heating_fuel == 'Natural Gas':
-        c31 = 0
-        c33 = interpolate_values(occupancy_percent, gas_savings_high, gas_savings_low, occupancy_high, occupancy_low)
-    else:
-        c31 = interpolate_values(occupancy_percent, electric_heating_high, electric_heating_low, occupancy_high, occupancy_low)
-        c33 = 0
-    
-    c32_base = interpolate_values(occupancy_percent, cooling_high, cooling_low, occupancy_high, occupancy_low)
-    
-    # Hotels always apply cooling (no multiplier adjustment needed)
-    c32 = c32_base if cooling_installed == "Yes" else 0
-    
-    # Baseline lookup - uses separate baseline config
-    baseline_config_high = build_baseline_config_hotel(inputs, 'High')
-    baseline_config_low = build_baseline_config_hotel(inputs, 'Low')
-    
-    baseline_row_high = find_baseline_eui_row(baseline_config_high, 'Hotel')
-    baseline_row_low = find_baseline_eui_row(baseline_config_low, 'Hotel')
-    
-    if baseline_row_high is None or baseline_row_low is None:
-        st.error("⚠️ Could not find Hotel baseline EUI coefficients")
-        return None
-    
-    baseline_eui_high = calculate_from_regression(baseline_row_high, hdd, is_heating=True)
-    baseline_eui_low = calculate_from_regression(baseline_row_low, hdd, is_heating=True)
-    baseline_eui = interpolate_values(occupancy_percent, baseline_eui_high, baseline_eui_low, occupancy_high, occupancy_low)
-    
-    # Calculate final savings
-    electric_savings_kwh = (c31 + c32) * csw_area
-    gas_savings_therms = c33 * csw_area
-    electric_cost_savings = electric_savings_kwh * electric_rate
-    gas_cost_savings = gas_savings_therms * gas_rate
-    total_cost_savings = electric_cost_savings + gas_cost_savings
-    total_savings_kbtu_sf = (electric_savings_kwh * 3.413 + gas_savings_therms * 100) / building_area
-    new_eui = baseline_eui - total_savings_kbtu_sf
-    percent_eui_savings = (total_savings_kbtu_sf / baseline_eui * 100) if baseline_eui > 0 else 0
-    wwr = calculate_wwr(csw_area, building_area, num_floors) if csw_area > 0 and num_floors > 0 else None
-    
-    return {
-        'electric_savings_kwh': electric_savings_kwh,
-        'gas_savings_therms': gas_savings_therms,
-        'electric_cost_savings': electric_cost_savings,
-        'gas_cost_savings': gas_cost_savings,
-        'total_cost_savings': total_cost_savings,
-        'total_savings_kbtu_sf': total_savings_kbtu_sf,
-        'baseline_eui': baseline_eui,
-        'new_eui': new_eui,
-        'percent_eui_savings': percent_eui_savings,
-        'wwr': wwr,
-        'hdd': hdd,
-        'cdd': cdd,
-        'heating_per_sf': c31,
-        'cooling_per_sf': c32,
-        'gas_per_sf': c33
-    }
+            # Drop the inputs being fanned out so the cached table is reused across them
+            varied = set()
+            if compare_locations:
+                varied.update(['state', 'city', 'hdd', 'cdd'])
+            if compare_products:
+                varied.update(['csw_type', 'hvac_system', 'heating_fuel'])
+            compare_inputs = {key: value for key, value in inputs.items() if key not in varied}
+            comparison = price_results(run_comparison(compare_inputs, building_type, compare_locations, compare_products),
+                                       tariffs)
+
+            table = comparison[[
+                'state', 'city', 'csw_type', 'hvac_system', 'heating_fuel',
+                'total_cost_savings', 'electric_savings_kwh', 'gas_savings_therms',
+                'percent_eui_savings', 'hdd', 'cdd'
+            ]].rename(columns={
+                'state': 'State', 'city': 'City', 'csw_type': 'Product', 'hvac_system': 'HVAC System',
+                'heating_fuel': 'Heating Fuel', 'total_cost_savings': 'Annual Savings ($)',
+                'electric_savings_kwh': 'Electric (kWh/yr)', 'gas_savings_therms': 'Gas (therms/yr)',
+                'percent_eui_savings': 'EUI Savings (%)', 'hdd': 'HDD', 'cdd': 'CDD'
+            }).sort_values('Annual Savings ($)', ascending=False)
+
+            st.dataframe(
+                table,
+                use_container_width=True,
+                hide_index=True,
+                height=360,
+                column_config={
+                    'Annual Savings ($)': st.column_config.NumberColumn(format='$%,.0f'),
+                    'Electric (kWh/yr)': st.column_config.NumberColumn(format='%,.0f'),
+                    'Gas (therms/yr)': st.column_config.NumberColumn(format='%,.0f'),
+                    'EUI Savings (%)': st.column_config.NumberColumn(format='%.1f'),
+                    'HDD': st.column_config.NumberColumn(format='%,.0f'),
+                    'CDD': st.column_config.NumberColumn(format='%,.0f'),
+                }
+            )
+            st.download_button(
+                '⬇️ Download Comparison (CSV)',
+                data=comparison.to_csv(index=False),
+                file_name=f"winsert_comparison_{building_type.lower()}.csv",
+                mime='text/csv'
+            )
+
+            if compare_locations:
+                by_state = summarize_by_state(comparison)
+                fig_map = go.Figure(go.Choropleth(
+                    locations=by_state['state_code'],
+                    z=by_state['mean'],
+                    locationmode='USA-states',
+                    colorscale=[[0, '#D32F2F'], [0.5, '#F5F5F5'], [1, '#2C5F6F']] if by_state['mean'].min() < 0 else 'Teal',
+                    zmid=0 if by_state['mean'].min() < 0 else None,
+                    colorbar=dict(title='$/yr'),
+                    customdata=by_state[['state', 'stations', 'min', 'max']],
+                    hovertemplate='%{customdata[0]}<br>Mean: $%{z:,.0f}/yr<br>'
+                                  'Range: $%{customdata[2]:,.0f} – $%{customdata[3]:,.0f}<br>'
+                                  '%{customdata[1]} stations<extra></extra>'
+                ))
+                fig_map.update_layout(
+                    title=dict(text='Average Annual Savings by State', x=0.5, font=dict(size=14)),
+                    geo=dict(scope='usa', bgcolor='white'),
+                    height=420,
+                    margin=dict(t=40, b=10, l=10, r=10),
+                    paper_bgcolor='white'
+                )
+                st.plotly_chart(fig_map, use_container_width=True)
 
 # ============================================================================
 # UI
@@ -524,15 +660,6 @@ with col_title:
 
 st.markdown('---')
 
-# Check if data loaded
-if not WEATHER_DATA_BY_STATE:
-    st.error("⚠️ Unable to load weather data.")
-    st.stop()
-
-if REGRESSION_COEFFICIENTS.empty:
-    st.error("⚠️ Unable to load regression coefficients.")
-    st.stop()
-
 # Calculate total steps
 total_steps = 5
 if st.session_state.step > 0:
@@ -562,7 +689,13 @@ if st.session_state.step == 0:
 elif st.session_state.step == 1:
     st.header('Step 2: Project Location')
     
-    state_options = sorted(WEATHER_DATA_BY_STATE.keys())
+    with stage_timer('app_data_load'):
+        weather_data_by_state = load_weather_data()
+    if not weather_data_by_state:
+        st.error("⚠️ Unable to load weather data.")
+        st.stop()
+    
+    state_options = sorted(weather_data_by_state.keys())
     default_state_idx = 0
     if 'state' in st.session_state and st.session_state.state in state_options:
         default_state_idx = state_options.index(st.session_state.state)
@@ -571,7 +704,7 @@ elif st.session_state.step == 1:
     st.session_state.state = state
     
     if state:
-        city_options = sorted(WEATHER_DATA_BY_STATE[state].keys())
+        city_options = sorted(weather_data_by_state[state].keys())
         default_city_idx = 0
         if 'city' in st.session_state and st.session_state.city in city_options:
             default_city_idx = city_options.index(st.session_state.city)
@@ -580,7 +713,7 @@ elif st.session_state.step == 1:
         st.session_state.city = city
         
         if city:
-            weather = WEATHER_DATA_BY_STATE[state][city]
+            weather = weather_data_by_state[state][city]
             st.session_state.hdd = weather['HDD']
             st.session_state.cdd = weather['CDD']
             
@@ -617,6 +750,7 @@ elif st.session_state.step == 1:
 
 # STEP 3: Building Envelope
 elif st.session_state.step == 2:
+    from csw_engine import calculate_wwr
     building_type = st.session_state.get('building_type', 'Office')
     st.header('Step 3: Building Envelope Information')
     col1, col2 = st.columns(2)
@@ -624,11 +758,11 @@ elif st.session_state.step == 2:
     with col1:
         # Set building area limits based on building type
         if building_type == 'Hotel':
-            min_area, max_area = 15000, 250000
-            area_help = "Hotel building area must be between 15,000 and 250,000 square feet"
+            min_area, max_area = BUILDING_AREA_RANGES['Hotel']
+            area_help = f"Hotel building area must be between {min_area:,} and {max_area:,} square feet"
         else:  # Office
-            min_area, max_area = 15000, 500000
-            area_help = "Office building area must be between 15,000 and 500,000 square feet"
+            min_area, max_area = BUILDING_AREA_RANGES['Office']
+            area_help = f"Office building area must be between {min_area:,} and {max_area:,} square feet"
         
         building_area = st.number_input(
             'Building Area (Sq.Ft.)', 
@@ -643,8 +777,8 @@ elif st.session_state.step == 2:
         
         num_floors = st.number_input(
             'Number of Floors', 
-            min_value=1, 
-            max_value=100, 
+            min_value=NUM_FLOORS_RANGE[0], 
+            max_value=NUM_FLOORS_RANGE[1], 
             value=st.session_state.get('num_floors', 5), 
             key='num_floors_input',
             help="Number of floors must be between 1 and 100"
@@ -659,19 +793,15 @@ elif st.session_state.step == 2:
         st.session_state.existing_window = existing_window
     
     with col2:
-        if existing_window == 'Double pane':
-            csw_types_list = ['Winsert Lite']
-            csw_type_idx = 0
-        else:
-            csw_types_list = CSW_TYPES
-            csw_type_idx = 0
-            if 'csw_type' in st.session_state and st.session_state.csw_type in csw_types_list:
-                csw_type_idx = csw_types_list.index(st.session_state.csw_type)
+        csw_types_list = available_csw_types(existing_window)
+        csw_type_idx = 0
+        if 'csw_type' in st.session_state and st.session_state.csw_type in csw_types_list:
+            csw_type_idx = csw_types_list.index(st.session_state.csw_type)
         
         csw_type = st.selectbox('Secondary Window Product', options=csw_types_list, index=csw_type_idx, key='csw_type_select')
         st.session_state.csw_type = csw_type
         
-        csw_area = st.number_input('Total Sq. Ft of Secondary Windows Installed', min_value=0, max_value=int(building_area * 0.5), value=min(st.session_state.get('csw_area', 12000), int(building_area * 0.5)), step=100, key='csw_area_input')
+        csw_area = st.number_input('Total Sq. Ft of Secondary Windows Installed', min_value=0, max_value=int(building_area * MAX_CSW_AREA_FRACTION), value=min(st.session_state.get('csw_area', 12000), int(building_area * MAX_CSW_AREA_FRACTION)), step=100, key='csw_area_input')
         st.session_state.csw_area = csw_area
         
         if csw_area > 0 and building_area > 0 and num_floors > 0:
@@ -715,17 +845,20 @@ elif st.session_state.step == 3:
     col1, col2 = st.columns(2)
     
     with col1:
-        electric_rate = st.number_input('Electric Rate ($/kWh)', min_value=0.01, max_value=1.0, value=st.session_state.get('electric_rate', 0.12), step=0.01, format='%.3f', key='electric_rate_input')
+        electric_rate = st.number_input('Electric Rate ($/kWh)', min_value=ELECTRIC_RATE_RANGE[0], max_value=ELECTRIC_RATE_RANGE[1], value=st.session_state.get('electric_rate', 0.12), step=0.01, format='%.3f', key='electric_rate_input')
         st.session_state.electric_rate = electric_rate
         
-        gas_rate = st.number_input('Natural Gas Rate ($/therm)', min_value=0.01, max_value=10.0, value=st.session_state.get('gas_rate', 0.80), step=0.05, format='%.2f', key='gas_rate_input')
+        gas_rate = st.number_input('Natural Gas Rate ($/therm)', min_value=GAS_RATE_RANGE[0], max_value=GAS_RATE_RANGE[1], value=st.session_state.get('gas_rate', 0.80), step=0.05, format='%.2f', key='gas_rate_input')
         st.session_state.gas_rate = gas_rate
         
+        tariff_select('electric', 'Electric Tariff', 'electric_tariff_input')
+        tariff_select('gas', 'Gas Tariff', 'gas_tariff_input')
+        
         if building_type == 'Office':
-            operating_hours = st.number_input('Annual Operating Hours', min_value=1980, max_value=8760, value=st.session_state.get('operating_hours', 8000), step=100, key='operating_hours_input')
+            operating_hours = st.number_input('Annual Operating Hours', min_value=OPERATING_HOURS_RANGE[0], max_value=OPERATING_HOURS_RANGE[1], value=st.session_state.get('operating_hours', 8000), step=100, key='operating_hours_input')
             st.session_state.operating_hours = operating_hours
         else:  # Hotel
-            occupancy_percent = st.slider('Average Occupancy (%)', min_value=33, max_value=100, value=st.session_state.get('occupancy_percent', 70), step=1, key='occupancy_input', help='Between 33% and 100%')
+            occupancy_percent = st.slider('Average Occupancy (%)', min_value=OCCUPANCY_RANGE[0], max_value=OCCUPANCY_RANGE[1], value=st.session_state.get('occupancy_percent', 70), step=1, key='occupancy_input', help='Between 33% and 100%')
             st.session_state.occupancy_percent = occupancy_percent
     
     with col2:
@@ -740,21 +873,10 @@ elif st.session_state.step == 3:
         hvac_system = st.selectbox('HVAC System Type', options=hvac_systems_list, index=hvac_idx, key='hvac_system_select')
         st.session_state.hvac_system = hvac_system
         
-        # Heating fuel logic
-        if building_type == 'Office' and hvac_system == 'Packaged VAV with electric reheat':
-            heating_fuels_list = ['Electric']
-            fuel_idx = 0
-        elif building_type == 'Hotel' and hvac_system in ['PTHP', 'PTAC']:
-            # PTAC and PTHP systems are packaged terminal units - only electric heating
-            heating_fuels_list = ['Electric', 'None']
-            fuel_idx = 0
-            if 'heating_fuel' in st.session_state and st.session_state.heating_fuel in heating_fuels_list:
-                fuel_idx = heating_fuels_list.index(st.session_state.heating_fuel)
-        else:
-            heating_fuels_list = HEATING_FUELS
-            fuel_idx = 0
-            if 'heating_fuel' in st.session_state and st.session_state.heating_fuel in heating_fuels_list:
-                fuel_idx = heating_fuels_list.index(st.session_state.heating_fuel)
+        heating_fuels_list = available_heating_fuels(building_type, hvac_system)
+        fuel_idx = 0
+        if 'heating_fuel' in st.session_state and st.session_state.heating_fuel in heating_fuels_list:
+            fuel_idx = heating_fuels_list.index(st.session_state.heating_fuel)
         
         heating_fuel = st.selectbox('Heating Fuel', options=heating_fuels_list, index=fuel_idx, key='heating_fuel_select')
         st.session_state.heating_fuel = heating_fuel
@@ -779,7 +901,19 @@ elif st.session_state.step == 3:
 
 # STEP 5: Results
 elif st.session_state.step == 4:
+    page_start = perf_counter()
+    import plotly.graph_objects as go
+    from csw_engine import SWEEP_RANGES
+    
+    with stage_timer('app_data_load'):
+        regression_loaded = not load_regression_coefficients().empty
+    if not regression_loaded:
+        st.error("⚠️ Unable to load regression coefficients.")
+        st.stop()
+    
     building_type = st.session_state.get('building_type', 'Office')
+    constrain_inputs(building_type)
+    bind_sidebar()
     st.header('💡 Your Energy Savings Results')
     
     inputs = {
@@ -801,10 +935,12 @@ elif st.session_state.step == 4:
     
     if building_type == 'Office':
         inputs['operating_hours'] = st.session_state.get('operating_hours', 8000)
-        results = calculate_savings_office(inputs)
     else:  # Hotel
         inputs['occupancy_percent'] = st.session_state.get('occupancy_percent', 70)
-        results = calculate_savings_hotel(inputs)
+    with stage_timer('app_calculation'):
+        results = run_calculation(inputs, building_type)
+    tariffs = selected_tariffs()
+    results = price_results(results, tariffs)
     
     if results:
         st.success('✅ Calculation Complete!')
@@ -812,39 +948,53 @@ elif st.session_state.step == 4:
         col_chart, col_cost = st.columns([1.3, 1])
         
         with col_chart:
-            st.markdown('<h4 style="text-align: center;">Energy Use Intensity (EUI) Reduction</h4>', unsafe_allow_html=True)
-            
-            baseline_eui = results['baseline_eui']
-            savings_eui = results['total_savings_kbtu_sf']
-            new_eui = results['new_eui']
-            
-            fig = go.Figure(go.Waterfall(
-                orientation = "v",
-                measure = ["absolute", "relative", "total"],
-                x = ["Baseline EUI<br>Before Winsert", "Savings with<br>Winsert", "EUI After<br>Winsert"],
-                y = [baseline_eui, -savings_eui, new_eui],
-                text = [f"{baseline_eui:.1f}", f"−{savings_eui:.1f}", f"{new_eui:.1f}"],
-                textposition = ["inside", "outside", "inside"],
-                textfont = dict(size=12, color="white"),
-                increasing = {"marker":{"color":"#D32F2F", "line":{"color":"#B71C1C", "width":2}}},
-                decreasing = {"marker":{"color":"#FF9800", "line":{"color":"#F57C00", "width":2}}},
-                totals = {"marker":{"color":"#4CAF50", "line":{"color":"#388E3C", "width":2}}},
-                connector = {"line":{"color":"rgb(100, 100, 100)", "width":1}},
-                width = [0.5, 0.5, 0.5]
-            ))
-            
-            fig.update_layout(
-                height=320,
-                showlegend=False,
-                yaxis=dict(title='kBtu/SF-yr', title_font=dict(size=11), gridcolor='#E0E0E0', rangemode='tozero'),
-                xaxis=dict(title_font=dict(size=11)),
-                plot_bgcolor='white',
-                paper_bgcolor='white',
-                margin=dict(t=30, b=80, l=60, r=20)
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
-            
+            sweep_column = SWEEP_RANGES[building_type][0]
+            sweep_label = 'Operating Hours' if building_type == 'Office' else 'Occupancy'
+            tab_eui, tab_sweep = st.tabs(['EUI Reduction', f'Savings vs. {sweep_label}'])
+        
+            with tab_eui:
+                st.markdown('<h4 style="text-align: center;">Energy Use Intensity (EUI) Reduction</h4>', unsafe_allow_html=True)
+                
+                render_waterfall(results['baseline_eui'], results['total_savings_kbtu_sf'], results['new_eui'])
+        
+            with tab_sweep:
+                st.markdown(f'<h4 style="text-align: center;">Annual Savings vs. {sweep_label}</h4>', unsafe_allow_html=True)
+                
+                # The sweep varies the position, so it is cached on everything else
+                sweep_inputs = {key: value for key, value in inputs.items() if key != sweep_column}
+                with stage_timer('app_sweep'):
+                    sweep = price_results(run_sweep(sweep_inputs, building_type), tariffs)
+                current_position = inputs[sweep_column]
+                x_suffix = ' hrs' if building_type == 'Office' else '%'
+                
+                fig_sweep = go.Figure()
+                fig_sweep.add_trace(go.Scatter(
+                    x=sweep[sweep_column],
+                    y=sweep['total_cost_savings'],
+                    mode='lines',
+                    line=dict(color='#2C5F6F', width=3),
+                    hovertemplate=f"%{{x:,.0f}}{x_suffix}: $%{{y:,.0f}}/yr<extra></extra>"
+                ))
+                fig_sweep.add_trace(go.Scatter(
+                    x=[current_position],
+                    y=[results['total_cost_savings']],
+                    mode='markers',
+                    marker=dict(color='#FF9800', size=12, line=dict(color='#F57C00', width=2)),
+                    hovertemplate=f"Current: %{{x:,.0f}}{x_suffix}, $%{{y:,.0f}}/yr<extra></extra>"
+                ))
+                fig_sweep.update_layout(
+                    height=320,
+                    showlegend=False,
+                    yaxis=dict(title='Annual Savings ($/yr)', title_font=dict(size=11), gridcolor='#E0E0E0', rangemode='tozero'),
+                    xaxis=dict(title=f"{sweep_label} ({'hrs/yr' if building_type == 'Office' else '%'})", title_font=dict(size=11), gridcolor='#E0E0E0'),
+                    plot_bgcolor='white',
+                    paper_bgcolor='white',
+                    margin=dict(t=30, b=80, l=60, r=20)
+                )
+                
+                with stage_timer('app_chart_render'):
+                    st.plotly_chart(fig_sweep, use_container_width=True)
+        
             st.markdown(
                 f"""<div style='background: linear-gradient(135deg, #2C5F6F 0%, #4A90A4 100%); 
                             padding: 20px; border-radius: 10px; text-align: center;
@@ -857,7 +1007,7 @@ elif st.session_state.step == 4:
                 unsafe_allow_html=True
             )
         
-        with col_cost:
+        with col_cost, stage_timer('app_html_cards'):
             st.markdown('<h4 style="text-align: center;">Annual Cost Savings</h4>', unsafe_allow_html=True)
             
             st.markdown(
@@ -895,6 +1045,10 @@ elif st.session_state.step == 4:
                 </div>""",
                 unsafe_allow_html=True
             )
+            if tariffs != (None, None):
+                priced = ' and '.join(tariff.name for tariff in tariffs if tariff is not None)
+                demand_note = f", including ${results['demand_cost_savings']:,.0f} in demand charges" if tariffs[0] else ''
+                st.caption(f"Priced with {priced}{demand_note}")
         
         st.markdown('---')
         st.markdown('<h4 style="text-align: center;">Energy Savings Breakdown</h4>', unsafe_allow_html=True)
@@ -942,7 +1096,18 @@ elif st.session_state.step == 4:
                 st.write(f"• Secondary Window Area: {inputs['csw_area']:,} SF")
                 if results['wwr']:
                     st.write(f"• Window-to-Wall Ratio: {results['wwr']:.0%}")
+        
+        st.markdown('---')
+        render_lifecycle(inputs, results)
+        
+        st.markdown('---')
+        render_uncertainty(inputs, building_type)
+        
+        st.markdown('---')
+        render_comparison(inputs, building_type, tariffs)
     
+    if METRICS.enabled:
+        METRICS.observe('app_results_page', perf_counter() - page_start)
     st.markdown("<br>", unsafe_allow_html=True)
     if st.button('← Start Over', type='secondary'):
         for key in list(st.session_state.keys()):
@@ -953,7 +1118,9 @@ elif st.session_state.step == 4:
 # Sidebar
 with st.sidebar:
     if st.session_state.step == 4:
+        from csw_engine import calculate_wwr
         building_type = st.session_state.get('building_type', 'Office')
+        state = st.session_state
         st.markdown('### 🎛️ Adjust Inputs')
         st.markdown('Modify values to see updated results:')
         st.markdown('---')
@@ -965,121 +1132,59 @@ with st.sidebar:
         st.markdown('**🏢 Building Envelope**')
         
         # Set building area limits based on building type
-        if building_type == 'Hotel':
-            min_area, max_area = 15000, 250000
-            area_help = "Hotel building area must be between 15,000 and 250,000 square feet"
-        else:  # Office
-            min_area, max_area = 15000, 500000
-            area_help = "Office building area must be between 15,000 and 500,000 square feet"
-        
-        building_area = st.number_input(
-            'Building Area (SF)', 
-            min_value=min_area, 
-            max_value=max_area, 
-            value=min(max(st.session_state.get('building_area', 75000), min_area), max_area), 
-            step=1000, 
-            key='sidebar_building_area',
-            help=area_help
-        )
-        if building_area != st.session_state.get('building_area'):
-            st.session_state.building_area = building_area
-            st.rerun()
+        min_area, max_area = BUILDING_AREA_RANGES[building_type]
+        area_help = f"{building_type} building area must be between {min_area:,} and {max_area:,} square feet"
         
-        num_floors = st.number_input(
-            'Floors', 
-            min_value=1, 
-            max_value=100, 
-            value=st.session_state.get('num_floors', 5), 
-            key='sidebar_num_floors',
-            help="Number of floors must be between 1 and 100"
-        )
-        if num_floors != st.session_state.get('num_floors'):
-            st.session_state.num_floors = num_floors
-            st.rerun()
-        
-        existing_window = st.selectbox('Existing Window', options=WINDOW_TYPES, index=WINDOW_TYPES.index(st.session_state.get('existing_window', 'Single pane')), key='sidebar_existing_window')
-        if existing_window != st.session_state.get('existing_window'):
-            st.session_state.existing_window = existing_window
-            st.rerun()
+        # Widgets are bound by key (see bind_sidebar) and report edits through sidebar_changed
+        st.number_input('Building Area (SF)', min_value=min_area, max_value=max_area, step=1000,
+                        key='sidebar_building_area', on_change=sidebar_changed, args=('building_area',), help=area_help)
+        st.number_input('Floors', min_value=NUM_FLOORS_RANGE[0], max_value=NUM_FLOORS_RANGE[1],
+                        key='sidebar_num_floors', on_change=sidebar_changed, args=('num_floors',),
+                        help="Number of floors must be between 1 and 100")
+        st.selectbox('Existing Window', options=WINDOW_TYPES, key='sidebar_existing_window',
+                     on_change=sidebar_changed, args=('existing_window',))
+        # Only Winsert Lite fits over double pane windows
+        st.selectbox('Product', options=available_csw_types(state.existing_window), key='sidebar_csw_type',
+                     on_change=sidebar_changed, args=('csw_type',))
+        st.number_input('Secondary Window Area (SF)', min_value=0,
+                        max_value=int(state.building_area * MAX_CSW_AREA_FRACTION), step=100,
+                        key='sidebar_csw_area', on_change=sidebar_changed, args=('csw_area',))
         
-        # Product type logic - limit to Winsert Lite if Double pane existing
-        if existing_window == 'Double pane':
-            csw_types_list = ['Winsert Lite']
-            csw_type_idx = 0
-        else:
-            csw_types_list = CSW_TYPES
-            csw_type_idx = 0
-            if 'csw_type' in st.session_state and st.session_state.csw_type in csw_types_list:
-                csw_type_idx = csw_types_list.index(st.session_state.csw_type)
-        
-        csw_type = st.selectbox('Product', options=csw_types_list, index=csw_type_idx, key='sidebar_csw_type')
-        if csw_type != st.session_state.get('csw_type'):
-            st.session_state.csw_type = csw_type
-            st.rerun()
-        
-        csw_area = st.number_input('Secondary Window Area (SF)', min_value=0, max_value=int(building_area * 0.5), value=min(st.session_state.get('csw_area', 12000), int(building_area * 0.5)), step=100, key='sidebar_csw_area')
-        if csw_area != st.session_state.get('csw_area'):
-            st.session_state.csw_area = csw_area
-            st.rerun()
-        
-        if csw_area > 0 and building_area > 0 and num_floors > 0:
-            wwr = calculate_wwr(csw_area, building_area, num_floors)
+        if state.csw_area > 0 and state.building_area > 0 and state.num_floors > 0:
+            wwr = calculate_wwr(state.csw_area, state.building_area, state.num_floors)
             st.text(f"WWR: {wwr:.0%}")
         
         st.markdown('---')
         
         st.markdown('**⚙️ HVAC & Utility**')
         if building_type == 'Office':
-            operating_hours = st.number_input('Operating Hours/yr', min_value=1980, max_value=8760, value=st.session_state.get('operating_hours', 8000), step=100, key='sidebar_operating_hours')
-            if operating_hours != st.session_state.get('operating_hours'):
-                st.session_state.operating_hours = operating_hours
-                st.rerun()
+            st.number_input('Operating Hours/yr', min_value=OPERATING_HOURS_RANGE[0], max_value=OPERATING_HOURS_RANGE[1],
+                            step=100, key='sidebar_operating_hours', on_change=sidebar_changed, args=('operating_hours',))
         else:  # Hotel
-            occupancy = st.slider('Occupancy %', min_value=33, max_value=100, value=st.session_state.get('occupancy_percent', 70), step=1, key='sidebar_occupancy')
-            if occupancy != st.session_state.get('occupancy_percent'):
-                st.session_state.occupancy_percent = occupancy
-                st.rerun()
+            st.slider('Occupancy %', min_value=OCCUPANCY_RANGE[0], max_value=OCCUPANCY_RANGE[1], step=1,
+                      key='sidebar_occupancy_percent', on_change=sidebar_changed, args=('occupancy_percent',))
         
         hvac_systems = OFFICE_HVAC_SYSTEMS if building_type == 'Office' else HOTEL_HVAC_SYSTEMS
-        hvac_system = st.selectbox('HVAC System', options=hvac_systems, index=hvac_systems.index(st.session_state.get('hvac_system', hvac_systems[0])), key='sidebar_hvac_system')
-        if hvac_system != st.session_state.get('hvac_system'):
-            st.session_state.hvac_system = hvac_system
-            st.rerun()
+        st.selectbox('HVAC System', options=hvac_systems, key='sidebar_hvac_system',
+                     on_change=sidebar_changed, args=('hvac_system',))
+        # Heating fuel options follow the HVAC system, as on the main page
+        st.selectbox('Heating Fuel', options=available_heating_fuels(building_type, state.hvac_system),
+                     key='sidebar_heating_fuel', on_change=sidebar_changed, args=('heating_fuel',))
+        st.selectbox('Cooling?', options=COOLING_OPTIONS, key='sidebar_cooling_installed',
+                     on_change=sidebar_changed, args=('cooling_installed',))
+        st.number_input('Electric Rate ($/kWh)', min_value=ELECTRIC_RATE_RANGE[0], max_value=ELECTRIC_RATE_RANGE[1],
+                        step=0.01, format='%.3f', key='sidebar_electric_rate', on_change=sidebar_changed,
+                        args=('electric_rate',))
+        st.number_input('Gas Rate ($/therm)', min_value=GAS_RATE_RANGE[0], max_value=GAS_RATE_RANGE[1],
+                        step=0.05, format='%.2f', key='sidebar_gas_rate', on_change=sidebar_changed,
+                        args=('gas_rate',))
         
-        # Heating fuel logic - apply same rules as main page
-        if building_type == 'Office' and hvac_system == 'Packaged VAV with electric reheat':
-            heating_fuels_list = ['Electric']
-            fuel_idx = 0
-        elif building_type == 'Hotel' and hvac_system in ['PTHP', 'PTAC']:
-            heating_fuels_list = ['Electric', 'None']
-            fuel_idx = 0
-            if 'heating_fuel' in st.session_state and st.session_state.heating_fuel in heating_fuels_list:
-                fuel_idx = heating_fuels_list.index(st.session_state.heating_fuel)
-        else:
-            heating_fuels_list = HEATING_FUELS
-            fuel_idx = 0
-            if 'heating_fuel' in st.session_state and st.session_state.heating_fuel in heating_fuels_list:
-                fuel_idx = heating_fuels_list.index(st.session_state.heating_fuel)
-        
-        heating_fuel = st.selectbox('Heating Fuel', options=heating_fuels_list, index=fuel_idx, key='sidebar_heating_fuel')
-        if heating_fuel != st.session_state.get('heating_fuel'):
-            st.session_state.heating_fuel = heating_fuel
-            st.rerun()
-        
-        cooling_installed = st.selectbox('Cooling?', options=COOLING_OPTIONS, index=COOLING_OPTIONS.index(st.session_state.get('cooling_installed', 'Yes')), key='sidebar_cooling_installed')
-        if cooling_installed != st.session_state.get('cooling_installed'):
-            st.session_state.cooling_installed = cooling_installed
-            st.rerun()
-        
-        electric_rate = st.number_input('Electric Rate ($/kWh)', min_value=0.01, max_value=1.0, value=st.session_state.get('electric_rate', 0.12), step=0.01, format='%.3f', key='sidebar_electric_rate')
-        if electric_rate != st.session_state.get('electric_rate'):
-            st.session_state.electric_rate = electric_rate
-            st.rerun()
-        
-        gas_rate = st.number_input('Gas Rate ($/therm)', min_value=0.01, max_value=10.0, value=st.session_state.get('gas_rate', 0.80), step=0.05, format='%.2f', key='sidebar_gas_rate')
-        if gas_rate != st.session_state.get('gas_rate'):
-            st.session_state.gas_rate = gas_rate
-            st.rerun()
+        for fuel, label in (('electric', 'Electric Tariff'), ('gas', 'Gas Tariff')):
+            tariffs = tariff_options(fuel)
+            if tariffs:
+                st.selectbox(label, options=[None] + list(tariffs),
+                             format_func=lambda tariff_id, tariffs=tariffs: tariff_label(tariffs, tariff_id),
+                             key=f'sidebar_{fuel}_tariff', on_change=sidebar_changed, args=(f'{fuel}_tariff',))
     else:
         st.markdown('### 📝 Summary')
         if st.session_state.step > 0:
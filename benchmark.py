@@ -0,0 +1,347 @@
+"""
+CSW Savings Calculator - Benchmark Suite
+Times the engine's hot paths and the results page, and checks for regressions
+
+Usage:
+    python benchmark.py                                  # run all, JSON to stdout
+    python benchmark.py --output results.json --only calculate_office batch_portfolio
+    python benchmark.py --save-baseline                  # store as benchmark_baseline.json
+    python benchmark.py --baseline benchmark_baseline.json --threshold 0.2
+
+Each benchmark is timed with timeit: the loop count is calibrated so one
+repeat takes at least --min-time seconds, then --repeat repeats are taken
+with garbage collection off. Inputs come from a fixed seed, so every run
+times the same work. The fastest repeat is the figure compared against the
+baseline, since it is the least disturbed by other processes; a benchmark
+more than its threshold slower than the baseline fails the run (exit 1).
+Baselines are machine-specific: save one on the machine that will compare
+against it.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from csw_engine import (
+    REFERENCE_CDD,
+    REFERENCE_HDD,
+    RegressionIndex,
+    build_lookup_config_hotel,
+    build_lookup_config_office,
+    calculate_savings,
+    calculate_savings_batch,
+    find_regression_row,
+    get_data_bundle,
+    get_regression_index,
+    get_tariffs,
+    get_weather_store,
+    load_regression_coefficients,
+    load_weather_data,
+    load_weather_store,
+    tariff_costs,
+    validate_inputs,
+)
+from load_test import random_building
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmark_baseline.json')
+DEFAULT_THRESHOLD = 0.25
+SEED = 0
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+# Each setup returns (function, items per call); setup time isn't measured.
+
+def sample_buildings(building_type, count):
+    """Validated random buildings of one type, with degree days filled in"""
+    rng = random.Random(SEED)
+    store = get_weather_store()
+    buildings = []
+    while len(buildings) < count:
+        building = random_building(rng, store)
+        if building['building_type'] == building_type:
+            buildings.append(validate_inputs(building, building_type))
+    return buildings
+
+def setup_cold_data_load():
+    def run():
+        get_data_bundle.cache_clear()
+        RegressionIndex(load_regression_coefficients())
+        load_weather_store()
+    return run, 1
+
+def setup_load_weather_data():
+    return load_weather_data, 1
+
+def setup_regression_lookup():
+    index = get_regression_index()
+    lookups = []
+    for inputs in sample_buildings('Office', 100):
+        lookups.append((build_lookup_config_office(inputs, 2912), 'Office'))
+    for inputs in sample_buildings('Hotel', 100):
+        lookups.append((build_lookup_config_hotel(inputs, 'High'), 'Hotel'))
+
+    def run():
+        for config, building_type in lookups:
+            find_regression_row(config, building_type, index)
+    return run, len(lookups)
+
+def _setup_calculation(building_type):
+    index = get_regression_index()
+    buildings = sample_buildings(building_type, 200)
+
+    def run():
+        for inputs in buildings:
+            calculate_savings(inputs, building_type, index)
+    return run, len(buildings)
+
+def setup_calculate_office():
+    return _setup_calculation('Office')
+
+def setup_calculate_hotel():
+    return _setup_calculation('Hotel')
+
+def setup_calculate_tabulated():
+    index = get_regression_index()
+    buildings = []
+    for i, inputs in enumerate(sample_buildings('Office', 200)):
+        hours = (2080, 2912, 8760)[i % 3]
+        buildings.append(dict(inputs, hdd=REFERENCE_HDD, cdd=REFERENCE_CDD, operating_hours=hours))
+
+    def run():
+        for inputs in buildings:
+            calculate_savings(inputs, 'Office', index)
+    return run, len(buildings)
+
+def setup_weather_resolve():
+    store = get_weather_store()
+    rng = random.Random(SEED)
+    positions = rng.sample(range(len(store)), 200)
+    queries = []
+    for i in positions:
+        state, city = store.states[i], store.cities[i]
+        queries.append((city, state))                        # exact label
+        queries.append((city.upper().replace('St.', 'Saint'), state.strip().lower()))  # normalized
+        queries.append((city[:-1] + 'x', state))            # misspelled, fuzzy
+
+    def run():
+        for city, state in queries:
+            store.resolve(city, state)
+    return run, len(queries)
+
+def setup_batch_portfolio():
+    rng = random.Random(SEED)
+    store = get_weather_store()
+    frame = pd.DataFrame([random_building(rng, store) for _ in range(2000)])
+    frame = pd.concat([frame] * 50, ignore_index=True)
+    frame['hdd'], frame['cdd'] = store.degree_days(frame['city'], frame['state'])
+    index = get_regression_index()
+
+    def run():
+        calculate_savings_batch(frame, index=index)
+    return run, len(frame)
+
+def setup_tariff_pricing():
+    rng = random.Random(SEED)
+    store = get_weather_store()
+    frame = pd.DataFrame([random_building(rng, store) for _ in range(2000)])
+    frame['hdd'], frame['cdd'] = store.degree_days(frame['city'], frame['state'])
+    results = calculate_savings_batch(frame, index=get_regression_index())
+    tariffs = get_tariffs()
+    electric, gas = tariffs['example_commercial_tou'], tariffs['example_gas_declining_block']
+
+    def run():
+        tariff_costs(results, electric, gas)
+    return run, len(results)
+
+def _results_page():
+    """AppTest of app.py, run once on the step-4 results page"""
+    from streamlit.testing.v1 import AppTest
+
+    # Deprecation and bare-mode notices on every run would bury the report
+    for name in ('streamlit.deprecation_util', 'streamlit.runtime.scriptrunner_utils.script_run_context'):
+        logging.getLogger(name).disabled = True
+
+    app = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=120)
+    app.session_state.step = 4
+    app.session_state.building_type = 'Office'
+    app.session_state.hvac_system = 'Other'
+    app.run()
+    if app.exception:
+        raise RuntimeError(f"app.py raised during setup: {app.exception[0].message}")
+    return app
+
+def setup_app_rerun():
+    return _results_page().run, 1
+
+def setup_app_sidebar_edit():
+    app = _results_page()
+    areas = itertools.cycle([80000, 75000])
+
+    def run():
+        app.number_input(key='sidebar_building_area').set_value(next(areas)).run()
+    return run, 1
+
+def setup_app_cold_start():
+    from startup_report import measure_startup
+
+    def run():
+        measure_startup(runs=1, steps=[0])
+    return run, 1
+
+# name: (description, setup, default threshold)
+BENCHMARKS = {
+    'cold_data_load': ('Map the data bundle (or read the CSVs), build the regression index and weather store',
+                       setup_cold_data_load, 0.5),
+    'load_weather_data': ('Weather table to the nested {state: {city}} dict', setup_load_weather_data, 0.5),
+    'regression_lookup': ('find_regression_row for 200 Office/Hotel configurations', setup_regression_lookup, DEFAULT_THRESHOLD),
+    'calculate_office': ('calculate_savings for 200 Office buildings', setup_calculate_office, DEFAULT_THRESHOLD),
+    'calculate_hotel': ('calculate_savings for 200 Hotel buildings', setup_calculate_hotel, DEFAULT_THRESHOLD),
+    'calculate_tabulated': ('calculate_savings for 200 Office buildings served from savings_lookup',
+                            setup_calculate_tabulated, DEFAULT_THRESHOLD),
+    'weather_resolve': ('Exact, normalized and fuzzy city resolution, 600 queries', setup_weather_resolve, DEFAULT_THRESHOLD),
+    'batch_portfolio': ('calculate_savings_batch over 100,000 mixed buildings', setup_batch_portfolio, DEFAULT_THRESHOLD),
+    'tariff_pricing': ('TOU, demand and block tariffs for 2,000 mixed buildings', setup_tariff_pricing,
+                       DEFAULT_THRESHOLD),
+    'app_rerun': ('Headless rerun of the step-4 results page', setup_app_rerun, 0.5),
+    'app_sidebar_edit': ('Edit the building area in the step-4 sidebar (one script run per edit)',
+                         setup_app_sidebar_edit, 0.5),
+    'app_cold_start': ('Fresh process: import Streamlit and render the first page', setup_app_cold_start, 0.5),
+}
+
+# ============================================================================
+# TIMING
+# ============================================================================
+
+def time_benchmark(name, repeat, min_time):
+    """Timing record for one benchmark"""
+    description, setup, _ = BENCHMARKS[name]
+    function, items = setup()
+    timer = timeit.Timer(function)
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time:
+            break
+        number *= 2
+    timings = [seconds / number for seconds in timer.repeat(repeat, number)]
+    return {
+        'description': description,
+        'items': items,
+        'number': number,
+        'repeat': repeat,
+        'min': min(timings),
+        'median': float(np.median(timings)),
+        'per_item_min': min(timings) / items,
+        'timings': timings,
+    }
+
+def environment():
+    """Where and on what the numbers were taken"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+def compare(results, baseline, threshold=None):
+    """(name, ratio, limit, regressed) for benchmarks present in both runs"""
+    rows = []
+    for name, record in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            continue
+        limit = threshold if threshold is not None else BENCHMARKS[name][2]
+        ratio = record['min'] / previous['min']
+        rows.append((name, ratio, limit, ratio > 1 + limit))
+    return rows
+
+def format_seconds(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('µs', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the CSW savings calculator.')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), metavar='NAME',
+                        help=f"Benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument('--repeat', type=int, default=7, help='Timed repeats per benchmark (default: 7)')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='Minimum seconds per repeat when calibrating (default: 0.2)')
+    parser.add_argument('--output', help='Write JSON results here instead of stdout')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help='Baseline JSON to compare against (default: benchmark_baseline.json)')
+    parser.add_argument('--threshold', type=float,
+                        help='Allowed slowdown as a fraction for every benchmark (default: per benchmark, '
+                             f'mostly {DEFAULT_THRESHOLD})')
+    parser.add_argument('--save-baseline', action='store_true', help='Write these results as the baseline')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    names = args.only or list(BENCHMARKS)
+    results = {}
+    for name in names:
+        results[name] = time_benchmark(name, args.repeat, args.min_time)
+        record = results[name]
+        print(f"{name:<20} {format_seconds(record['min']):>10}/call  "
+              f"{format_seconds(record['per_item_min']):>10}/item  (median {format_seconds(record['median'])})",
+              file=sys.stderr)
+    report = {'environment': environment(), 'results': results}
+
+    baseline_path = args.baseline
+    rows = []
+    if not args.save_baseline and os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            rows = compare(results, json.load(f), args.threshold)
+        report['comparison'] = {
+            'baseline': baseline_path,
+            'benchmarks': {name: {'ratio': ratio, 'threshold': limit, 'regressed': regressed}
+                           for name, ratio, limit, regressed in rows},
+        }
+        for name, ratio, limit, regressed in rows:
+            print(f"{name:<20} {ratio:6.2f}x baseline (limit {1 + limit:.2f}x){'  REGRESSED' if regressed else ''}",
+                  file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    if args.save_baseline:
+        with open(baseline_path, 'w') as f:
+            f.write(output + '\n')
+        print(f"Baseline saved to {baseline_path}", file=sys.stderr)
+
+    if any(regressed for *_, regressed in rows):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
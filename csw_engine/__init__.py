@@ -0,0 +1,209 @@
+"""
+CSW Savings Calculator - Calculation Engine
+Pure-Python engine (no Streamlit) shared by the web app, batch jobs and workers
+
+Exports are resolved lazily: each name's submodule is imported on first
+access, so code that only needs the constants, exceptions or metrics
+(like the app's first page) doesn't pay for importing pandas and NumPy.
+"""
+
+import importlib
+
+# Submodule defining each public name
+_EXPORTS = {
+    'constants': [
+        'OFFICE_HVAC_SYSTEMS',
+        'HOTEL_HVAC_SYSTEMS',
+        'HEATING_FUELS',
+        'COOLING_OPTIONS',
+        'WINDOW_TYPES',
+        'CSW_TYPES',
+        'CSW_TYPE_MAPPING',
+        'COOLING_MULT_COEFFICIENTS_OFFICE',
+        'BUILDING_AREA_RANGES',
+        'NUM_FLOORS_RANGE',
+        'MAX_CSW_AREA_FRACTION',
+        'ELECTRIC_RATE_RANGE',
+        'GAS_RATE_RANGE',
+        'OPERATING_HOURS_RANGE',
+        'OCCUPANCY_RANGE',
+        'available_csw_types',
+        'available_heating_fuels',
+    ],
+    'exceptions': [
+        'EngineError',
+        'DataFileError',
+        'WeatherFileError',
+        'TariffError',
+        'CoefficientNotFoundError',
+        'InputValidationError',
+    ],
+    'data': [
+        'DATA_DIR',
+        'load_weather_data',
+        'load_weather_frame',
+        'load_weather_store',
+        'get_weather_store',
+        'get_station_locator',
+        'load_regression_coefficients',
+        'get_regression_coefficients',
+        'get_regression_index',
+        'load_savings_lookup',
+        'get_savings_lookup',
+        'source_checksums',
+        'build_data_bundle',
+        'get_data_bundle',
+    ],
+    'bundle': [
+        'DataBundle',
+        'BUNDLE_FILE',
+        'BUNDLE_VERSION',
+    ],
+    'regression_index': [
+        'RegressionIndex',
+        'Coefficients',
+    ],
+    'calculations': [
+        'calculate_wwr',
+        'calculate_cooling_multiplier_office',
+        'build_lookup_config_office',
+        'build_lookup_config_hotel',
+        'build_baseline_config_hotel',
+        'find_regression_row',
+        'find_baseline_eui_row',
+        'calculate_from_regression',
+        'interpolate_values',
+        'Intensity',
+        'config_key',
+        'scale_savings',
+        'calculate_intensity_office',
+        'calculate_intensity_hotel',
+        'calculate_intensity',
+        'calculate_savings_office',
+        'calculate_savings_hotel',
+        'calculate_savings',
+    ],
+    'batch': [
+        'calculate_savings_batch',
+        'RESULT_COLUMNS',
+    ],
+    'weather': [
+        'WeatherStore',
+        'normalize_name',
+        'normalize_state',
+    ],
+    'weather_files': [
+        'HourlyWeather',
+        'SiteDegreeDays',
+        'degree_days',
+        'site_degree_days',
+        'read_weather_file',
+        'ingest',
+        'stations_frame',
+    ],
+    'spatial': [
+        'StationLocator',
+    ],
+    'savings_lookup': [
+        'SavingsLookup',
+        'cross_check',
+        'lookup_key',
+        'REFERENCE_HDD',
+        'REFERENCE_CDD',
+    ],
+    'cube': [
+        'SavingsCube',
+        'get_savings_cube',
+    ],
+    'sweep': [
+        'sensitivity_sweep',
+        'sweep_positions',
+        'SWEEP_RANGES',
+    ],
+    'compare': [
+        'compare_savings',
+        'summarize_by_state',
+        'product_options',
+    ],
+    'uncertainty': [
+        'monte_carlo_savings',
+        'UNCERTAINTY_METRICS',
+        'DEFAULT_SPREAD',
+    ],
+    'lifecycle': [
+        'calculate_lifecycle',
+        'calculate_lifecycle_batch',
+        'cash_flows',
+        'discount_factors',
+        'LIFECYCLE_COLUMNS',
+        'LIFECYCLE_DEFAULTS',
+        'LIFECYCLE_YEARS',
+        'LIFECYCLE_YEARS_RANGE',
+    ],
+    'load_shape': [
+        'LOAD_SHAPE_RESOLUTIONS',
+        'LoadShapeWriter',
+        'climate_shapes',
+        'degree_hour_shapes',
+        'design_temperatures',
+        'disaggregate',
+        'load_shape_dtype',
+    ],
+    'tariffs': [
+        'TARIFF_COLUMNS',
+        'Tariff',
+        'apply_tariffs',
+        'get_tariffs',
+        'load_tariff',
+        'load_tariffs',
+        'resolve_tariff',
+        'tariff_costs',
+    ],
+    'cache': [
+        'ResultCache',
+        'CacheStats',
+        'result_cache_key',
+        'intensity_cache_key',
+    ],
+    'shared_cache': [
+        'SQLiteCache',
+        'TieredCache',
+        'open_cache',
+        'shared_store',
+        'data_version',
+        'code_fingerprint',
+        'cache_version',
+        'stable_key',
+    ],
+    'validation': [
+        'validate_inputs',
+        'BUILDING_TYPES',
+    ],
+    'metrics': [
+        'METRICS',
+        'INSTRUMENTED',
+        'MetricsRegistry',
+        'Histogram',
+        'StageStats',
+        'enable_metrics',
+        'disable_metrics',
+        'stage_timer',
+        'timed',
+        'caches_to_prometheus',
+    ],
+}
+
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = list(_MODULES)
+
+def __getattr__(name):
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,279 @@
+"""
+Vectorized batch calculations for whole portfolios of buildings
+
+Rows are grouped by regression key (building type, window/product, HVAC,
+fuel, size and hours bracket). Coefficients are resolved once per group
+through the same lookup as the scalar path, then the quadratic regression,
+clamped interpolation and cooling multiplier run as NumPy array operations.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .calculations import (
+    build_lookup_config_office,
+    build_lookup_config_hotel,
+    build_baseline_config_hotel,
+    find_regression_row,
+    find_baseline_eui_row,
+)
+from .constants import COOLING_MULT_COEFFICIENTS_OFFICE
+from .data import get_regression_index
+from .exceptions import CoefficientNotFoundError
+from .metrics import timed
+
+RESULT_COLUMNS = [
+    'electric_savings_kwh',
+    'gas_savings_therms',
+    'electric_cost_savings',
+    'gas_cost_savings',
+    'total_cost_savings',
+    'total_savings_kbtu_sf',
+    'baseline_eui',
+    'new_eui',
+    'percent_eui_savings',
+    'wwr',
+    'hdd',
+    'cdd',
+    'heating_per_sf',
+    'cooling_per_sf',
+    'gas_per_sf',
+]
+
+# Columns that select the regression rows for a building
+GROUP_COLUMNS = [
+    'building_type',
+    'existing_window',
+    'csw_type',
+    'hvac_system',
+    'heating_fuel',
+    'is_large',
+    'hours_bracket',
+]
+
+# Per-group coefficient slots: CSW high/low and baseline high/low
+_SLOTS = 4
+_COEFFS = 6
+
+# ============================================================================
+# ARRAY HELPERS
+# ============================================================================
+
+def regression_array(a, b, c, degree_days):
+    """Vectorized value = a + b*DD + c*DD²"""
+    return a + b * degree_days + c * (degree_days ** 2)
+
+def interpolate_array(value_param, val_high, val_low, param_high, param_low):
+    """Vectorized interpolate_values, clamped to the low/high values"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mid = ((value_param - param_low) / (param_high - param_low)) * (val_high - val_low) + val_low
+    return np.where(value_param <= param_low, val_low, np.where(value_param >= param_high, val_high, mid))
+
+def cooling_multiplier_array(cdd, is_large):
+    """Vectorized calculate_cooling_multiplier_office for Mid/Large sizes"""
+    result = np.empty_like(cdd, dtype=float)
+    for size, mask in (('Large', is_large), ('Mid', ~is_large)):
+        coeffs = COOLING_MULT_COEFFICIENTS_OFFICE[size]
+        x = cdd[mask]
+        result[mask] = coeffs['a'] + coeffs['b'] * x + coeffs['c'] * (x ** 2) + coeffs['d'] * (x ** 3)
+    return np.clip(result, 0.0, 1.0)
+
+def wwr_array(csw_area, building_area, num_floors):
+    """Vectorized calculate_wwr; NaN where the scalar path returns None"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        wall_area = np.sqrt(building_area / num_floors) * 4 * 15 * num_floors
+        wwr = np.where(wall_area > 0, csw_area / wall_area, 0.0)
+    return np.where((csw_area > 0) & (num_floors > 0), wwr, np.nan)
+
+def scale_savings_array(frame, c31, c32, c33, baseline_eui, hdd, cdd):
+    """Vectorized scale_savings: per-SF arrays to a results DataFrame"""
+    building_area = frame['building_area'].to_numpy(dtype=float)
+    csw_area = frame['csw_area'].to_numpy(dtype=float)
+    num_floors = frame['num_floors'].to_numpy(dtype=float)
+    electric_savings_kwh = (c31 + c32) * csw_area
+    gas_savings_therms = c33 * csw_area
+    electric_cost_savings = electric_savings_kwh * frame['electric_rate'].to_numpy(dtype=float)
+    gas_cost_savings = gas_savings_therms * frame['gas_rate'].to_numpy(dtype=float)
+    total_savings_kbtu_sf = (electric_savings_kwh * 3.413 + gas_savings_therms * 100) / building_area
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent = np.where(baseline_eui > 0, total_savings_kbtu_sf / baseline_eui * 100, 0.0)
+    percent[np.isnan(baseline_eui)] = np.nan
+
+    return pd.DataFrame({
+        'electric_savings_kwh': electric_savings_kwh,
+        'gas_savings_therms': gas_savings_therms,
+        'electric_cost_savings': electric_cost_savings,
+        'gas_cost_savings': gas_cost_savings,
+        'total_cost_savings': electric_cost_savings + gas_cost_savings,
+        'total_savings_kbtu_sf': total_savings_kbtu_sf,
+        'baseline_eui': baseline_eui,
+        'new_eui': baseline_eui - total_savings_kbtu_sf,
+        'percent_eui_savings': percent,
+        'wwr': wwr_array(csw_area, building_area, num_floors),
+        'hdd': hdd,
+        'cdd': cdd,
+        'heating_per_sf': c31,
+        'cooling_per_sf': c32,
+        'gas_per_sf': c33,
+    }, index=frame.index)
+
+# ============================================================================
+# GROUP RESOLUTION
+# ============================================================================
+
+def _resolve_group(building_type, inputs, index):
+    """Look up the four coefficient rows for one regression group"""
+    if building_type == 'Office':
+        hours_high = 8760 if inputs['operating_hours'] > 2912 else 2912
+        hours_low = 2912 if hours_high == 8760 else 2080
+        config_high = build_lookup_config_office(inputs, hours_high)
+        config_low = build_lookup_config_office(inputs, hours_low)
+        rows = (
+            find_regression_row(config_high, 'Office', index),
+            find_regression_row(config_low, 'Office', index),
+            find_baseline_eui_row(config_high, 'Office', index),
+            find_baseline_eui_row(config_low, 'Office', index),
+        )
+        return rows, hours_high, hours_low, config_high['size'] == 'Large'
+
+    if building_type == 'Hotel':
+        rows = (
+            find_regression_row(build_lookup_config_hotel(inputs, 'High'), 'Hotel', index),
+            find_regression_row(build_lookup_config_hotel(inputs, 'Low'), 'Hotel', index),
+            find_baseline_eui_row(build_baseline_config_hotel(inputs, 'High'), 'Hotel', index),
+            find_baseline_eui_row(build_baseline_config_hotel(inputs, 'Low'), 'Hotel', index),
+        )
+        return rows, 100, 33, False
+
+    raise ValueError(f"Unknown building type: {building_type}")
+
+def _group_codes(columns):
+    """Group id per row for a set of key columns, plus each group's first row"""
+    combined = np.zeros(len(columns[0]), dtype=np.int64)
+    factorized = []
+    for values in columns:
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        combined = combined * max(len(uniques), 1) + codes
+        factorized.append((codes, uniques.tolist()))
+    _, first_rows, group_ids = np.unique(combined, return_index=True, return_inverse=True)
+    groups = [tuple(uniques[codes[row]] for codes, uniques in factorized) for row in first_rows]
+    return group_ids, groups
+
+def broadcast_frame(inputs, n):
+    """
+    DataFrame repeating one inputs dict n times.
+
+    Strings become single-category categoricals and numbers float arrays,
+    which is far cheaper to build and to group than n copies of each value.
+    """
+    columns = {}
+    for key, value in inputs.items():
+        if isinstance(value, str):
+            columns[key] = pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), [value])
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            columns[key] = np.full(n, value, dtype=float)
+        else:
+            columns[key] = np.full(n, value, dtype=object)
+    return pd.DataFrame(columns)
+
+def _column(frame, name, default, n):
+    """Float array for a column, or a constant when the column is absent"""
+    if name in frame:
+        return frame[name].to_numpy(dtype=float)
+    return np.full(n, default, dtype=float)
+
+# ============================================================================
+# BATCH CALCULATION
+# ============================================================================
+
+@timed('batch_calculation')
+def calculate_savings_batch(inputs, building_type=None, index=None, errors='raise'):
+    """
+    Calculate savings for many buildings at once.
+
+    inputs is a DataFrame (or a mapping of equal-length arrays) with the same
+    fields as the scalar inputs dict. building_type applies to every row;
+    otherwise a 'building_type' column is required. With errors='coerce',
+    rows whose configuration has no regression coefficients get NaN results
+    instead of raising CoefficientNotFoundError.
+    """
+    if errors not in ('raise', 'coerce'):
+        raise ValueError("errors must be 'raise' or 'coerce'")
+    if index is None:
+        index = get_regression_index()
+
+    frame = inputs if isinstance(inputs, pd.DataFrame) else pd.DataFrame(inputs)
+    n = len(frame)
+    if n == 0:
+        return pd.DataFrame(columns=RESULT_COLUMNS, index=frame.index, dtype=float)
+
+    if building_type is not None:
+        types = pd.Series(building_type, index=frame.index)
+    else:
+        types = frame['building_type']
+    is_office = (types == 'Office').to_numpy()
+
+    building_area = frame['building_area'].to_numpy(dtype=float)
+    hours = _column(frame, 'operating_hours', 0, n)
+    occupancy = _column(frame, 'occupancy_percent', 0, n)
+
+    keys = {
+        'building_type': types,
+        'existing_window': frame['existing_window'],
+        'csw_type': frame['csw_type'],
+        'hvac_system': frame['hvac_system'],
+        'heating_fuel': frame['heating_fuel'],
+        'is_large': is_office & (building_area > 30000),
+        'hours_bracket': is_office & (hours > 2912),
+    }
+    codes, groups = _group_codes([keys[column] for column in GROUP_COLUMNS])
+
+    # Resolve coefficients once per group into (groups, slots, coeffs) arrays
+    n_groups = len(groups)
+    table = np.full((n_groups, _SLOTS, _COEFFS), np.nan)
+    param_high = np.empty(n_groups)
+    param_low = np.empty(n_groups)
+    cooling_large = np.zeros(n_groups, dtype=bool)
+    for g, group in enumerate(groups):
+        group_inputs = dict(zip(GROUP_COLUMNS, group))
+        group_inputs['building_area'] = 30001 if group_inputs['is_large'] else 0
+        group_inputs['operating_hours'] = 8760 if group_inputs['hours_bracket'] else 0
+        rows, param_high[g], param_low[g], cooling_large[g] = _resolve_group(
+            group_inputs['building_type'], group_inputs, index
+        )
+        if any(row is None for row in rows):
+            if errors == 'raise':
+                raise CoefficientNotFoundError(
+                    f"Could not find {group_inputs['building_type']} regression coefficients "
+                    f"for {group_inputs}"
+                )
+            continue
+        table[g] = rows
+
+    hdd = _column(frame, 'hdd', 0, n)
+    cdd = _column(frame, 'cdd', 0, n)
+    x = np.where(is_office, hours, occupancy)
+    x_high = param_high[codes]
+    x_low = param_low[codes]
+
+    def regression(slot, heating):
+        offset = 0 if heating else 3
+        dd = hdd if heating else cdd
+        a, b, c = (table[:, slot, offset + k][codes] for k in range(3))
+        return regression_array(a, b, c, dd)
+
+    is_gas = (frame['heating_fuel'] == 'Natural Gas').to_numpy()
+    heating = interpolate_array(x, regression(0, True), regression(1, True), x_high, x_low)
+    c31 = np.where(is_gas, 0.0, heating)
+    c33 = np.where(is_gas, heating, 0.0)
+    c32_base = interpolate_array(x, regression(0, False), regression(1, False), x_high, x_low)
+
+    # Office scales cooling by the CDD multiplier; Hotel drops it without cooling
+    has_cooling = (frame['cooling_installed'] == 'Yes').to_numpy()
+    office_multiplier = np.where(has_cooling, 1.0, cooling_multiplier_array(cdd, cooling_large[codes]))
+    hotel_multiplier = np.where(has_cooling, 1.0, 0.0)
+    c32 = c32_base * np.where(is_office, office_multiplier, hotel_multiplier)
+
+    baseline_eui = interpolate_array(x, regression(2, True), regression(3, True), x_high, x_low)
+
+    return scale_savings_array(frame, c31, c32, c33, baseline_eui, hdd, cdd)
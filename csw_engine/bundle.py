@@ -0,0 +1,216 @@
+"""
+Binary data bundle: every data table in one memory-mapped file
+
+The weather, regression and savings lookup CSVs are compiled into a single
+file holding a JSON header and one aligned, typed column buffer per CSV
+column. Numeric columns keep the dtype pandas parsed at build time, and text
+columns are dictionary-encoded as integer codes, with -1 for a blank cell.
+Loading is a memory map plus a few array views, so there are no CSV dialect
+or dtype-inference questions at startup. Tables are DataFrames over the
+mapped buffers, so worker processes on one machine share the pages of every
+numeric column; a column is only copied into the process once something
+modifies it. Text columns are decoded into per-process string arrays.
+
+The header records a format version, the SHA-256 of the column buffers and
+the checksums of the source CSVs. A bundle whose version or payload checksum
+doesn't match is rejected, and so is one built from different CSVs. Callers
+then fall back to parsing the CSVs.
+
+Build with:
+    python -m csw_engine.bundle
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+import pandas as pd
+
+BUNDLE_VERSION = 1
+BUNDLE_FILE = 'data_bundle.bin'
+
+MAGIC = b'CSWDATA\x00'
+ALIGNMENT = 64
+_LENGTH = struct.Struct('<Q')
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def _code_dtype(n_categories):
+    return np.dtype('<i2') if n_categories < 2 ** 15 else np.dtype('<i4')
+
+# ============================================================================
+# ENCODING
+# ============================================================================
+
+def encode_column(series):
+    """(column header, buffer bytes) for one DataFrame column"""
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        values = np.ascontiguousarray(series.to_numpy())
+        values = values.astype(values.dtype.newbyteorder('<'), copy=False)
+        return {'name': series.name, 'kind': 'numeric', 'dtype': values.dtype.str}, values.tobytes()
+    codes, categories = pd.factorize(series, use_na_sentinel=True)
+    codes = codes.astype(_code_dtype(len(categories)))
+    header = {
+        'name': series.name,
+        'kind': 'text',
+        'dtype': codes.dtype.str,
+        'categories': [str(value) for value in categories],
+    }
+    return header, codes.tobytes()
+
+def decode_column(column, buffer, offset, rows):
+    """Array for a column header over the mapped buffer"""
+    values = np.frombuffer(buffer, dtype=np.dtype(column['dtype']), count=rows, offset=offset)
+    if column['kind'] == 'numeric':
+        return values
+    # A trailing NaN makes code -1 read back as a blank cell
+    categories = np.array(column['categories'] + [np.nan], dtype=object)
+    return categories[values]
+
+# ============================================================================
+# DATA BUNDLE
+# ============================================================================
+
+class DataBundle:
+    """Named tables decoded from a bundle file (or held in memory after build)"""
+
+    def __init__(self, tables, checksums=None, payload_sha256=None):
+        self._tables = tables
+        self._frames = {}
+        self.checksums = checksums or {}
+        self.payload_sha256 = payload_sha256
+
+    @property
+    def names(self):
+        return list(self._tables)
+
+    def table(self, name):
+        """A new DataFrame for table name, safe for the caller to modify"""
+        if name not in self._frames:
+            self._frames[name] = pd.DataFrame(self._tables[name], copy=False)
+        # The bundle keeps the base frame alive, so copy-on-write copies a
+        # column before any write instead of writing into the read-only map
+        return self._frames[name].copy(deep=False)
+
+    # ------------------------------------------------------------------
+    # Build / persist
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_frames(cls, frames, checksums=None):
+        """Bundle holding copies of {name: DataFrame}"""
+        tables = {
+            name: {column: frame[column].to_numpy(copy=True) for column in frame.columns}
+            for name, frame in frames.items()
+        }
+        return cls(tables, checksums)
+
+    def save(self, path):
+        """Write the header and aligned column buffers; returns the path"""
+        tables, buffers, offset = {}, [], 0
+        for name in self._tables:
+            frame = self.table(name)
+            columns = []
+            for column_name in frame.columns:
+                column, data = encode_column(frame[column_name])
+                offset = _aligned(offset)
+                column['offset'] = offset
+                columns.append(column)
+                buffers.append((offset, data))
+                offset += len(data)
+            tables[name] = {'rows': len(frame), 'columns': columns}
+
+        payload = bytearray(offset)
+        for start, data in buffers:
+            payload[start:start + len(data)] = data
+        self.payload_sha256 = hashlib.sha256(payload).hexdigest()
+        header = json.dumps({
+            'version': BUNDLE_VERSION,
+            'checksums': self.checksums,
+            'payload_sha256': self.payload_sha256,
+            'payload_size': len(payload),
+            'tables': tables,
+        }).encode()
+        payload_offset = _aligned(len(MAGIC) + _LENGTH.size + len(header))
+
+        # Written under a temporary name and renamed, so readers never map a partial file
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as f:
+            f.write(MAGIC + _LENGTH.pack(len(header)) + header)
+            f.write(b'\0' * (payload_offset - f.tell()))
+            f.write(payload)
+        os.replace(temporary, path)
+        return path
+
+    @classmethod
+    def load(cls, path, checksums=None, verify=True):
+        """
+        Map a saved bundle, or return None if it is missing, damaged or stale.
+
+        checksums maps source file names to their current checksums; a
+        bundle built from different files is stale. Sources absent from
+        checksums aren't compared, so a deployment may ship the bundle alone.
+        verify=False skips hashing the payload.
+        """
+        try:
+            with open(path, 'rb') as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):  # ValueError: empty file
+            return None
+
+        prefix = len(MAGIC) + _LENGTH.size
+        if len(mapping) < prefix or mapping[:len(MAGIC)] != MAGIC:
+            return None
+        (header_size,) = _LENGTH.unpack(mapping[len(MAGIC):prefix])
+        try:
+            header = json.loads(mapping[prefix:prefix + header_size])
+        except ValueError:
+            return None
+        if header.get('version') != BUNDLE_VERSION:
+            return None
+        for name, checksum in (checksums or {}).items():
+            if header['checksums'].get(name) != checksum:
+                return None
+
+        payload_offset = _aligned(prefix + header_size)
+        payload = memoryview(mapping)[payload_offset:payload_offset + header['payload_size']]
+        if len(payload) != header['payload_size']:
+            return None
+        if verify and hashlib.sha256(payload).hexdigest() != header['payload_sha256']:
+            return None
+
+        tables = {
+            name: {
+                column['name']: decode_column(column, payload, column['offset'], table['rows'])
+                for column in table['columns']
+            }
+            for name, table in header['tables'].items()
+        }
+        return cls(tables, header['checksums'], header['payload_sha256'])
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def main(argv=None):
+    from .data import build_data_bundle
+
+    parser = argparse.ArgumentParser(description='Compile the data CSVs into one binary bundle.')
+    parser.add_argument('--output', default=None,
+                        help=f'Output path (default: {BUNDLE_FILE} in the data directory)')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    path = build_data_bundle(args.output)
+    bundle = DataBundle.load(path)
+    tables = ', '.join(f"{name} ({len(bundle.table(name))} rows)" for name in bundle.names)
+    print(f"{tables} -> {path} ({os.path.getsize(path) / 1e3:.1f} kB, {time.perf_counter() - start:.2f}s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Bounded, thread-safe LRU cache for calculation results
+
+Results are keyed on the normalized inputs that affect them, so revisiting a
+combination (toggling a sidebar value back, another session asking for the
+same building) returns the stored result without recalculating. One cache is
+meant to be shared by every session in a server process.
+
+intensity_cache_key covers only the regression stage (configuration, degree
+days, hours/occupancy), so caching Intensity tuples under it lets area and
+rate edits reuse the regression work and pay only for scale_savings.
+"""
+
+import threading
+from collections import OrderedDict, namedtuple
+from numbers import Number
+
+from .calculations import config_key
+
+DEFAULT_CACHE_SIZE = 4096
+
+# Inputs that determine the results; location enters through hdd/cdd
+KEY_FIELDS = [
+    'hdd',
+    'cdd',
+    'building_area',
+    'num_floors',
+    'hvac_system',
+    'heating_fuel',
+    'cooling_installed',
+    'existing_window',
+    'csw_type',
+    'csw_area',
+    'electric_rate',
+    'gas_rate',
+]
+
+# Interpolation position per building type
+POSITION_FIELDS = {'Office': 'operating_hours', 'Hotel': 'occupancy_percent'}
+
+_KEY_FIELDS_BY_TYPE = {
+    building_type: KEY_FIELDS + [position] for building_type, position in POSITION_FIELDS.items()
+}
+
+# Numbers as float (so 75000 and 75000.0 match), strings trimmed
+_NORMALIZERS = {str: str.strip, float: float, int: float, bool: bool, type(None): lambda value: value}
+
+CacheStats = namedtuple('CacheStats', ['hits', 'misses', 'evictions', 'size', 'maxsize'])
+
+def _normalize_value(value):
+    normalize = _NORMALIZERS.get(type(value))
+    if normalize is not None:
+        return normalize(value)
+    if isinstance(value, Number) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+def result_cache_key(inputs, building_type):
+    """Hashable key for an inputs dict, ignoring fields that don't affect results"""
+    fields = _KEY_FIELDS_BY_TYPE.get(building_type, KEY_FIELDS)
+    return (building_type, *[_normalize_value(inputs.get(field)) for field in fields])
+
+
+def intensity_cache_key(inputs, building_type):
+    """Key for the intensity stage: configuration, degree days and hours/occupancy"""
+    position = POSITION_FIELDS.get(building_type)
+    return config_key(inputs, building_type) + (
+        _normalize_value(inputs.get('hdd')),
+        _normalize_value(inputs.get('cdd')),
+        _normalize_value(inputs.get(position)),
+    )
+
+def _copy(value):
+    """Dicts are copied in and out so callers can't mutate cached entries"""
+    return dict(value) if isinstance(value, dict) else value
+
+
+class ResultCache:
+    """LRU mapping of keys to results, with hit/miss/eviction counters"""
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """Cached results for key, or None; counts a hit or miss"""
+        with self._lock:
+            results = self._data.get(key)
+            if results is None:
+                self._misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._hits += 1
+        return _copy(results)
+
+    def put(self, key, results):
+        """Store results for key, evicting the least recently used entries"""
+        with self._lock:
+            self._data[key] = _copy(results)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Cached results for key, or compute() stored and returned.
+
+        compute runs outside the lock, so concurrent misses on the same key
+        may both calculate; exceptions propagate and nothing is stored.
+        """
+        results = self.get(key)
+        if results is None:
+            results = compute()
+            if results is not None:
+                self.put(key, results)
+        return results
+
+    def stats(self):
+        """Snapshot of the counters"""
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._evictions, len(self._data), self.maxsize)
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._data.clear()
+            self._hits = self._misses = self._evictions = 0
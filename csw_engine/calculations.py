@@ -0,0 +1,398 @@
+"""
+Savings calculations for Office and Hotel buildings
+"""
+
+from collections import namedtuple
+
+from .constants import CSW_TYPE_MAPPING, COOLING_MULT_COEFFICIENTS_OFFICE
+from .data import get_regression_index, get_savings_lookup
+from .exceptions import CoefficientNotFoundError
+from .metrics import timed
+from .regression_index import ANY_FUEL, is_blank
+
+# Per-SF results of the regression stage, before area and rates are applied
+Intensity = namedtuple('Intensity', ['heating_per_sf', 'cooling_per_sf', 'gas_per_sf', 'baseline_eui'])
+
+# The only Office HVAC system with a separate Large (> 30,000 SF) regression
+LARGE_OFFICE_HVAC = 'Built-up VAV with hydronic reheat'
+
+# ============================================================================
+# HELPER FUNCTIONS
+# ============================================================================
+
+def calculate_wwr(csw_area, building_area, num_floors):
+    """Calculate Window-to-Wall Ratio"""
+    if num_floors == 0 or building_area == 0:
+        return 0
+    floor_area = building_area / num_floors
+    wall_area = (floor_area ** 0.5) * 4 * 15 * num_floors
+    return csw_area / wall_area if wall_area > 0 else 0
+
+def calculate_cooling_multiplier_office(cdd, building_size):
+    """Calculate cooling adjustment multiplier for Office based on CDD"""
+    coeffs = COOLING_MULT_COEFFICIENTS_OFFICE[building_size]
+    a, b, c, d = coeffs['a'], coeffs['b'], coeffs['c'], coeffs['d']
+    multiplier = a + b * cdd + c * (cdd ** 2) + d * (cdd ** 3)
+    return max(0.0, min(1.0, multiplier))
+
+def config_key(inputs, building_type):
+    """Tuple of the inputs that select regression rows (everything but location and hours)"""
+    is_large = (building_type == 'Office'
+                and inputs['hvac_system'] == LARGE_OFFICE_HVAC
+                and inputs['building_area'] > 30000)
+    return (
+        building_type,
+        inputs['existing_window'],
+        inputs['csw_type'],
+        inputs['hvac_system'],
+        inputs['heating_fuel'],
+        inputs['cooling_installed'],
+        bool(is_large),
+    )
+
+def build_lookup_config_office(inputs, hours):
+    """Build configuration for finding Office regression row"""
+    base = 'Single' if inputs['existing_window'] == 'Single pane' else 'Double'
+    csw_type = CSW_TYPE_MAPPING.get(inputs['csw_type'], inputs['csw_type'])
+    
+    if inputs['building_area'] > 30000 and inputs['hvac_system'] == LARGE_OFFICE_HVAC:
+        size = 'Large'
+    else:
+        size = 'Mid'
+    
+    heating_fuel = inputs['heating_fuel']
+    if size == 'Mid':
+        hvac_fuel = 'PVAV_Elec' if heating_fuel in ['Electric', 'None'] else 'PVAV_Gas'
+    else:
+        hvac_fuel = 'VAV'
+    
+    fuel = 'Electric' if heating_fuel == 'None' else heating_fuel
+    
+    return {
+        'base': base,
+        'csw': csw_type,
+        'size': size,
+        'hvac_fuel': hvac_fuel,
+        'fuel': fuel,
+        'occupancy': '',
+        'hours': hours
+    }
+
+def build_lookup_config_hotel(inputs, occupancy_level):
+    """Build configuration for finding Hotel CSW regression row"""
+    base = 'Single' if inputs['existing_window'] == 'Single pane' else 'Double'
+    csw_type = CSW_TYPE_MAPPING.get(inputs['csw_type'], inputs['csw_type'])
+    
+    hvac_system = inputs['hvac_system']
+    size = 'Small' if hvac_system in ['PTAC', 'PTHP'] else 'Large'
+    
+    hvac_mapping = {'PTAC': 'PTAC', 'PTHP': 'PTHP', 'Fan Coil Unit': '', 'Other': ''}
+    hvac_fuel = hvac_mapping.get(hvac_system, '')
+    
+    heating_fuel = inputs['heating_fuel']
+    if hvac_system in ['PTAC', 'PTHP'] or heating_fuel == 'None':
+        fuel = 'Electric'
+    else:
+        fuel = 'Gas' if heating_fuel == 'Natural Gas' else 'Electric'
+    
+    return {
+        'base': base,
+        'csw': csw_type,
+        'size': size,
+        'hvac_fuel': hvac_fuel,
+        'fuel': fuel,
+        'occupancy': occupancy_level,
+        'hours': ''
+    }
+
+def build_baseline_config_hotel(inputs, occupancy_level):
+    """Build configuration for finding Hotel BASELINE row - uses different logic than CSW lookup"""
+    base = 'Single' if inputs['existing_window'] == 'Single pane' else 'Double'
+    
+    hvac_system = inputs['hvac_system']
+    heating_fuel = inputs['heating_fuel']
+    
+    # Determine size and hvac_fuel for baseline lookup
+    # Small hotel (PTAC/PTHP with Electric/None) uses PTAC/PTHP baseline
+    # Large hotel uses Gas or Electric baseline based on heating fuel
+    if hvac_system == 'PTAC':
+        size = 'Small'
+        hvac_fuel_baseline = 'PTAC'
+    elif hvac_system == 'PTHP':
+        size = 'Small'
+        hvac_fuel_baseline = 'PTHP'
+    else:
+        # Large hotel (Fan Coil, Other)
+        size = 'Large'
+        hvac_fuel_baseline = 'Gas' if heating_fuel == 'Natural Gas' else 'Electric'
+    
+    return {
+        'base': base,
+        'size': size,
+        'hvac_fuel': hvac_fuel_baseline,
+        'occupancy': occupancy_level,
+        'hours': ''
+    }
+
+# ============================================================================
+# REGRESSION LOOKUP
+# ============================================================================
+
+@timed('regression_lookup')
+def find_regression_row(config, building_type, index=None):
+    """Find matching regression coefficients for CSW savings"""
+    if index is None:
+        index = get_regression_index()
+
+    if building_type == 'Office':
+        # Office rows have an empty occupancy; a blank fuel matches any fuel
+        fuel = ANY_FUEL if is_blank(config['fuel']) else config['fuel']
+        return index.get(config['base'], config['csw'], config['size'], config['hvac_fuel'],
+                         fuel, '', config['hours'])
+
+    # Hotel rows have empty hours; a blank hvac_fuel only matches blank cells
+    fuel = ANY_FUEL if is_blank(config['fuel']) else config['fuel']
+    return index.get(config['base'], config['csw'], config['size'], config['hvac_fuel'] or '',
+                     fuel, config['occupancy'], '')
+
+@timed('baseline_lookup')
+def find_baseline_eui_row(config, building_type, index=None):
+    """Find baseline EUI regression coefficients"""
+    if index is None:
+        index = get_regression_index()
+
+    if building_type == 'Office':
+        # Office baseline: csw='N/A', occupancy empty, hours must match
+        fuel_type = 'Gas' if config['fuel'] == 'Natural Gas' else 'Electric'
+        return index.get(config['base'], 'N/A', config['size'], fuel_type,
+                         ANY_FUEL, '', config['hours'])
+
+    # Hotel baseline lookup uses the hvac_fuel from the baseline config
+    return index.get(config['base'], 'N/A', config['size'], config['hvac_fuel'],
+                     ANY_FUEL, config['occupancy'], '')
+
+def calculate_from_regression(row, degree_days, is_heating=True):
+    """Calculate value using regression formula: value = a + b*DD + c*DD²"""
+    if row is None:
+        return 0
+    
+    if is_heating:
+        a, b, c = row.heat_a, row.heat_b, row.heat_c
+    else:
+        a, b, c = row.cool_a, row.cool_b, row.cool_c
+    
+    return a + b * degree_days + c * (degree_days ** 2)
+
+def interpolate_values(value_param, val_high, val_low, param_high, param_low):
+    """Generic interpolation formula"""
+    if value_param <= param_low:
+        return val_low
+    elif value_param >= param_high:
+        return val_high
+    else:
+        return ((value_param - param_low) / (param_high - param_low)) * (val_high - val_low) + val_low
+
+# ============================================================================
+# SAVINGS CALCULATIONS
+# ============================================================================
+
+def scale_savings(inputs, c31, c32, c33, baseline_eui):
+    """Scale per-SF savings by CSW area and rates into the results dict"""
+    building_area = inputs['building_area']
+    csw_area = inputs['csw_area']
+    num_floors = inputs['num_floors']
+    
+    electric_savings_kwh = (c31 + c32) * csw_area
+    gas_savings_therms = c33 * csw_area
+    electric_cost_savings = electric_savings_kwh * inputs['electric_rate']
+    gas_cost_savings = gas_savings_therms * inputs['gas_rate']
+    total_cost_savings = electric_cost_savings + gas_cost_savings
+    total_savings_kbtu_sf = (electric_savings_kwh * 3.413 + gas_savings_therms * 100) / building_area
+    new_eui = baseline_eui - total_savings_kbtu_sf
+    percent_eui_savings = (total_savings_kbtu_sf / baseline_eui * 100) if baseline_eui > 0 else 0
+    wwr = calculate_wwr(csw_area, building_area, num_floors) if csw_area > 0 and num_floors > 0 else None
+    
+    return {
+        'electric_savings_kwh': electric_savings_kwh,
+        'gas_savings_therms': gas_savings_therms,
+        'electric_cost_savings': electric_cost_savings,
+        'gas_cost_savings': gas_cost_savings,
+        'total_cost_savings': total_cost_savings,
+        'total_savings_kbtu_sf': total_savings_kbtu_sf,
+        'baseline_eui': baseline_eui,
+        'new_eui': new_eui,
+        'percent_eui_savings': percent_eui_savings,
+        'wwr': wwr,
+        'hdd': inputs.get('hdd', 0),
+        'cdd': inputs.get('cdd', 0),
+        'heating_per_sf': c31,
+        'cooling_per_sf': c32,
+        'gas_per_sf': c33
+    }
+
+def calculate_intensity_office(inputs, index=None):
+    """Per-SF savings and baseline EUI for Office buildings"""
+    operating_hours = inputs['operating_hours']
+    cooling_installed = inputs['cooling_installed']
+    heating_fuel = inputs['heating_fuel']
+    hdd = inputs.get('hdd', 0)
+    cdd = inputs.get('cdd', 0)
+    
+    # Determine operating hours brackets
+    hours_high = 8760 if operating_hours > 2912 else 2912
+    hours_low = 2912 if hours_high == 8760 else 2080
+    
+    config_high = build_lookup_config_office(inputs, hours_high)
+    config_low = build_lookup_config_office(inputs, hours_low)
+    
+    row_high = find_regression_row(config_high, 'Office', index)
+    row_low = find_regression_row(config_low, 'Office', index)
+    
+    if row_high is None or row_low is None:
+        raise CoefficientNotFoundError("Could not find Office regression coefficients")
+    
+    # Calculate heating savings
+    if heating_fuel == 'Natural Gas':
+        heating_high = calculate_from_regression(row_high, hdd, is_heating=True)
+        heating_low = calculate_from_regression(row_low, hdd, is_heating=True)
+        gas_savings_high, gas_savings_low = heating_high, heating_low
+        electric_heating_high, electric_heating_low = 0, 0
+    else:
+        electric_heating_high = calculate_from_regression(row_high, hdd, is_heating=True)
+        electric_heating_low = calculate_from_regression(row_low, hdd, is_heating=True)
+        gas_savings_high, gas_savings_low = 0, 0
+    
+    # Calculate cooling savings
+    cooling_high = calculate_from_regression(row_high, cdd, is_heating=False)
+    cooling_low = calculate_from_regression(row_low, cdd, is_heating=False)
+    
+    # Interpolate
+    if heating_fuel == 'Natural Gas':
+        c31 = 0
+        c33 = interpolate_values(operating_hours, gas_savings_high, gas_savings_low, hours_high, hours_low)
+    else:
+        c31 = interpolate_values(operating_hours, electric_heating_high, electric_heating_low, hours_high, hours_low)
+        c33 = 0
+    
+    c32_base = interpolate_values(operating_hours, cooling_high, cooling_low, hours_high, hours_low)
+    
+    # Apply cooling multiplier
+    if cooling_installed == "Yes":
+        w24 = 1.0
+    else:
+        w24 = calculate_cooling_multiplier_office(cdd, config_high['size'])
+    
+    c32 = c32_base * w24
+    
+    # Find baseline EUI
+    baseline_row_high = find_baseline_eui_row(config_high, 'Office', index)
+    baseline_row_low = find_baseline_eui_row(config_low, 'Office', index)
+    
+    if baseline_row_high is None or baseline_row_low is None:
+        raise CoefficientNotFoundError("Could not find Office baseline EUI coefficients")
+    
+    baseline_eui_high = calculate_from_regression(baseline_row_high, hdd, is_heating=True)
+    baseline_eui_low = calculate_from_regression(baseline_row_low, hdd, is_heating=True)
+    baseline_eui = interpolate_values(operating_hours, baseline_eui_high, baseline_eui_low, hours_high, hours_low)
+    
+    return Intensity(c31, c32, c33, baseline_eui)
+
+def calculate_intensity_hotel(inputs, index=None):
+    """Per-SF savings and baseline EUI for Hotel buildings"""
+    occupancy_percent = inputs['occupancy_percent']
+    cooling_installed = inputs['cooling_installed']
+    heating_fuel = inputs['heating_fuel']
+    hdd = inputs.get('hdd', 0)
+    cdd = inputs.get('cdd', 0)
+    
+    # Hotel uses occupancy interpolation (33% = Low, 100% = High)
+    occupancy_high = 100
+    occupancy_low = 33
+    
+    # CSW savings lookup - uses standard config
+    config_high = build_lookup_config_hotel(inputs, 'High')
+    config_low = build_lookup_config_hotel(inputs, 'Low')
+    
+    row_high = find_regression_row(config_high, 'Hotel', index)
+    row_low = find_regression_row(config_low, 'Hotel', index)
+    
+    if row_high is None or row_low is None:
+        raise CoefficientNotFoundError("Could not find Hotel regression coefficients")
+    
+    # Calculate heating savings
+    if heating_fuel == 'Natural Gas':
+        heating_high = calculate_from_regression(row_high, hdd, is_heating=True)
+        heating_low = calculate_from_regression(row_low, hdd, is_heating=True)
+        gas_savings_high, gas_savings_low = heating_high, heating_low
+        electric_heating_high, electric_heating_low = 0, 0
+    else:
+        electric_heating_high = calculate_from_regression(row_high, hdd, is_heating=True)
+        electric_heating_low = calculate_from_regression(row_low, hdd, is_heating=True)
+        gas_savings_high, gas_savings_low = 0, 0
+    
+    # Calculate cooling savings
+    cooling_high = calculate_from_regression(row_high, cdd, is_heating=False)
+    cooling_low = calculate_from_regression(row_low, cdd, is_heating=False)
+    
+    # Interpolate based on occupancy
+    if heating_fuel == 'Natural Gas':
+        c31 = 0
+        c33 = interpolate_values(occupancy_percent, gas_savings_high, gas_savings_low, occupancy_high, occupancy_low)
+    else:
+        c31 = interpolate_values(occupancy_percent, electric_heating_high, electric_heating_low, occupancy_high, occupancy_low)
+        c33 = 0
+    
+    c32_base = interpolate_values(occupancy_percent, cooling_high, cooling_low, occupancy_high, occupancy_low)
+    
+    # Hotels always apply cooling (no multiplier adjustment needed)
+    c32 = c32_base if cooling_installed == "Yes" else 0
+    
+    # Baseline lookup - uses separate baseline config
+    baseline_config_high = build_baseline_config_hotel(inputs, 'High')
+    baseline_config_low = build_baseline_config_hotel(inputs, 'Low')
+    
+    baseline_row_high = find_baseline_eui_row(baseline_config_high, 'Hotel', index)
+    baseline_row_low = find_baseline_eui_row(baseline_config_low, 'Hotel', index)
+    
+    if baseline_row_high is None or baseline_row_low is None:
+        raise CoefficientNotFoundError("Could not find Hotel baseline EUI coefficients")
+    
+    baseline_eui_high = calculate_from_regression(baseline_row_high, hdd, is_heating=True)
+    baseline_eui_low = calculate_from_regression(baseline_row_low, hdd, is_heating=True)
+    baseline_eui = interpolate_values(occupancy_percent, baseline_eui_high, baseline_eui_low, occupancy_high, occupancy_low)
+    
+    return Intensity(c31, c32, c33, baseline_eui)
+
+@timed('intensity')
+def calculate_intensity(inputs, building_type, index=None, lookup=None):
+    """
+    Per-SF savings and baseline EUI for either building type.
+
+    Inputs that land exactly on a verified savings_lookup row are read from
+    lookup (default: the process-wide one) instead of the regressions.
+    """
+    if lookup is None:
+        lookup = get_savings_lookup()
+    if lookup is not None:
+        tabulated = lookup.intensity(inputs, building_type)
+        if tabulated is not None:
+            return tabulated
+
+    if building_type == 'Office':
+        return calculate_intensity_office(inputs, index)
+    if building_type == 'Hotel':
+        return calculate_intensity_hotel(inputs, index)
+    raise ValueError(f"Unknown building type: {building_type}")
+
+def calculate_savings_office(inputs, index=None):
+    """Calculate savings for Office buildings"""
+    return scale_savings(inputs, *calculate_intensity_office(inputs, index))
+
+def calculate_savings_hotel(inputs, index=None):
+    """Calculate savings for Hotel buildings"""
+    return scale_savings(inputs, *calculate_intensity_hotel(inputs, index))
+
+@timed('calculation')
+def calculate_savings(inputs, building_type, index=None):
+    """Calculate savings for either building type"""
+    return scale_savings(inputs, *calculate_intensity(inputs, building_type, index))
@@ -0,0 +1,88 @@
+"""
+Portfolio comparison: one building across every station and/or product option
+
+The building inputs stay fixed while the calculation fans out over every
+weather station, every product x HVAC x heating fuel combination the wizard
+offers, or both. The whole fan-out is a single calculate_savings_batch call.
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from .batch import broadcast_frame, calculate_savings_batch
+from .constants import (
+    OFFICE_HVAC_SYSTEMS,
+    HOTEL_HVAC_SYSTEMS,
+    available_csw_types,
+    available_heating_fuels,
+)
+from .data import get_weather_store
+from .weather import STATE_ABBREVIATIONS, normalize_state
+
+LOCATION_COLUMNS = ['state', 'city', 'hdd', 'cdd']
+PRODUCT_COLUMNS = ['csw_type', 'hvac_system', 'heating_fuel']
+
+_STATE_CODES = {name.lower(): code for code, name in STATE_ABBREVIATIONS.items()}
+
+def product_options(inputs, building_type):
+    """(csw_type, hvac_system, heating_fuel) combinations offered for the building"""
+    hvac_systems = OFFICE_HVAC_SYSTEMS if building_type == 'Office' else HOTEL_HVAC_SYSTEMS
+    return [
+        (csw_type, hvac_system, heating_fuel)
+        for csw_type, hvac_system in itertools.product(available_csw_types(inputs['existing_window']), hvac_systems)
+        for heating_fuel in available_heating_fuels(building_type, hvac_system)
+    ]
+
+def compare_savings(inputs, building_type, locations=True, products=False, store=None, index=None):
+    """
+    Results for one building across stations and/or product options.
+
+    With locations=True every station in the weather store replaces the
+    inputs' state/city/hdd/cdd; with products=True every offered product,
+    HVAC system and heating fuel combination replaces the inputs' own. Both
+    together give the full cross product. Returns the varied columns
+    followed by the result columns; combinations without regression
+    coefficients are dropped.
+    """
+    if locations:
+        store = store or get_weather_store()
+        location_values = {
+            'state': store.states,
+            'city': store.cities,
+            'hdd': store.hdd,
+            'cdd': store.cdd,
+        }
+    else:
+        location_values = {column: np.array([inputs.get(column)]) for column in LOCATION_COLUMNS}
+    if products:
+        options = product_options(inputs, building_type)
+    else:
+        options = [tuple(inputs.get(column) for column in PRODUCT_COLUMNS)]
+
+    n_locations = len(location_values['state'])
+    product_values = np.array(options, dtype=object)
+    n = n_locations * len(options)
+
+    frame = broadcast_frame(inputs, n)
+    for column, values in location_values.items():
+        frame[column] = np.tile(values, len(options))
+    for i, column in enumerate(PRODUCT_COLUMNS):
+        frame[column] = np.repeat(product_values[:, i], n_locations)
+
+    results = calculate_savings_batch(frame, building_type=building_type, index=index, errors='coerce')
+    comparison = pd.concat([frame[PRODUCT_COLUMNS + ['state', 'city']], results], axis=1)
+    return comparison[results['total_cost_savings'].notna()].reset_index(drop=True)
+
+def state_code(state):
+    """Two-letter code for a state label, or None"""
+    return _STATE_CODES.get(normalize_state(state))
+
+def summarize_by_state(comparison, value='total_cost_savings'):
+    """Per-state station count and mean/min/max of a result column, with state codes"""
+    states = comparison['state'].astype(str).str.strip()
+    summary = comparison.groupby(states)[value].agg(['count', 'mean', 'min', 'max'])
+    summary = summary.rename(columns={'count': 'stations'}).reset_index(names='state')
+    summary.insert(1, 'state_code', summary['state'].map(state_code))
+    return summary
@@ -0,0 +1,59 @@
+"""
+Input options and fixed model constants shared by the engine and the UI
+"""
+
+# Office HVAC Systems
+OFFICE_HVAC_SYSTEMS = [
+    'Packaged VAV with electric reheat',
+    'Packaged VAV with hydronic reheat',
+    'Built-up VAV with hydronic reheat',
+    'Other'
+]
+
+# Hotel HVAC Systems
+HOTEL_HVAC_SYSTEMS = [
+    'PTAC',
+    'PTHP',
+    'Fan Coil Unit',
+    'Other'
+]
+
+HEATING_FUELS = ['Electric', 'Natural Gas', 'None']
+COOLING_OPTIONS = ['Yes', 'No']
+WINDOW_TYPES = ['Single pane', 'Double pane']
+CSW_TYPES = ['Winsert Lite', 'Winsert Plus']
+CSW_TYPE_MAPPING = {'Winsert Lite': 'Single', 'Winsert Plus': 'Double'}
+
+# Cooling adjustment polynomial coefficients for Office
+COOLING_MULT_COEFFICIENTS_OFFICE = {
+    'Mid': {'a': 0.6972151451662, 'b': -0.0001078176371, 'c': 3.60507e-8, 'd': -6.4e-12},
+    'Large': {'a': 0.779295373677, 'b': 0.000049630331, 'c': -2.8839e-8, 'd': 1e-12}
+}
+
+# ============================================================================
+# INPUT RANGES (as enforced by the wizard)
+# ============================================================================
+
+BUILDING_AREA_RANGES = {'Office': (15000, 500000), 'Hotel': (15000, 250000)}
+NUM_FLOORS_RANGE = (1, 100)
+MAX_CSW_AREA_FRACTION = 0.5  # of building area
+ELECTRIC_RATE_RANGE = (0.01, 1.0)
+GAS_RATE_RANGE = (0.01, 10.0)
+OPERATING_HOURS_RANGE = (1980, 8760)
+OCCUPANCY_RANGE = (33, 100)
+
+# ============================================================================
+# OPTION RULES (as offered by the wizard)
+# ============================================================================
+
+def available_csw_types(existing_window):
+    """Products offered for an existing window type"""
+    return ['Winsert Lite'] if existing_window == 'Double pane' else list(CSW_TYPES)
+
+def available_heating_fuels(building_type, hvac_system):
+    """Heating fuels offered for an HVAC system"""
+    if building_type == 'Office' and hvac_system == 'Packaged VAV with electric reheat':
+        return ['Electric']
+    if building_type == 'Hotel' and hvac_system in ['PTHP', 'PTAC']:
+        return ['Electric', 'None']
+    return list(HEATING_FUELS)
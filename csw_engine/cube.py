@@ -0,0 +1,333 @@
+"""
+Precomputed savings-per-SF cube over every weather station
+
+For a fixed configuration (building type, window, product, HVAC, fuel,
+cooling, size) the per-SF results depend only on the station's HDD/CDD and on
+operating hours (Office) or occupancy (Hotel), and are piecewise linear in
+that position between the regression breakpoints. The cube stores
+heating/cooling/gas per SF and baseline EUI at each breakpoint for every
+station and configuration, so a query is one array read plus one
+interpolation; area and rates are scaled in afterwards.
+
+Values are saved as a .npy file that is memory-mapped on load, next to a JSON
+file listing the configurations and the checksums of the CSVs it was built
+from. A cube built from different data files is treated as missing.
+
+Build with:
+    python -m csw_engine.cube
+"""
+
+import argparse
+import itertools
+import json
+import os
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .batch import _group_codes, calculate_savings_batch, interpolate_array, scale_savings_array
+from .calculations import (
+    LARGE_OFFICE_HVAC,
+    Intensity,
+    config_key,
+    interpolate_values,
+    scale_savings,
+)
+from .constants import (
+    OFFICE_HVAC_SYSTEMS,
+    HOTEL_HVAC_SYSTEMS,
+    HEATING_FUELS,
+    COOLING_OPTIONS,
+    WINDOW_TYPES,
+    CSW_TYPES,
+)
+from .data import (
+    REGRESSION_FILE,
+    WEATHER_FILE,
+    data_path,
+    file_checksum,
+    get_weather_store,
+)
+
+CUBE_VERSION = 1
+CUBE_FILE = 'savings_cube.npy'
+
+CUBE_FIELDS = ['heating_per_sf', 'cooling_per_sf', 'gas_per_sf', 'baseline_eui']
+
+# Interpolation breakpoints per building type. The regression is fitted at
+# 2080/2912/8760 operating hours (Office) and 33/100 % occupancy (Hotel);
+# Hotel repeats its last breakpoint so both share one cube axis.
+BREAKPOINTS = {
+    'Office': (2080, 2912, 8760),
+    'Hotel': (33, 100, 100),
+}
+
+# ============================================================================
+# CONFIGURATIONS
+# ============================================================================
+
+def iter_config_keys():
+    """Every combination of wizard options, including the large-office variant"""
+    for building_type, hvac_systems in (('Office', OFFICE_HVAC_SYSTEMS), ('Hotel', HOTEL_HVAC_SYSTEMS)):
+        for window, csw, hvac, fuel, cooling in itertools.product(
+                WINDOW_TYPES, CSW_TYPES, hvac_systems, HEATING_FUELS, COOLING_OPTIONS):
+            yield (building_type, window, csw, hvac, fuel, cooling, False)
+            if building_type == 'Office' and hvac == LARGE_OFFICE_HVAC:
+                yield (building_type, window, csw, hvac, fuel, cooling, True)
+
+def data_checksums(data_dir=None):
+    """Checksums of the CSV files a cube is built from"""
+    return {
+        name: file_checksum(data_path(name, data_dir))
+        for name in (WEATHER_FILE, REGRESSION_FILE)
+    }
+
+# ============================================================================
+# SAVINGS CUBE
+# ============================================================================
+
+class SavingsCube:
+    """(configs, stations, breakpoints, fields) array of per-SF results"""
+
+    def __init__(self, values, configs, store, checksums=None):
+        self.values = values
+        self.configs = [tuple(config) for config in configs]
+        self.store = store
+        self.checksums = checksums or {}
+        self._config_ids = {config: i for i, config in enumerate(self.configs)}
+        self._breakpoint_tuples = [BREAKPOINTS[config[0]] for config in self.configs]
+        self._breakpoints = np.array(self._breakpoint_tuples, dtype=float)
+        # Plain ndarray view (still backed by the mapping) avoids memmap indexing overhead
+        self._values = np.asarray(values)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    # ------------------------------------------------------------------
+    # Build / persist
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def build(cls, store=None, index=None, checksums=None):
+        """Evaluate every configuration at every station and breakpoint"""
+        store = store or get_weather_store()
+        n_stations = len(store)
+        configs = list(iter_config_keys())
+        n_points = len(BREAKPOINTS['Office'])
+
+        # One row per (config, breakpoint, station), unit area and zero rates
+        keys = np.array(configs, dtype=object)
+        repeat = n_points * n_stations
+        frame = pd.DataFrame({
+            'building_type': np.repeat(keys[:, 0], repeat),
+            'existing_window': np.repeat(keys[:, 1], repeat),
+            'csw_type': np.repeat(keys[:, 2], repeat),
+            'hvac_system': np.repeat(keys[:, 3], repeat),
+            'heating_fuel': np.repeat(keys[:, 4], repeat),
+            'cooling_installed': np.repeat(keys[:, 5], repeat),
+            'building_area': np.repeat(np.where(keys[:, 6].astype(bool), 30001.0, 1.0), repeat),
+            'num_floors': 1.0,
+            'csw_area': 1.0,
+            'electric_rate': 0.0,
+            'gas_rate': 0.0,
+            'hdd': np.tile(store.hdd, len(configs) * n_points),
+            'cdd': np.tile(store.cdd, len(configs) * n_points),
+        })
+        positions = np.repeat(
+            np.array([BREAKPOINTS[config[0]] for config in configs], dtype=float).ravel(), n_stations
+        )
+        frame['operating_hours'] = positions
+        frame['occupancy_percent'] = positions
+
+        results = calculate_savings_batch(frame, index=index, errors='coerce')
+        values = results[CUBE_FIELDS].to_numpy().reshape(len(configs), n_points, n_stations, len(CUBE_FIELDS))
+        values = np.ascontiguousarray(values.transpose(0, 2, 1, 3))
+
+        # Drop combinations the regression table does not cover
+        valid = ~np.isnan(values).any(axis=(1, 2, 3))
+        configs = [config for config, keep in zip(configs, valid) if keep]
+        return cls(values[valid], configs, store, checksums)
+
+    def save(self, path=None):
+        """Write the .npy values and the .json metadata next to it"""
+        path = path or data_path(CUBE_FILE)
+        np.save(path, np.asarray(self.values))
+        meta = {
+            'version': CUBE_VERSION,
+            'fields': CUBE_FIELDS,
+            'breakpoints': BREAKPOINTS,
+            'stations': len(self.store),
+            'checksums': self.checksums,
+            'configs': [list(config) for config in self.configs],
+        }
+        with open(_meta_path(path), 'w') as f:
+            json.dump(meta, f, indent=1)
+        return path
+
+    @classmethod
+    def load(cls, path=None, store=None, checksums=None, mmap=True):
+        """
+        Load a saved cube, or return None if it is missing or stale.
+
+        A cube is stale when its version, station count or source checksums
+        differ from the current data files.
+        """
+        path = path or data_path(CUBE_FILE)
+        if not (os.path.exists(path) and os.path.exists(_meta_path(path))):
+            return None
+        store = store or get_weather_store()
+        checksums = checksums if checksums is not None else data_checksums()
+        with open(_meta_path(path)) as f:
+            meta = json.load(f)
+        if (meta.get('version') != CUBE_VERSION
+                or meta.get('fields') != CUBE_FIELDS
+                or meta.get('stations') != len(store)
+                or meta.get('checksums') != checksums):
+            return None
+        values = np.load(path, mmap_mode='r' if mmap else None)
+        if values.shape[:2] != (len(meta['configs']), len(store)):
+            return None
+        return cls(values, meta['configs'], store, checksums)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def config_id(self, inputs, building_type):
+        """Configuration row for an inputs dict, or None if not in the cube"""
+        return self._config_ids.get(config_key(inputs, building_type))
+
+    def station(self, state, city):
+        """Station row for an exact state/city label, or None"""
+        if state is None or city is None:
+            return None
+        return self.store.resolve(city, state, fuzzy=False)
+
+    def intensity(self, config, station, position):
+        """Per-SF heating, cooling, gas and baseline EUI at an hours/occupancy position"""
+        breakpoints = self._breakpoint_tuples[config]
+        # Segment whose upper breakpoint is the first >= position, as the engine brackets it
+        segment = 0
+        while segment < len(breakpoints) - 2 and position > breakpoints[segment + 1]:
+            segment += 1
+        low_values, high_values = self._values[config, station, segment:segment + 2].tolist()
+        low, high = breakpoints[segment], breakpoints[segment + 1]
+        return Intensity(*[
+            interpolate_values(position, value_high, value_low, high, low)
+            for value_high, value_low in zip(high_values, low_values)
+        ])
+
+    def calculate_intensity(self, inputs, building_type):
+        """
+        Intensity for inputs at a known station, or None.
+
+        Returns None when the configuration is not in the cube or the inputs'
+        state/city/hdd/cdd do not match a station, so callers can fall back
+        to the engine's calculate_intensity.
+        """
+        config = self.config_id(inputs, building_type)
+        station = self.station(inputs.get('state'), inputs.get('city'))
+        if config is None or station is None:
+            return None
+        if inputs.get('hdd') != self.store.hdd[station] or inputs.get('cdd') != self.store.cdd[station]:
+            return None
+        position = inputs['operating_hours'] if building_type == 'Office' else inputs['occupancy_percent']
+        return self.intensity(config, station, position)
+
+    def calculate(self, inputs, building_type):
+        """Results dict for inputs at a known station, or None (see calculate_intensity)"""
+        intensity = self.calculate_intensity(inputs, building_type)
+        if intensity is None:
+            return None
+        return scale_savings(inputs, *intensity)
+
+    def calculate_batch(self, inputs, stations, building_type=None):
+        """
+        Vectorized calculate for a frame of buildings at known stations.
+
+        stations holds a weather store row per input row (-1 for unknown);
+        rows without a station or a cube configuration get NaN results.
+        """
+        frame = inputs if isinstance(inputs, pd.DataFrame) else pd.DataFrame(inputs)
+        n = len(frame)
+        types = (pd.Series(building_type, index=frame.index) if building_type is not None
+                 else frame['building_type'])
+        is_office = (types == 'Office').to_numpy()
+        building_area = frame['building_area'].to_numpy(dtype=float)
+        is_large = (is_office & (frame['hvac_system'] == LARGE_OFFICE_HVAC).to_numpy()
+                    & (building_area > 30000))
+
+        key_columns = [
+            types,
+            frame['existing_window'],
+            frame['csw_type'],
+            frame['hvac_system'],
+            frame['heating_fuel'],
+            frame['cooling_installed'],
+            is_large,
+        ]
+        codes, keys = _group_codes(key_columns)
+        configs = np.array([self._config_ids.get(key, -1) for key in keys], dtype=np.int64)[codes]
+
+        stations = np.asarray(stations, dtype=np.int64)
+        found = (configs >= 0) & (stations >= 0)
+        config_rows = np.where(found, configs, 0)
+        station_rows = np.where(stations >= 0, stations, 0)
+
+        position = np.where(
+            is_office,
+            frame['operating_hours'].to_numpy(dtype=float) if 'operating_hours' in frame else 0.0,
+            frame['occupancy_percent'].to_numpy(dtype=float) if 'occupancy_percent' in frame else 0.0,
+        )
+        breakpoints = self._breakpoints[config_rows]
+        segment = np.minimum((position[:, None] > breakpoints[:, 1:]).sum(axis=1), breakpoints.shape[1] - 2)
+        low = np.take_along_axis(breakpoints, segment[:, None], axis=1)[:, 0]
+        high = np.take_along_axis(breakpoints, segment[:, None] + 1, axis=1)[:, 0]
+
+        # One gather of the bracketing breakpoint rows, then all fields at once
+        n_stations = self._values.shape[1]
+        flat = self._values.reshape(-1, *self._values.shape[2:])
+        cells = flat[config_rows * n_stations + station_rows]
+        rows = np.arange(n)
+        fields = interpolate_array(position[:, None], cells[rows, segment + 1], cells[rows, segment],
+                                   high[:, None], low[:, None])
+        fields[~found] = np.nan
+        c31, c32, c33, baseline_eui = fields.T
+        # Like the engine, the unused heating fuel is zero even without coefficients
+        is_gas = (frame['heating_fuel'] == 'Natural Gas').to_numpy()
+        c31 = np.where(is_gas, 0.0, c31)
+        c33 = np.where(is_gas, c33, 0.0)
+        hdd = np.where(stations >= 0, self.store.hdd[station_rows], np.nan)
+        cdd = np.where(stations >= 0, self.store.cdd[station_rows], np.nan)
+        return scale_savings_array(frame, c31, c32, c33, baseline_eui, hdd, cdd)
+
+def _meta_path(path):
+    return os.path.splitext(path)[0] + '.json'
+
+@lru_cache(maxsize=None)
+def get_savings_cube():
+    """Process-wide memory-mapped cube, or None if none has been built"""
+    return SavingsCube.load()
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the precomputed savings-per-SF cube.')
+    parser.add_argument('--output', default=None,
+                        help=f'Output .npy path (default: {CUBE_FILE} in the data directory)')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    cube = SavingsCube.build(checksums=data_checksums())
+    path = cube.save(args.output)
+    configs, stations, points, fields = cube.shape
+    print(f"{configs} configurations x {stations} stations x {points} breakpoints "
+          f"-> {path} ({cube.values.nbytes / 1e6:.1f} MB, {time.perf_counter() - start:.1f}s)")
+
+if __name__ == '__main__':
+    main()
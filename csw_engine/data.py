@@ -0,0 +1,199 @@
+"""
+Data loading for weather and regression coefficient tables
+
+Tables come from the binary data bundle (see bundle.py) when one has been
+built from the current CSVs, and are parsed from the CSVs otherwise.
+"""
+
+import hashlib
+import os
+from functools import lru_cache
+
+import pandas as pd
+
+from .bundle import BUNDLE_FILE, DataBundle
+from .exceptions import DataFileError
+from .metrics import timed
+from .regression_index import RegressionIndex
+from .spatial import StationLocator
+from .weather import WeatherStore
+
+# CSV files ship next to app.py; CSW_DATA_DIR lets workers point elsewhere
+DATA_DIR = os.environ.get(
+    'CSW_DATA_DIR',
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+WEATHER_FILE = 'weather_information.csv'
+REGRESSION_FILE = 'regression_coefficients.csv'
+SAVINGS_LOOKUP_FILE = 'savings_lookup.csv'
+
+# Bundle table name per source CSV
+BUNDLE_TABLES = {
+    'weather': WEATHER_FILE,
+    'regression': REGRESSION_FILE,
+    'savings_lookup': SAVINGS_LOOKUP_FILE,
+}
+
+
+def data_path(filename, data_dir=None):
+    """Resolve a data file name against the data directory"""
+    return os.path.join(data_dir or DATA_DIR, filename)
+
+
+def file_checksum(path):
+    """SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    except FileNotFoundError as exc:
+        raise DataFileError(f"Data file not found: {path}") from exc
+    return digest.hexdigest()
+
+
+# ============================================================================
+# CSV READERS
+# ============================================================================
+
+def read_weather_csv(path=None):
+    """Parse the weather CSV, fixing known label typos"""
+    path = path or data_path(WEATHER_FILE)
+    try:
+        df = pd.read_csv(path)
+    except FileNotFoundError as exc:
+        raise DataFileError(f"Weather data file not found: {path}") from exc
+    df['State'] = df['State'].replace('Aklaska', 'Alaska')
+    return df
+
+
+def read_regression_csv(path=None):
+    """Parse the merged regression coefficients CSV (Office + Hotel)"""
+    path = path or data_path(REGRESSION_FILE)
+    try:
+        # CRITICAL: keep_default_na=False prevents pandas from converting 'N/A' string to NaN
+        return pd.read_csv(path, keep_default_na=False, na_values=[''])
+    except FileNotFoundError as exc:
+        raise DataFileError(f"Regression coefficients file not found: {path}") from exc
+
+
+def read_savings_lookup_csv(path=None):
+    """Parse the precomputed per-SF savings lookup CSV"""
+    path = path or data_path(SAVINGS_LOOKUP_FILE)
+    try:
+        return pd.read_csv(path)
+    except FileNotFoundError as exc:
+        raise DataFileError(f"Savings lookup file not found: {path}") from exc
+
+
+_CSV_READERS = {
+    'weather': read_weather_csv,
+    'regression': read_regression_csv,
+    'savings_lookup': read_savings_lookup_csv,
+}
+
+# ============================================================================
+# DATA BUNDLE
+# ============================================================================
+
+def source_checksums(data_dir=None):
+    """Checksums of the bundle's source CSVs that are present"""
+    checksums = {}
+    for filename in BUNDLE_TABLES.values():
+        path = data_path(filename, data_dir)
+        if os.path.exists(path):
+            checksums[filename] = file_checksum(path)
+    return checksums
+
+
+def build_data_bundle(path=None, data_dir=None):
+    """Parse every source CSV and write them as one bundle; returns its path"""
+    frames = {name: _CSV_READERS[name](data_path(filename, data_dir)) for name, filename in BUNDLE_TABLES.items()}
+    bundle = DataBundle.from_frames(frames, source_checksums(data_dir))
+    return bundle.save(path or data_path(BUNDLE_FILE, data_dir))
+
+
+@lru_cache(maxsize=None)
+def get_data_bundle():
+    """Process-wide mapped bundle, or None when it is missing or stale"""
+    return DataBundle.load(data_path(BUNDLE_FILE), checksums=source_checksums())
+
+
+def _load_table(name, path):
+    """Table from the bundle unless a CSV path is given or no valid bundle exists"""
+    if path is None:
+        bundle = get_data_bundle()
+        if bundle is not None:
+            return bundle.table(name)
+    return _CSV_READERS[name](path)
+
+# ============================================================================
+# LOADERS
+# ============================================================================
+
+def load_weather_frame(path=None):
+    """Weather table as a DataFrame (State, Cities, HDD, CDD, Latitude, Longitude)"""
+    return _load_table('weather', path)
+
+
+@timed('load_weather')
+def load_weather_store(path=None):
+    """Load weather data into a WeatherStore with name indexes"""
+    return WeatherStore(load_weather_frame(path))
+
+
+def load_weather_data(path=None):
+    """Load weather data from CSV file into {state: {city: {'HDD', 'CDD'}}}"""
+    return load_weather_store(path).to_nested_dict()
+
+
+@timed('load_regression')
+def load_regression_coefficients(path=None):
+    """Load merged regression coefficients (Office + Hotel)"""
+    return _load_table('regression', path)
+
+
+def load_savings_lookup(path=None):
+    """Load the precomputed per-SF savings lookup table"""
+    return _load_table('savings_lookup', path)
+
+
+@lru_cache(maxsize=None)
+def get_regression_coefficients():
+    """Process-wide regression table, loaded on first use"""
+    return load_regression_coefficients()
+
+
+@lru_cache(maxsize=None)
+@timed('build_regression_index')
+def get_regression_index():
+    """Process-wide compiled regression index, built on first use"""
+    return RegressionIndex(get_regression_coefficients())
+
+
+@lru_cache(maxsize=None)
+def get_savings_lookup():
+    """
+    Process-wide fast-path lookup over the savings_lookup rows that match
+    the regressions, or None without the table.
+    """
+    # Imported here: savings_lookup builds on calculations, which imports this module
+    from .savings_lookup import SavingsLookup
+    try:
+        table = load_savings_lookup()
+    except DataFileError:
+        return None
+    return SavingsLookup.verified(table, get_regression_index())
+
+
+@lru_cache(maxsize=None)
+def get_weather_store():
+    """Process-wide weather store, loaded on first use"""
+    return load_weather_store()
+
+
+@lru_cache(maxsize=None)
+def get_station_locator():
+    """Process-wide nearest-station index over the weather store"""
+    return StationLocator(get_weather_store())
@@ -0,0 +1,31 @@
+"""
+Exceptions raised by the calculation engine
+"""
+
+
+class EngineError(Exception):
+    """Base class for all engine errors"""
+
+
+class DataFileError(EngineError):
+    """A required data file is missing or unreadable"""
+
+
+class WeatherFileError(DataFileError):
+    """An hourly weather file (EPW/TMY3) is malformed or incomplete"""
+
+
+class TariffError(DataFileError):
+    """A tariff definition (JSON) is malformed or does not cover the year"""
+
+
+class CoefficientNotFoundError(EngineError):
+    """No regression row matches the requested configuration"""
+
+
+class InputValidationError(EngineError):
+    """Inputs are missing, out of range or not offered for the building"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__('; '.join(self.errors))
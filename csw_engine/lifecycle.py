@@ -0,0 +1,259 @@
+"""
+Multi-year lifecycle costs and payback for CSW retrofits
+
+Year-one savings from the engine are projected over the analysis period with
+separate electric and gas escalation and an annual degradation of savings,
+then discounted against the installed cost (per SF of csw_area). Everything
+runs on arrays over buildings (and years, for the cash flow table and
+payback), so a whole batch of results is priced in one pass, and every
+assumption may be a scalar or one value per building. Each fuel's savings
+grow geometrically, so NPV, lifetime savings and the IRR search use
+closed-form sums instead of walking the years.
+"""
+
+import numpy as np
+import pandas as pd
+
+LIFECYCLE_COLUMNS = [
+    'installed_cost',
+    'lifetime_savings',
+    'npv',
+    'irr',
+    'simple_payback_years',
+    'discounted_payback_years',
+]
+
+# Assumptions that may vary per building; years is shared by the whole run
+LIFECYCLE_DEFAULTS = {
+    'installed_cost_per_sf': 25.0,
+    'electric_escalation': 0.025,
+    'gas_escalation': 0.02,
+    'discount_rate': 0.05,
+    'degradation': 0.005,
+}
+
+LIFECYCLE_YEARS = 20
+LIFECYCLE_YEARS_RANGE = (10, 30)
+
+# IRR search bracket (as rates) and Newton tolerance on log(1 + rate)
+IRR_BOUNDS = (-0.99, 10.0)
+IRR_TOLERANCE = 1e-12
+IRR_MAX_ITERATIONS = 100
+
+def _as_column(value):
+    """Scalar or per-building values as a (1 or n, 1) float array"""
+    return np.asarray(value, dtype=float).reshape(-1, 1)
+
+def growth_factor(escalation, degradation):
+    """Year-over-year change in a savings stream"""
+    return (1.0 + np.asarray(escalation, dtype=float)) * (1.0 - np.asarray(degradation, dtype=float))
+
+def cash_flows(electric_cost_savings, gas_cost_savings, years=LIFECYCLE_YEARS,
+               electric_escalation=0.0, gas_escalation=0.0, degradation=0.0):
+    """(buildings, years) array of savings in years 1..years, year 1 as given"""
+    elapsed = np.arange(years)
+    electric = _as_column(electric_cost_savings) * _as_column(growth_factor(electric_escalation, degradation)) ** elapsed
+    gas = _as_column(gas_cost_savings) * _as_column(growth_factor(gas_escalation, degradation)) ** elapsed
+    return electric + gas
+
+def discount_factors(discount_rate, years):
+    """(1 or n, years) end-of-year discount factors"""
+    return (1.0 + _as_column(discount_rate)) ** -np.arange(1, years + 1)
+
+# ============================================================================
+# GEOMETRIC STREAMS
+# ============================================================================
+# A stream is (year-one amount, growth factor). Internally the rate enters as
+# x = log(1 + rate) and growth as its log, which keeps the sums accurate when
+# growth and discounting nearly cancel.
+
+def _stream_value(amount, log_growth, x, years):
+    """Present value of amount * growth**t paid at the end of years 1..years"""
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        log_ratio = log_growth - x
+        total = np.expm1(years * log_ratio) / np.expm1(log_ratio)
+    total = np.where(log_ratio == 0, years, total)
+    return amount * np.exp(-x) * total
+
+def _stream_value_and_slope(amount, log_growth, x, years):
+    """_stream_value and its derivative with respect to x"""
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        log_ratio = log_growth - x
+        ratio_less_one = np.expm1(log_ratio)
+        power_less_one = np.expm1(years * log_ratio)
+        total = power_less_one / ratio_less_one
+        # Sum of (t + 1) * ratio**t; its limit near ratio == 1 is close enough for a slope
+        weighted = (years * (power_less_one + 1.0) * ratio_less_one - power_less_one) / ratio_less_one ** 2
+    total = np.where(log_ratio == 0, years, total)
+    weighted = np.where(np.abs(log_ratio) < 1e-6, years * (years + 1) / 2.0, weighted)
+    scale = amount * np.exp(-x)
+    return scale * total, -scale * weighted
+
+def present_value(streams, rate, years):
+    """Present value of (amount, growth) streams at a discount rate"""
+    x = np.log1p(np.asarray(rate, dtype=float))
+    with np.errstate(divide='ignore'):
+        return sum(_stream_value(amount, np.log(growth), x, years) for amount, growth in streams)
+
+def internal_rate_of_return(streams, installed_cost, years):
+    """
+    IRR of (amount, growth) savings streams against the installed cost.
+
+    Newton iterations on log(1 + rate) for all buildings at once. Each row
+    keeps a bracket around its root and bisects instead whenever a Newton
+    step would leave the bracket or fails to halve the previous step, which
+    covers nearly flat NPV curves and streams of opposite sign. Rows whose
+    NPV doesn't change sign over IRR_BOUNDS (no cost, or savings that never
+    recover it at any rate) are NaN.
+    """
+    n = np.broadcast(installed_cost, *[value for stream in streams for value in stream]).size
+    installed_cost = np.broadcast_to(np.asarray(installed_cost, dtype=float), (n,))
+    with np.errstate(divide='ignore'):
+        streams = [
+            (np.broadcast_to(np.asarray(amount, dtype=float), (n,)), np.broadcast_to(np.log(growth), (n,)))
+            for amount, growth in streams
+        ]
+
+    def npv_and_slope(rows, x):
+        npv = -installed_cost[rows]
+        slope = 0.0
+        for amount, log_growth in streams:
+            value, value_slope = _stream_value_and_slope(amount[rows], log_growth[rows], x, years)
+            npv = npv + value
+            slope = slope + value_slope
+        return npv, slope
+
+    bounds = np.log1p(IRR_BOUNDS)
+    npv_low, npv_high = [
+        sum(_stream_value(amount, log_growth, bound, years) for amount, log_growth in streams) - installed_cost
+        for bound in bounds
+    ]
+    irr = np.full(n, np.nan)
+    rows = np.flatnonzero((installed_cost > 0) & (npv_low > 0) & (npv_high < 0))
+
+    # Start from the year-one yield, which is close for level savings
+    first_year = sum(amount[rows] for amount, _ in streams)
+    low = np.full(len(rows), bounds[0])
+    high = np.full(len(rows), bounds[1])
+    previous = high - low
+    with np.errstate(invalid='ignore'):
+        x = np.clip(np.log1p(first_year / installed_cost[rows]), low, high)
+    x = np.where(np.isnan(x), (low + high) / 2, x)
+    for _ in range(IRR_MAX_ITERATIONS):
+        if not len(rows):
+            break
+        npv, slope = npv_and_slope(rows, x)
+        low = np.where(npv > 0, x, low)
+        high = np.where(npv < 0, x, high)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = x - npv / slope
+        use_newton = (newton >= low) & (newton <= high) & (np.abs(newton - x) <= previous / 2)
+        step = np.where(use_newton, newton, (low + high) / 2)
+        previous = np.abs(step - x)
+        converged = (previous < IRR_TOLERANCE) | (npv == 0)
+        irr[rows[converged]] = np.expm1(step[converged])
+        keep = ~converged
+        rows, x, low, high, previous = rows[keep], step[keep], low[keep], high[keep], previous[keep]
+    irr[rows] = np.expm1(x)
+    return irr
+
+# ============================================================================
+# PAYBACK AND SUMMARY
+# ============================================================================
+
+def discounted_payback(flows, installed_cost, discount_rate):
+    """
+    Years until discounted savings repay the installed cost.
+
+    Interpolates within the payback year; NaN when the cost is not repaid
+    within the analysis period.
+    """
+    n, years = flows.shape
+    installed_cost = np.broadcast_to(np.asarray(installed_cost, dtype=float), (n,))
+    discounted = flows * discount_factors(discount_rate, years)
+    cumulative = np.cumsum(discounted, axis=1)
+    repaid = cumulative >= installed_cost[:, None]
+    year = repaid.argmax(axis=1)
+    rows = np.arange(n)
+    before = np.where(year > 0, cumulative[rows, year - 1], 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payback = year + (installed_cost - before) / discounted[rows, year]
+    payback = np.where(repaid.any(axis=1), payback, np.nan)
+    return np.where(installed_cost <= 0, 0.0, payback)
+
+def simple_payback(installed_cost, annual_savings):
+    """Installed cost over year-one savings; NaN when there are no savings"""
+    installed_cost = np.asarray(installed_cost, dtype=float)
+    annual_savings = np.asarray(annual_savings, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(annual_savings > 0, installed_cost / annual_savings, np.nan)
+
+def lifecycle_arrays(electric_cost_savings, gas_cost_savings, csw_area, years=LIFECYCLE_YEARS, **assumptions):
+    """
+    Lifecycle metrics for arrays of year-one savings.
+
+    assumptions override LIFECYCLE_DEFAULTS and may be scalars or arrays
+    with one value per building. Returns a dict of LIFECYCLE_COLUMNS arrays.
+    """
+    unknown = set(assumptions) - set(LIFECYCLE_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown lifecycle assumptions: {sorted(unknown)}")
+    if not LIFECYCLE_YEARS_RANGE[0] <= years <= LIFECYCLE_YEARS_RANGE[1]:
+        raise ValueError(f"years must be between {LIFECYCLE_YEARS_RANGE[0]} and {LIFECYCLE_YEARS_RANGE[1]}")
+    assumptions = {**LIFECYCLE_DEFAULTS, **assumptions}
+
+    electric_cost_savings = np.asarray(electric_cost_savings, dtype=float)
+    gas_cost_savings = np.asarray(gas_cost_savings, dtype=float)
+    installed_cost = np.asarray(csw_area, dtype=float) * np.asarray(assumptions['installed_cost_per_sf'], dtype=float)
+    n = np.broadcast(electric_cost_savings, gas_cost_savings, installed_cost,
+                     *[np.asarray(value) for value in assumptions.values()]).size
+    installed_cost = np.broadcast_to(installed_cost, (n,))
+    streams = [
+        (electric_cost_savings, growth_factor(assumptions['electric_escalation'], assumptions['degradation'])),
+        (gas_cost_savings, growth_factor(assumptions['gas_escalation'], assumptions['degradation'])),
+    ]
+    flows = np.broadcast_to(cash_flows(
+        electric_cost_savings,
+        gas_cost_savings,
+        years,
+        assumptions['electric_escalation'],
+        assumptions['gas_escalation'],
+        assumptions['degradation'],
+    ), (n, years))
+
+    return {
+        'installed_cost': installed_cost,
+        'lifetime_savings': np.broadcast_to(present_value(streams, 0.0, years), (n,)),
+        'npv': np.broadcast_to(present_value(streams, assumptions['discount_rate'], years) - installed_cost, (n,)),
+        'irr': internal_rate_of_return(streams, installed_cost, years),
+        'simple_payback_years': simple_payback(installed_cost, flows[:, 0]),
+        'discounted_payback_years': discounted_payback(flows, installed_cost, assumptions['discount_rate']),
+    }
+
+def calculate_lifecycle(inputs, results, years=LIFECYCLE_YEARS, **assumptions):
+    """Lifecycle metrics for one building's inputs and results, as a dict"""
+    metrics = lifecycle_arrays(
+        results['electric_cost_savings'], results['gas_cost_savings'], inputs['csw_area'], years, **assumptions
+    )
+    return {column: float(values[0]) for column, values in metrics.items()}
+
+def calculate_lifecycle_batch(inputs, results, years=LIFECYCLE_YEARS, **assumptions):
+    """
+    Lifecycle metrics for a batch of buildings.
+
+    inputs is the frame passed to calculate_savings_batch and results its
+    output. Columns of inputs named like LIFECYCLE_DEFAULTS entries give
+    per-building assumptions, ahead of keyword arguments and defaults.
+    Returns a DataFrame of LIFECYCLE_COLUMNS on the results' index.
+    """
+    for name in LIFECYCLE_DEFAULTS:
+        if name in inputs:
+            assumptions[name] = inputs[name].to_numpy(dtype=float)
+    metrics = lifecycle_arrays(
+        results['electric_cost_savings'].to_numpy(dtype=float),
+        results['gas_cost_savings'].to_numpy(dtype=float),
+        inputs['csw_area'].to_numpy(dtype=float),
+        years,
+        **assumptions,
+    )
+    return pd.DataFrame(metrics, index=results.index, columns=LIFECYCLE_COLUMNS)
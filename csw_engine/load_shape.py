@@ -0,0 +1,224 @@
+"""
+Monthly and hourly profiles of annual CSW savings (load shapes)
+
+The engine gives annual savings. Here the heating and cooling parts are
+spread over the 12 months or 8,760 hours of a typical year, in proportion to
+heating and cooling degree-hours at the building's climate (65 °F base).
+Electric heating savings and gas savings follow the heating profile, cooling
+savings the cooling profile, so each building's periods sum back to its
+annual electric_savings_kwh and gas_savings_therms.
+
+The stations have annual HDD/CDD only, so each climate's typical year is
+synthesized: daily means on an annual cosine (coldest around 20 January)
+whose mean and swing are solved so its daily-mean degree days equal the
+station's HDD and CDD, plus a fixed diurnal cycle peaking at 3 pm. Measured
+hourly temperatures (e.g. from weather_files.read_weather_file) can be used
+instead through degree_hour_shapes.
+
+Everything is computed on (buildings, periods) arrays, one profile per
+distinct climate. LoadShapeWriter streams a portfolio to Parquet or .npy in
+blocks of buildings, so memory stays flat however many buildings there are.
+"""
+
+import os
+import struct
+
+import numpy as np
+
+from .weather_files import DEFAULT_BASE_F
+
+HOURS_PER_YEAR = 8760
+DAYS_PER_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+MONTH_STARTS = np.cumsum((0,) + DAYS_PER_MONTH[:-1]) * 24
+# 29 February in a leap-year hourly series, dropped to fit the typical year
+LEAP_DAY_HOURS = slice(59 * 24, 60 * 24)
+
+# Periods per building for each resolution
+LOAD_SHAPE_RESOLUTIONS = {'monthly': 12, 'hourly': HOURS_PER_YEAR}
+
+# Synthesized typical year
+COLDEST_DAY = 19                  # day of year (0-based) of the lowest daily mean
+DIURNAL_AMPLITUDE_F = 9.0         # half the typical day-night swing
+WARMEST_HOUR = 15
+MAX_ANNUAL_AMPLITUDE_F = 100.0
+AMPLITUDE_ITERATIONS = 50
+
+# Buildings per block when streaming, and the .npy header size reserved
+LOAD_SHAPE_BLOCK = 256
+NPY_HEADER_BYTES = 256
+
+# ============================================================================
+# CLIMATE PROFILES
+# ============================================================================
+
+def design_daily_means(hdd, cdd, base=DEFAULT_BASE_F):
+    """(climates, 365) daily mean temperatures (°F) reproducing each HDD/CDD pair"""
+    hdd = np.atleast_1d(np.asarray(hdd, dtype=float))
+    cdd = np.atleast_1d(np.asarray(cdd, dtype=float))
+    # The cosine sums to zero over the year, so HDD - CDD fixes the mean...
+    mean = base - (hdd - cdd) / 365.0
+    season = -np.cos(2 * np.pi * (np.arange(365) - COLDEST_DAY) / 365.0)
+
+    # ...and HDD grows with the swing, so bisect for the swing that gives it
+    low = np.zeros_like(hdd)
+    high = np.full_like(hdd, MAX_ANNUAL_AMPLITUDE_F)
+    for _ in range(AMPLITUDE_ITERATIONS):
+        amplitude = (low + high) / 2
+        daily = mean[:, None] + amplitude[:, None] * season
+        too_cold = np.maximum(base - daily, 0.0).sum(axis=1) > hdd
+        high = np.where(too_cold, amplitude, high)
+        low = np.where(too_cold, low, amplitude)
+    amplitude = (low + high) / 2
+    return mean[:, None] + amplitude[:, None] * season
+
+def design_temperatures(hdd, cdd, base=DEFAULT_BASE_F):
+    """(climates, 8760) synthesized hourly temperatures (°F) for HDD/CDD pairs"""
+    daily = design_daily_means(hdd, cdd, base)
+    diurnal = DIURNAL_AMPLITUDE_F * np.cos(2 * np.pi * (np.arange(24) - WARMEST_HOUR) / 24.0)
+    return (daily[:, :, None] + diurnal).reshape(len(daily), HOURS_PER_YEAR)
+
+def _shares(degree_hours):
+    """Each row as fractions of its total; a row with no degree-hours spreads evenly"""
+    total = degree_hours.sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(total > 0, degree_hours / total, 1.0 / degree_hours.shape[1])
+
+def degree_hour_shapes(temperature_f, resolution='hourly', base=DEFAULT_BASE_F):
+    """
+    (heating, cooling) profiles from hourly temperatures in °F.
+
+    temperature_f is (8760,) or (climates, 8760); leap-year series (8784)
+    lose 29 February. Each profile is (climates, periods) and sums to 1 per
+    climate.
+    """
+    if resolution not in LOAD_SHAPE_RESOLUTIONS:
+        raise ValueError(f"resolution must be one of {', '.join(LOAD_SHAPE_RESOLUTIONS)}")
+    temperature_f = np.atleast_2d(np.asarray(temperature_f, dtype=float))
+    if temperature_f.shape[1] == HOURS_PER_YEAR + 24:
+        temperature_f = np.delete(temperature_f, LEAP_DAY_HOURS, axis=1)
+    if temperature_f.shape[1] != HOURS_PER_YEAR:
+        raise ValueError(f"Expected {HOURS_PER_YEAR} hourly temperatures, got {temperature_f.shape[1]}")
+
+    heating = _shares(np.maximum(base - temperature_f, 0.0))
+    cooling = _shares(np.maximum(temperature_f - base, 0.0))
+    if resolution == 'monthly':
+        heating = np.add.reduceat(heating, MONTH_STARTS, axis=1)
+        cooling = np.add.reduceat(cooling, MONTH_STARTS, axis=1)
+    return heating, cooling
+
+def climate_shapes(hdd, cdd, resolution='hourly'):
+    """(heating, cooling) profiles for HDD/CDD pairs, from synthesized typical years"""
+    return degree_hour_shapes(design_temperatures(hdd, cdd), resolution)
+
+# ============================================================================
+# DISAGGREGATION
+# ============================================================================
+
+def result_array(results, column):
+    """One result column as a float array, from a frame or a single results dict"""
+    return np.atleast_1d(np.asarray(results[column], dtype=float))
+
+def savings_components(results):
+    """(electric heating kWh, cooling kWh, gas therms) per building from engine results"""
+    electric = result_array(results, 'electric_savings_kwh')
+    heating_per_sf = result_array(results, 'heating_per_sf')
+    per_sf = heating_per_sf + result_array(results, 'cooling_per_sf')
+    # electric_savings_kwh is (heating + cooling) per SF times area; split it the same way
+    with np.errstate(invalid='ignore', divide='ignore'):
+        heating_share = np.where(per_sf != 0, heating_per_sf / per_sf, 0.0)
+    heating_kwh = electric * heating_share
+    return heating_kwh, electric - heating_kwh, result_array(results, 'gas_savings_therms')
+
+def disaggregate(results, resolution='monthly'):
+    """
+    (electric_kwh, gas_therms) per building and period.
+
+    results is calculate_savings_batch output or one results dict. Both
+    arrays are (buildings, periods); buildings without results are NaN.
+    """
+    heating_kwh, cooling_kwh, gas_therms = savings_components(results)
+    climates = np.column_stack([result_array(results, 'hdd'), result_array(results, 'cdd')])
+    climates, codes = np.unique(climates, axis=0, return_inverse=True)
+    heating, cooling = climate_shapes(climates[:, 0], climates[:, 1], resolution)
+    heating, cooling = heating[codes.ravel()], cooling[codes.ravel()]
+    electric = heating_kwh[:, None] * heating + cooling_kwh[:, None] * cooling
+    return electric, gas_therms[:, None] * heating
+
+# ============================================================================
+# STREAMING OUTPUT
+# ============================================================================
+
+def load_shape_dtype(resolution):
+    """Record dtype of a .npy load-shape file: one float32 series per fuel"""
+    periods = LOAD_SHAPE_RESOLUTIONS[resolution]
+    return np.dtype([('electric_kwh', '<f4', (periods,)), ('gas_therms', '<f4', (periods,))])
+
+def _npy_header(dtype, rows):
+    """Fixed-size .npy (version 1.0) header, so it can be rewritten with the final row count"""
+    header = repr({'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (rows,)})
+    header = header.ljust(NPY_HEADER_BYTES - 11) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin-1')
+
+class LoadShapeWriter:
+    """
+    Append per-building load shapes to a Parquet or .npy file.
+
+    Parquet files are long: row (position in the portfolio), period (month
+    1-12 or hour of year 0-8759), electric_kwh and gas_therms. Anything
+    else is written as a .npy array of load_shape_dtype records, one per
+    building, which np.load(path, mmap_mode='r') maps without reading.
+    """
+
+    def __init__(self, path, resolution='hourly', block_size=LOAD_SHAPE_BLOCK):
+        if resolution not in LOAD_SHAPE_RESOLUTIONS:
+            raise ValueError(f"resolution must be one of {', '.join(LOAD_SHAPE_RESOLUTIONS)}")
+        self.path = path
+        self.resolution = resolution
+        self.block_size = block_size
+        self.rows = 0
+        self.parquet = os.path.splitext(path)[1].lower() in ('.parquet', '.pq')
+        self._writer = None
+        self._file = None
+        if not self.parquet:
+            self._dtype = load_shape_dtype(resolution)
+            self._file = open(path, 'wb')
+            self._file.write(_npy_header(self._dtype, 0))
+
+    def write(self, results):
+        """Disaggregate and append one frame of engine results"""
+        for start in range(0, len(results), self.block_size):
+            block = results.iloc[start:start + self.block_size]
+            electric, gas = disaggregate(block, self.resolution)
+            if self.parquet:
+                self._write_parquet(electric, gas)
+            else:
+                records = np.empty(len(block), dtype=self._dtype)
+                records['electric_kwh'] = electric
+                records['gas_therms'] = gas
+                self._file.write(records.tobytes())
+            self.rows += len(block)
+
+    def _write_parquet(self, electric, gas):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        buildings, periods = electric.shape
+        first_period = 1 if self.resolution == 'monthly' else 0
+        table = pa.table({
+            'row': np.repeat(np.arange(self.rows, self.rows + buildings, dtype=np.int64), periods),
+            'period': np.tile(np.arange(first_period, first_period + periods, dtype=np.int16), buildings),
+            'electric_kwh': electric.astype(np.float32).ravel(),
+            'gas_therms': gas.astype(np.float32).ravel(),
+        })
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.seek(0)
+            self._file.write(_npy_header(self._dtype, self.rows))
+            self._file.close()
+            self._file = None
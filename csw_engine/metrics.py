@@ -0,0 +1,221 @@
+"""
+Opt-in per-stage latency histograms and counters
+
+Set CSW_METRICS=1 before the engine is imported to instrument it. Engine
+functions marked with timed() are only wrapped then; otherwise they are left
+untouched, since even a flag check costs a quarter of a regression lookup.
+App stages use stage_timer(), which checks METRICS.enabled on each block, so
+enable_metrics() and disable_metrics() pause and resume recording at runtime.
+Durations go into fixed-bucket histograms, so memory stays constant however
+long the process runs, and percentiles are estimated from the buckets the way
+Prometheus does. to_prometheus() renders everything in the Prometheus text
+exposition format.
+"""
+
+import functools
+import os
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+from contextlib import contextmanager
+from time import perf_counter
+
+# Upper bounds in seconds, from a dict lookup to a cold CSV load
+DEFAULT_BUCKETS = (
+    0.000001, 0.0000025, 0.000005,
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+StageStats = namedtuple('StageStats', ['stage', 'count', 'total', 'max', 'p50', 'p90', 'p99'])
+
+
+class Histogram:
+    """Counts of observations per bucket, plus their sum and maximum"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Estimated q-quantile, interpolating linearly within its bucket"""
+        if not self.count:
+            return float('nan')
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                low = self.buckets[i - 1] if i else 0.0
+                high = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(low + (high - low) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def cumulative(self):
+        """(upper bound, cumulative count) pairs ending with +Inf"""
+        pairs, running = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            pairs.append((bound, running))
+        return pairs
+
+
+class MetricsRegistry:
+    """Thread-safe histograms per stage and named counters"""
+
+    def __init__(self, enabled=False, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def histogram(self, stage):
+        """Copy of one stage's histogram, or None if it has no observations"""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                return None
+            copy = Histogram(histogram.buckets)
+            copy.counts, copy.count = list(histogram.counts), histogram.count
+            copy.total, copy.max = histogram.total, histogram.max
+            return copy
+
+    def stages(self):
+        """StageStats per stage, sorted by name"""
+        with self._lock:
+            names = sorted(self._histograms)
+        stats = []
+        for name in names:
+            histogram = self.histogram(name)
+            stats.append(StageStats(name, histogram.count, histogram.total, histogram.max,
+                                    histogram.quantile(0.5), histogram.quantile(0.9), histogram.quantile(0.99)))
+        return stats
+
+    def counters(self):
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def to_prometheus(self, prefix='csw'):
+        """Histograms and counters in the Prometheus text exposition format"""
+        lines = [
+            f"# HELP {prefix}_stage_duration_seconds Time spent in each calculator stage.",
+            f"# TYPE {prefix}_stage_duration_seconds histogram",
+        ]
+        for stats in self.stages():
+            histogram = self.histogram(stats.stage)
+            label = _escape(stats.stage)
+            for bound, count in histogram.cumulative():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{prefix}_stage_duration_seconds_bucket{{stage="{label}",le="{le}"}} {count}')
+            lines.append(f'{prefix}_stage_duration_seconds_sum{{stage="{label}"}} {histogram.total!r}')
+            lines.append(f'{prefix}_stage_duration_seconds_count{{stage="{label}"}} {histogram.count}')
+        lines += [
+            f"# HELP {prefix}_events_total Calculator events such as cache hits and lookup misses.",
+            f"# TYPE {prefix}_events_total counter",
+        ]
+        for name, value in self.counters().items():
+            lines.append(f'{prefix}_events_total{{event="{_escape(name)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(label):
+    return label.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def caches_to_prometheus(caches, prefix='csw'):
+    """{name: CacheStats} as Prometheus counters and gauges labelled by cache"""
+    lines = []
+    for field, kind, help_text in (
+        ('hits', 'counter', 'Cache lookups that found an entry.'),
+        ('misses', 'counter', 'Cache lookups that had to calculate.'),
+        ('evictions', 'counter', 'Entries dropped to stay within maxsize.'),
+        ('size', 'gauge', 'Entries currently cached.'),
+        ('maxsize', 'gauge', 'Cache capacity.'),
+    ):
+        metric = f"{prefix}_cache_{field}" + ('_total' if kind == 'counter' else '')
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        for name, stats in caches.items():
+            value = getattr(stats, field)
+            if value is not None:  # a shared store has no entry limit
+                lines.append(f'{metric}{{cache="{_escape(name)}"}} {value}')
+    return '\n'.join(lines) + '\n'
+
+# ============================================================================
+# PROCESS-WIDE REGISTRY
+# ============================================================================
+
+# Whether timed() wraps engine functions; fixed when this module is imported
+INSTRUMENTED = os.environ.get('CSW_METRICS', '').lower() in ('1', 'true', 'yes')
+
+METRICS = MetricsRegistry(enabled=INSTRUMENTED)
+
+def enable_metrics():
+    METRICS.enabled = True
+
+def disable_metrics():
+    METRICS.enabled = False
+
+@contextmanager
+def stage_timer(stage, registry=METRICS):
+    """Time the enclosed block as one observation of stage, when enabled"""
+    if not registry.enabled:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(stage, perf_counter() - start)
+
+def timed(stage, registry=METRICS):
+    """
+    Decorator recording each call's duration under stage, when INSTRUMENTED.
+
+    Exceptions are counted as '<stage>_error'. Without CSW_METRICS the
+    function is returned as is.
+    """
+    def decorate(function):
+        if not INSTRUMENTED:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return function(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            except Exception:
+                registry.increment(f"{stage}_error")
+                raise
+            finally:
+                registry.observe(stage, perf_counter() - start)
+        return wrapper
+    return decorate
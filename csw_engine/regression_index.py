@@ -0,0 +1,70 @@
+"""
+Hashed index over the regression coefficient table
+
+The table is compiled once into a dict keyed on
+(base, csw, size, hvac_fuel, fuel, occupancy, hours). Blank and NaN cells are
+normalized to '' up front and every row is also registered under a fuel
+wildcard, so each lookup is a single dict probe returning a small tuple.
+"""
+
+import math
+from collections import namedtuple
+
+KEY_COLUMNS = ['base', 'csw', 'size', 'hvac_fuel', 'fuel', 'occupancy', 'hours']
+COEFFICIENT_COLUMNS = ['heat_a', 'heat_b', 'heat_c', 'cool_a', 'cool_b', 'cool_c']
+
+# Matches any value in the fuel column (first row in table order wins)
+ANY_FUEL = object()
+
+Coefficients = namedtuple('Coefficients', COEFFICIENT_COLUMNS)
+
+
+def normalize_key_value(value):
+    """Normalize a key cell: blank/NaN -> '', integral floats -> int"""
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        if math.isnan(value):
+            return ''
+        if value.is_integer():
+            return int(value)
+    return value
+
+
+def is_blank(value):
+    """True for the values the table treats as an empty cell"""
+    return normalize_key_value(value) == ''
+
+
+class RegressionIndex:
+    """O(1) lookup of regression coefficients by configuration key"""
+
+    def __init__(self, coefficients):
+        self._rows = {}
+        if coefficients.empty:
+            return
+        columns = coefficients[KEY_COLUMNS + COEFFICIENT_COLUMNS]
+        for record in columns.itertuples(index=False, name=None):
+            key = tuple(normalize_key_value(v) for v in record[:len(KEY_COLUMNS)])
+            values = Coefficients(*(float(v) for v in record[len(KEY_COLUMNS):]))
+            # setdefault keeps the first matching row, like iloc[0] on a mask
+            self._rows.setdefault(key, values)
+            self._rows.setdefault(key[:4] + (ANY_FUEL,) + key[5:], values)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get(self, base, csw, size, hvac_fuel, fuel, occupancy, hours):
+        """Return the Coefficients for a key, or None if no row matches"""
+        if fuel is not ANY_FUEL:
+            fuel = normalize_key_value(fuel)
+        key = (
+            base,
+            csw,
+            size,
+            normalize_key_value(hvac_fuel),
+            fuel,
+            normalize_key_value(occupancy),
+            normalize_key_value(hours),
+        )
+        return self._rows.get(key)
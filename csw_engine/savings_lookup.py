@@ -0,0 +1,261 @@
+"""
+Tabulated savings lookup: a fast path for exact table hits, and a cross-check
+
+savings_lookup.csv holds per-SF heating, cooling and gas savings and baseline
+EUI as tabulated by the original workbook. Its key concatenates the
+configuration and breakpoint, e.g. 'SingleDoubleMidOfficePVAV_ElecElectric2912'.
+Every row was evaluated for one reference climate: Houston, TX (1,439 HDD,
+2,974 CDD). The table also has rows for building types the engine doesn't
+model (schools, hospitals, multifamily).
+
+SavingsLookup hashes the rows by key. A request at the reference climate with
+hours (Office) or occupancy (Hotel) exactly on a regression breakpoint reads
+its Intensity from the table instead of evaluating four regressions.
+
+cross_check() runs the regression path for every row and reports how far the
+table deviates. The process-wide lookup only serves rows that match, so the
+fast path never moves a result by more than rounding; the rest are left to
+the regressions. Run the check with:
+    python -m csw_engine.savings_lookup
+"""
+
+import argparse
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+from .calculations import (
+    LARGE_OFFICE_HVAC,
+    Intensity,
+    build_lookup_config_hotel,
+    build_lookup_config_office,
+    calculate_cooling_multiplier_office,
+    calculate_intensity_hotel,
+    calculate_intensity_office,
+)
+from .constants import CSW_TYPE_MAPPING
+from .exceptions import CoefficientNotFoundError
+
+# Climate every row of the table was evaluated at (Houston, TX)
+REFERENCE_HDD = 1439
+REFERENCE_CDD = 2974
+
+OFFICE_HOURS = (2080, 2912, 8760)
+HOTEL_OCCUPANCY = {33: 'Low', 100: 'High'}
+
+# Table column per Intensity field
+TABLE_FIELDS = {
+    'heating_per_sf': 'heating_kwh',
+    'cooling_per_sf': 'cooling_kwh',
+    'gas_per_sf': 'gas_therms',
+    'baseline_eui': 'baseline_eui',
+}
+
+# Workbook rounding puts a few rows about 1e-12 off the regression
+DEFAULT_RTOL = 1e-9
+
+_KEY_PATTERN = re.compile(
+    r'^(?P<base>Single|Double)(?P<csw>Single|Double)(?P<size>Small|Mid|Large)(?P<building_type>Office|Hotel)'
+    r'(?P<hvac>PVAV_Elec|PVAV_Gas|VAV|PTAC|PTHP|FCU)(?P<fuel>Electric|Natural Gas)(?P<variant>Low|High)?'
+    r'(?P<point>\d+)$'
+)
+
+# Wizard HVAC system for each key token; Hotel 'Other' shares the FCU rows
+_HVAC_SYSTEMS = {
+    'PVAV_Elec': 'Packaged VAV with electric reheat',
+    'PVAV_Gas': 'Packaged VAV with hydronic reheat',
+    'VAV': LARGE_OFFICE_HVAC,
+    'PTAC': 'PTAC',
+    'PTHP': 'PTHP',
+    'FCU': 'Fan Coil Unit',
+}
+_CSW_TYPES = {mapped: product for product, mapped in CSW_TYPE_MAPPING.items()}
+
+# ============================================================================
+# KEYS
+# ============================================================================
+
+def lookup_key(inputs, building_type):
+    """Table key for inputs, or None when hours/occupancy isn't a breakpoint"""
+    if building_type == 'Office':
+        hours = inputs['operating_hours']
+        if hours not in OFFICE_HOURS:
+            return None
+        config = build_lookup_config_office(inputs, int(hours))
+        return (f"{config['base']}{config['csw']}{config['size']}Office"
+                f"{config['hvac_fuel']}{config['fuel']}{int(hours)}")
+
+    if building_type == 'Hotel':
+        occupancy = inputs['occupancy_percent']
+        if occupancy not in HOTEL_OCCUPANCY:
+            return None
+        config = build_lookup_config_hotel(inputs, HOTEL_OCCUPANCY[occupancy])
+        fuel = 'Natural Gas' if config['fuel'] == 'Gas' else 'Electric'
+        return (f"{config['base']}{config['csw']}{config['size']}Hotel"
+                f"{config['hvac_fuel'] or 'FCU'}{fuel}{int(occupancy)}")
+
+    return None
+
+def key_inputs(key):
+    """
+    Wizard inputs (building type, inputs) that land on a table key, or None.
+
+    None for rows the engine doesn't model: other building types, the PTHP
+    Low/High variants, and combinations no wizard input maps to.
+    """
+    match = _KEY_PATTERN.match(key)
+    if match is None or match['variant']:
+        return None
+    building_type = match['building_type']
+    point = int(match['point'])
+    inputs = {
+        'existing_window': f"{match['base']} pane",
+        'csw_type': _CSW_TYPES[match['csw']],
+        'hvac_system': _HVAC_SYSTEMS[match['hvac']],
+        'heating_fuel': match['fuel'],
+        'cooling_installed': 'Yes',
+        'building_area': 50000 if match['size'] == 'Large' else 20000,
+        'num_floors': 3,
+        'csw_area': 1000,
+        'hdd': REFERENCE_HDD,
+        'cdd': REFERENCE_CDD,
+        'operating_hours': point if building_type == 'Office' else 2912,
+        'occupancy_percent': point if building_type == 'Hotel' else 100,
+    }
+    if lookup_key(inputs, building_type) != key:
+        return None
+    return building_type, inputs
+
+def _table_intensity(row):
+    return Intensity(*(float(row[column]) for column in TABLE_FIELDS.values()))
+
+# ============================================================================
+# FAST PATH
+# ============================================================================
+
+class SavingsLookup:
+    """Hashed table rows, read when a request lands exactly on one"""
+
+    def __init__(self, table, hdd=REFERENCE_HDD, cdd=REFERENCE_CDD):
+        self.hdd = hdd
+        self.cdd = cdd
+        self._rows = {
+            row['lookup_key']: _table_intensity(row)
+            for row in table.to_dict('records')
+        }
+
+    @classmethod
+    def verified(cls, table, index=None, rtol=DEFAULT_RTOL):
+        """Lookup over only the rows that match the regression path"""
+        check = cross_check(table, index, rtol)
+        matching = set(check.loc[check['status'] == 'match', 'lookup_key'])
+        return cls(table[table['lookup_key'].isin(matching)])
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def get(self, key):
+        """Tabulated Intensity for a key, or None"""
+        return self._rows.get(key)
+
+    def intensity(self, inputs, building_type):
+        """Tabulated Intensity for inputs, or None when they aren't in the table"""
+        if inputs.get('hdd', 0) != self.hdd or inputs.get('cdd', 0) != self.cdd:
+            return None
+        key = lookup_key(inputs, building_type)
+        tabulated = self._rows.get(key) if key else None
+        if tabulated is None or inputs['cooling_installed'] == 'Yes':
+            return tabulated
+
+        # Rows assume cooling is installed; adjust the way the regression path does
+        if building_type == 'Hotel':
+            return tabulated._replace(cooling_per_sf=0)
+        size = 'Large' if 'LargeOffice' in key else 'Mid'
+        multiplier = calculate_cooling_multiplier_office(self.cdd, size)
+        return tabulated._replace(cooling_per_sf=tabulated.cooling_per_sf * multiplier)
+
+# ============================================================================
+# CROSS-CHECK
+# ============================================================================
+
+def cross_check(table, index=None, rtol=DEFAULT_RTOL):
+    """
+    Compare every table row with the regression path at the reference climate.
+
+    One row per key with status 'match', 'deviation', 'unmodelled' (no
+    wizard input lands on it) or 'no coefficients', the largest relative
+    difference over the four fields, and both sets of values.
+    """
+    records = []
+    for row in table.to_dict('records'):
+        key = row['lookup_key']
+        tabulated = _table_intensity(row)
+        record = {'lookup_key': key, 'building_type': None, 'status': 'unmodelled', 'max_rel_diff': np.nan}
+        record.update({f"{column}_table": value for column, value in zip(TABLE_FIELDS.values(), tabulated)})
+        records.append(record)
+
+        parsed = key_inputs(key)
+        if parsed is None:
+            continue
+        building_type, inputs = parsed
+        record['building_type'] = building_type
+        try:
+            if building_type == 'Office':
+                regression = calculate_intensity_office(inputs, index)
+            else:
+                regression = calculate_intensity_hotel(inputs, index)
+        except CoefficientNotFoundError:
+            record['status'] = 'no coefficients'
+            continue
+
+        table_values = np.array(tabulated, dtype=float)
+        regression_values = np.array(regression, dtype=float)
+        record.update({f"{column}_regression": value
+                       for column, value in zip(TABLE_FIELDS.values(), regression_values)})
+        scale = np.maximum(np.abs(regression_values), np.finfo(float).tiny)
+        record['max_rel_diff'] = float(np.max(np.abs(table_values - regression_values) / scale))
+        matches = np.allclose(table_values, regression_values, rtol=rtol, atol=1e-12)
+        record['status'] = 'match' if matches else 'deviation'
+
+    columns = ['lookup_key', 'building_type', 'status', 'max_rel_diff']
+    for column in TABLE_FIELDS.values():
+        columns += [f"{column}_table", f"{column}_regression"]
+    return pd.DataFrame(records, columns=columns)
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def main(argv=None):
+    from .data import get_regression_index, load_savings_lookup
+
+    parser = argparse.ArgumentParser(
+        description='Cross-check savings_lookup.csv against the regression coefficients.')
+    parser.add_argument('--rtol', type=float, default=DEFAULT_RTOL,
+                        help=f'Relative tolerance for a match (default: {DEFAULT_RTOL:g})')
+    parser.add_argument('--output', help='Write the full comparison as CSV')
+    parser.add_argument('--strict', action='store_true',
+                        help='Exit with status 1 if any modelled row deviates or lacks coefficients')
+    args = parser.parse_args(argv)
+
+    check = cross_check(load_savings_lookup(), get_regression_index(), args.rtol)
+    counts = check['status'].value_counts()
+    print(', '.join(f"{counts.get(status, 0)} {status}"
+                    for status in ('match', 'deviation', 'no coefficients', 'unmodelled')))
+
+    problems = check[check['status'].isin(['deviation', 'no coefficients'])]
+    for row in problems.itertuples():
+        print(f"  {row.lookup_key:<46} {row.status:<16} max rel diff {row.max_rel_diff:.3g}")
+    if args.output:
+        check.to_csv(args.output, index=False)
+
+    if args.strict and len(problems):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
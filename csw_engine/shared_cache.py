@@ -0,0 +1,505 @@
+"""
+Host-wide cache shared by every process on a machine
+
+st.cache_data and ResultCache live inside one server process, so every
+replica behind a load balancer recomputes on its own, and a restart starts
+cold. SQLiteCache keeps pickled values in one SQLite file (WAL mode) that all
+processes on the host open.
+
+Entries are versioned on the data-file checksums, and computed results also
+on a fingerprint of the engine's source. A process running with different
+CSVs (or a different bundle), or a deploy that changes a formula, neither
+reads nor replaces another version's entries, and those age out. Each entry also expires after a TTL,
+and the file is kept under max_bytes by dropping the least recently used
+entries, whatever their version. Values are pickles: keep the file where
+only the app's user can write.
+
+open_cache() picks the backend from CSW_CACHE:
+    sqlite (default)   per-process LRU in front of the host-wide file
+    sqlite:PATH        the same, with an explicit file
+    memory             per-process LRU only, as before
+
+Prefill the configurations users start from with:
+    python -m csw_engine.shared_cache warm
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from .cache import DEFAULT_CACHE_SIZE, CacheStats, ResultCache, _normalize_value
+
+CACHE_FORMAT_VERSION = 1
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Namespaces holding loaded data files rather than results computed from them;
+# their entries stay valid across engine code changes
+DATA_NAMESPACES = ('dataset',)
+
+# Size is checked against max_bytes once per this many stores
+EVICTION_INTERVAL = 100
+# Eviction frees space down to this fraction of max_bytes
+EVICTION_TARGET = 0.9
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    version TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (namespace, version, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+def default_cache_path():
+    """cache.sqlite under $XDG_CACHE_HOME/csw (~/.cache/csw)"""
+    root = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(root, 'csw', 'cache.sqlite')
+
+def data_version(data_dir=None):
+    """Short hash of the data-file checksums (bundle and CSVs) and the cache format"""
+    from .data import get_data_bundle, source_checksums
+
+    checksums = source_checksums(data_dir)
+    bundle = get_data_bundle() if data_dir is None else None
+    if bundle is not None:
+        checksums = {**bundle.checksums, **checksums}
+    payload = json.dumps({'format': CACHE_FORMAT_VERSION, 'checksums': checksums}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+@functools.lru_cache(maxsize=None)
+def code_fingerprint():
+    """Short hash of the csw_engine sources"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for directory, subdirectories, files in sorted(os.walk(root)):
+        subdirectories.sort()
+        for name in sorted(files):
+            if name.endswith('.py'):
+                path = os.path.join(directory, name)
+                digest.update(os.path.relpath(path, root).encode() + b'\0')
+                with open(path, 'rb') as f:
+                    digest.update(f.read() + b'\0')
+    return digest.hexdigest()[:16]
+
+def cache_version(namespace, data_dir=None):
+    """
+    Version for namespace's entries: data_version for DATA_NAMESPACES,
+    otherwise the data version combined with the engine code fingerprint.
+    """
+    version = data_version(data_dir)
+    if namespace in DATA_NAMESPACES:
+        return version
+    return hashlib.sha256(f"{version}:{code_fingerprint()}".encode()).hexdigest()[:16]
+
+_JSON_SCALARS = (str, float, bool, type(None))
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return _normalize_value(value)
+
+def stable_key(key):
+    """
+    Text form of a key that is the same in every process.
+
+    Tuples, lists and dicts (sorted by key) of strings, numbers, booleans
+    and None; numbers are compared as floats, as in the in-process cache.
+    """
+    # Keys from result_cache_key and intensity_cache_key are already normalized
+    if type(key) is tuple and all(type(value) in _JSON_SCALARS for value in key):
+        return json.dumps(key, separators=(',', ':'))
+    return json.dumps(_jsonable(key), sort_keys=True, separators=(',', ':'), default=repr)
+
+# ============================================================================
+# SQLITE BACKEND
+# ============================================================================
+
+class SQLiteCache:
+    """
+    Pickled values in a SQLite file shared by every process on the host.
+
+    Has ResultCache's interface. Each thread gets its own connection. A
+    database error (a full disk, a lock held past the busy timeout) counts
+    as a miss or a skipped store rather than failing the calculation.
+    """
+
+    def __init__(self, path=None, namespace='default', version=None, ttl=DEFAULT_TTL,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path or default_cache_path()
+        self.namespace = namespace
+        self.version = version or cache_version(namespace)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._stores = 0
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def __len__(self):
+        row = self._connection().execute(
+            'SELECT COUNT(*) FROM entries WHERE namespace = ? AND version = ? AND expires > ?',
+            (self.namespace, self.version, time.time())).fetchone()
+        return row[0]
+
+    def get(self, key):
+        """
+        Cached value for key, or None; counts a hit or miss.
+
+        A value that no longer unpickles (a truncated blob, or a class that
+        has since moved or changed) is a miss, and its row is deleted.
+        """
+        text = stable_key(key)
+        now = time.time()
+        value = None
+        try:
+            connection = self._connection()
+            row = connection.execute(
+                'SELECT value, expires FROM entries WHERE namespace = ? AND version = ? AND key = ?',
+                (self.namespace, self.version, text)).fetchone()
+            if row is not None and row[1] > now:
+                try:
+                    value = pickle.loads(row[0])
+                except Exception:
+                    connection.execute(
+                        'DELETE FROM entries WHERE namespace = ? AND version = ? AND key = ?',
+                        (self.namespace, self.version, text))
+                else:
+                    connection.execute(
+                        'UPDATE entries SET accessed = ?, hits = hits + 1 '
+                        'WHERE namespace = ? AND version = ? AND key = ?',
+                        (now, self.namespace, self.version, text))
+        except sqlite3.Error:
+            value = None
+        self._count('_misses' if value is None else '_hits')
+        return value
+
+    def put(self, key, value):
+        """Store value for key, replacing any earlier value under this version"""
+        self.put_many([(key, value)])
+
+    def put_many(self, items):
+        """Store (key, value) pairs in one transaction"""
+        now = time.time()
+        rows = []
+        for key, value in items:
+            text = stable_key(key)
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            rows.append((self.namespace, self.version, text, blob, len(text) + len(blob), now + self.ttl, now))
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute('BEGIN IMMEDIATE')
+                connection.executemany(
+                    'INSERT INTO entries (namespace, version, key, value, size, expires, accessed) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (namespace, version, key) DO UPDATE SET '
+                    'value = excluded.value, size = excluded.size, '
+                    'expires = excluded.expires, accessed = excluded.accessed',
+                    rows)
+        except sqlite3.Error:
+            return
+        with self._lock:
+            before = self._stores
+            self._stores += len(rows)
+            check = self._stores // EVICTION_INTERVAL != before // EVICTION_INTERVAL
+        if check:
+            self.evict()
+
+    def get_or_compute(self, key, compute):
+        """Cached value for key, or compute() stored and returned"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones over max_bytes; returns the count"""
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute('BEGIN IMMEDIATE')
+                dropped = connection.execute('DELETE FROM entries WHERE expires <= ?', (time.time(),)).rowcount
+                total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+                if total > self.max_bytes:
+                    excess = total - self.max_bytes * EVICTION_TARGET
+                    victims = []
+                    for namespace, version, key, size in connection.execute(
+                            'SELECT namespace, version, key, size FROM entries ORDER BY accessed'):
+                        victims.append((namespace, version, key))
+                        excess -= size
+                        if excess <= 0:
+                            break
+                    connection.executemany(
+                        'DELETE FROM entries WHERE namespace = ? AND version = ? AND key = ?', victims)
+                    dropped += len(victims)
+        except sqlite3.Error:
+            return 0
+        self._count('_evictions', dropped)
+        return dropped
+
+    def purge_versions(self):
+        """Drop every namespace's entries from versions other than cache_version's; returns the count"""
+        data, computed = cache_version(DATA_NAMESPACES[0]), cache_version(None)
+        marks = ', '.join('?' * len(DATA_NAMESPACES))
+        connection = self._connection()
+        with connection:
+            return connection.execute(
+                f'DELETE FROM entries WHERE CASE WHEN namespace IN ({marks}) THEN version != ? ELSE version != ? END',
+                (*DATA_NAMESPACES, data, computed)).rowcount
+
+    def most_used(self, limit, any_version=True):
+        """Keys of this namespace with the most hits, as decoded JSON"""
+        query = 'SELECT key, SUM(hits) AS total FROM entries WHERE namespace = ?'
+        parameters = [self.namespace]
+        if not any_version:
+            query += ' AND version = ?'
+            parameters.append(self.version)
+        query += ' GROUP BY key HAVING total > 0 ORDER BY total DESC LIMIT ?'
+        rows = self._connection().execute(query, (*parameters, limit)).fetchall()
+        return [json.loads(key) for key, _ in rows]
+
+    def size_bytes(self):
+        """Bytes of keys and values stored under every namespace and version"""
+        return self._connection().execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def stats(self):
+        """Counters for this process, and entries for this namespace and version"""
+        with self._lock:
+            hits, misses, evictions = self._hits, self._misses, self._evictions
+        return CacheStats(hits, misses, evictions, len(self), None)
+
+    def clear(self):
+        """Drop this namespace's entries (every version) and reset the counters"""
+        connection = self._connection()
+        with connection:
+            connection.execute('DELETE FROM entries WHERE namespace = ?', (self.namespace,))
+        with self._lock:
+            self._hits = self._misses = self._evictions = 0
+
+    def close(self):
+        """Close this thread's connection"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+# ============================================================================
+# TIERED CACHE
+# ============================================================================
+
+class TieredCache:
+    """A per-process ResultCache in front of a shared store; shared hits are promoted"""
+
+    def __init__(self, front, back):
+        self.front = front
+        self.back = back
+
+    def __len__(self):
+        return len(self.front)
+
+    def get(self, key):
+        value = self.front.get(key)
+        if value is None:
+            value = self.back.get(key)
+            if value is not None:
+                self.front.put(key, value)
+        return value
+
+    def put(self, key, value):
+        self.front.put(key, value)
+        self.back.put(key, value)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def stats(self):
+        """The per-process cache's counters; the store's are under back.stats()"""
+        return self.front.stats()
+
+    def clear(self):
+        self.front.clear()
+        self.back.clear()
+
+# ============================================================================
+# BACKEND SELECTION
+# ============================================================================
+
+def shared_store(namespace, backend=None, **options):
+    """
+    SQLiteCache for namespace as configured by backend (default: CSW_CACHE),
+    or None when the backend is 'memory' or the file can't be opened.
+    """
+    backend = backend or os.environ.get('CSW_CACHE', 'sqlite')
+    if backend == 'memory':
+        return None
+    if backend != 'sqlite' and not backend.startswith('sqlite:'):
+        raise ValueError(f"Unknown cache backend: {backend!r} (use sqlite, sqlite:PATH or memory)")
+    path = backend[len('sqlite:'):] or None
+    try:
+        return SQLiteCache(path, namespace, **options)
+    except (OSError, sqlite3.Error):
+        return None
+
+def open_cache(namespace, backend=None, maxsize=DEFAULT_CACHE_SIZE, **options):
+    """Per-process LRU for namespace, backed by the shared store when there is one"""
+    front = ResultCache(maxsize)
+    store = shared_store(namespace, backend, **options)
+    return front if store is None else TieredCache(front, store)
+
+# ============================================================================
+# WARM-UP
+# ============================================================================
+
+# Hours and occupancy the wizard starts from
+WARM_POSITIONS = {'Office': 8000, 'Hotel': 70}
+
+def intensity_inputs(key):
+    """Inputs that reproduce an intensity_cache_key (as decoded JSON), with its building type"""
+    building_type, window, csw, hvac, fuel, cooling, is_large, hdd, cdd, position = key
+    inputs = {
+        'existing_window': window,
+        'csw_type': csw,
+        'hvac_system': hvac,
+        'heating_fuel': fuel,
+        'cooling_installed': cooling,
+        'building_area': 50000 if is_large else 20000,
+        'hdd': hdd,
+        'cdd': cdd,
+        'operating_hours' if building_type == 'Office' else 'occupancy_percent': position,
+    }
+    return building_type, inputs
+
+def default_intensity_keys(store=None):
+    """intensity_cache_key for every configuration the wizard offers, at every station, at default hours/occupancy"""
+    from .cache import intensity_cache_key
+    from .constants import available_csw_types, available_heating_fuels
+    from .cube import iter_config_keys
+    from .data import get_weather_store
+
+    store = store or get_weather_store()
+    for building_type, window, csw, hvac, fuel, cooling, is_large in iter_config_keys():
+        if csw not in available_csw_types(window) or fuel not in available_heating_fuels(building_type, hvac):
+            continue
+        _, inputs = intensity_inputs((building_type, window, csw, hvac, fuel, cooling, is_large,
+                                      0, 0, WARM_POSITIONS[building_type]))
+        for hdd, cdd in zip(store.hdd, store.cdd):
+            inputs['hdd'], inputs['cdd'] = float(hdd), float(cdd)
+            yield building_type, intensity_cache_key(inputs, building_type), dict(inputs)
+
+def warm_intensity(cache, top=1000, defaults=True, chunk=5000):
+    """
+    Prefill the intensity namespace; returns the number of entries stored.
+
+    Stores the top most-hit keys of any data version, recalculated for this
+    one, then (with defaults) every wizard configuration at every station at
+    the default hours/occupancy.
+    """
+    from .calculations import calculate_intensity
+    from .cache import intensity_cache_key
+    from .exceptions import CoefficientNotFoundError
+
+    def candidates():
+        for key in cache.most_used(top) if top else []:
+            building_type, inputs = intensity_inputs(key)
+            yield building_type, intensity_cache_key(inputs, building_type), inputs
+        if defaults:
+            yield from default_intensity_keys()
+
+    stored, batch, seen = 0, [], set()
+    for building_type, key, inputs in candidates():
+        if key in seen:
+            continue
+        seen.add(key)
+        try:
+            batch.append((key, calculate_intensity(inputs, building_type)))
+        except CoefficientNotFoundError:
+            continue
+        if len(batch) >= chunk:
+            cache.put_many(batch)
+            stored += len(batch)
+            batch = []
+    if batch:
+        cache.put_many(batch)
+        stored += len(batch)
+    return stored
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the host-wide CSW result cache.')
+    parser.add_argument('--path', default=None, help=f'Cache file (default: {default_cache_path()})')
+    commands = parser.add_subparsers(dest='command', required=True)
+    warm = commands.add_parser('warm', help='Prefill the intensity cache')
+    warm.add_argument('--top', type=int, default=1000,
+                      help='Most-hit keys from any data version to recalculate (default: 1000)')
+    warm.add_argument('--no-defaults', action='store_true',
+                      help='Skip the wizard configurations at default hours/occupancy')
+    commands.add_parser('stats', help='Show entries and size per namespace and version')
+    commands.add_parser('purge', help='Drop expired entries and those from other versions')
+    args = parser.parse_args(argv)
+
+    cache = SQLiteCache(args.path, namespace='intensity')
+    start = time.perf_counter()
+    if args.command == 'warm':
+        stored = warm_intensity(cache, top=args.top, defaults=not args.no_defaults)
+        cache.evict()
+        print(f"Stored {stored:,} intensities for version {cache.version} in {cache.path} "
+              f"({time.perf_counter() - start:.1f}s)")
+    elif args.command == 'purge':
+        dropped = cache.purge_versions() + cache.evict()
+        print(f"Dropped {dropped:,} entries; {cache.size_bytes() / 1e6:.1f} MB left in {cache.path}")
+    else:
+        rows = cache._connection().execute(
+            'SELECT namespace, version, COUNT(*), SUM(size), SUM(hits) FROM entries '
+            'GROUP BY namespace, version ORDER BY namespace, version').fetchall()
+        current = {namespace: cache_version(namespace) for namespace, *_ in rows}
+        print(f"{cache.path} (data version {data_version()}, engine {code_fingerprint()})")
+        for namespace, version, count, size, hits in rows:
+            marker = '' if version == current[namespace] else '  (other version)'
+            print(f"  {namespace:<12} {version}  {count:>8,} entries  {size / 1e6:8.1f} MB  {hits:>8,} hits{marker}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+Nearest-station resolution from latitude/longitude
+
+Stations are indexed as 3-D unit vectors, so straight-line (chord) distance
+ranks neighbours exactly like great-circle distance. A lat/lon grid covering
+the stations stores, for every cell, the candidate stations that can be among
+the GRID_K_MAX nearest to any point in that cell. A query therefore only
+scores a handful of candidates; coordinates outside the grid (or k above
+GRID_K_MAX) fall back to an exact search over all stations. Both paths are
+vectorized over the query batch.
+"""
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Grid cell size in degrees and the largest k the grid candidates support
+GRID_DEGREES = 1.0
+GRID_K_MAX = 8
+
+# Queries per block, bounding the (block x candidates) working arrays
+QUERY_BLOCK_SIZE = 8192
+
+# Distances below this are treated as "at the station" for IDW
+EXACT_DISTANCE_KM = 0.01
+
+def to_unit_vectors(lat, lon):
+    """(n, 3) unit vectors for latitude/longitude arrays in degrees"""
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+def chord_to_km(chord):
+    """Great-circle distance in km for a unit-sphere chord length"""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0.0, 1.0))
+
+def _top_k(similarity, k):
+    """Column indices and values of the k largest similarities per row, best first"""
+    if k == 1:
+        best = np.argmax(similarity, axis=1)[:, None]
+    else:
+        best = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(similarity, best, axis=1), axis=1)
+        best = np.take_along_axis(best, order, axis=1)
+    return best, np.take_along_axis(similarity, best, axis=1)
+
+def _similarity_to_chord(similarity):
+    return np.sqrt(np.maximum(2.0 - 2.0 * similarity, 0.0))
+
+
+class StationLocator:
+    """Spatial index over weather stations that have coordinates"""
+
+    def __init__(self, store):
+        self.store = store
+        if store.lat is None:
+            raise ValueError("Weather data has no station coordinates")
+        has_coords = ~(np.isnan(store.lat) | np.isnan(store.lon))
+        # Row positions in the store for each indexed station
+        self.positions = np.flatnonzero(has_coords)
+        self._lat = store.lat[has_coords]
+        self._lon = store.lon[has_coords]
+        self._points = to_unit_vectors(self._lat, self._lon)
+        # Contiguous x/y/z columns with a trailing zero entry, so the -1
+        # padding in candidate lists gathers a harmless dummy station
+        self._columns = [np.append(self._points[:, axis], 0.0) for axis in range(3)]
+        self._build_grid()
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _build_grid(self):
+        """Precompute per-cell candidate lists that are exact for k <= GRID_K_MAX"""
+        self._lat0 = np.floor(self._lat.min()) - GRID_DEGREES
+        self._lon0 = np.floor(self._lon.min()) - GRID_DEGREES
+        self._rows = int(np.ceil((self._lat.max() + GRID_DEGREES - self._lat0) / GRID_DEGREES))
+        self._cols = int(np.ceil((self._lon.max() + GRID_DEGREES - self._lon0) / GRID_DEGREES))
+
+        south = self._lat0 + np.arange(self._rows) * GRID_DEGREES
+        west = self._lon0 + np.arange(self._cols) * GRID_DEGREES
+        south, west = (a.ravel() for a in np.meshgrid(south, west, indexing='ij'))
+        centers = to_unit_vectors(south + GRID_DEGREES / 2, west + GRID_DEGREES / 2)
+
+        # Cell radius: farthest corner from the center (chord length)
+        radius = np.zeros(len(centers))
+        for d_lat in (0, GRID_DEGREES):
+            for d_lon in (0, GRID_DEGREES):
+                corner = to_unit_vectors(south + d_lat, west + d_lon)
+                radius = np.maximum(radius, np.linalg.norm(corner - centers, axis=1))
+
+        # Any point p in the cell has d(p, s) within d(c, s) ± radius, so the
+        # k nearest to p are all within d_k(c) + 2 * radius of the center
+        distance = _similarity_to_chord(centers @ self._points.T)
+        k = min(GRID_K_MAX, len(self))
+        kth = np.partition(distance, k - 1, axis=1)[:, k - 1]
+        candidate = distance <= (kth + 2 * radius * 1.0001)[:, None]
+
+        self._counts = candidate.sum(axis=1)
+        width = self._counts.max()
+        order = np.argsort(~candidate, axis=1, kind='stable')[:, :width]
+        self._cells = np.where(np.arange(width) < self._counts[:, None], order, -1)
+
+    def _cell_ids(self, lat, lon):
+        """Grid cell per coordinate, -1 outside the grid"""
+        row = np.floor((lat - self._lat0) / GRID_DEGREES)
+        col = np.floor((lon - self._lon0) / GRID_DEGREES)
+        inside = (row >= 0) & (row < self._rows) & (col >= 0) & (col < self._cols)
+        return np.where(inside, row * self._cols + col, -1).astype(np.int64)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def nearest(self, lat, lon, k=1):
+        """
+        k nearest stations for each coordinate.
+
+        Returns (distance_km, position) arrays of shape (n, k), nearest first;
+        position indexes the WeatherStore rows. Missing or out-of-range
+        coordinates get position -1 and NaN distance.
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=float))
+        lon = np.atleast_1d(np.asarray(lon, dtype=float))
+        k = min(k, len(self))
+        queries = to_unit_vectors(lat, lon)
+        chord = np.full((len(queries), k), np.nan)
+        nearest = np.full((len(queries), k), -1, dtype=np.int64)
+
+        with np.errstate(invalid='ignore'):
+            valid = (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+        cells = self._cell_ids(lat, lon) if k <= GRID_K_MAX else np.full(len(queries), -1)
+        on_grid = np.flatnonzero(valid & (cells >= 0))
+        off_grid = np.flatnonzero(valid & (cells < 0))
+        for start in range(0, len(on_grid), QUERY_BLOCK_SIZE):
+            rows = on_grid[start:start + QUERY_BLOCK_SIZE]
+            chord[rows], nearest[rows] = self._grid_search(queries[rows], cells[rows], k)
+        for start in range(0, len(off_grid), QUERY_BLOCK_SIZE):
+            rows = off_grid[start:start + QUERY_BLOCK_SIZE]
+            chord[rows], nearest[rows] = self._full_search(queries[rows], k)
+        return chord_to_km(chord), np.where(nearest >= 0, self.positions[nearest], -1)
+
+    def _grid_search(self, queries, cells, k):
+        """Score only each cell's candidate stations"""
+        width = self._counts[cells].max()
+        candidates = self._cells[cells, :width]
+        similarity = sum(
+            np.take(column, candidates) * queries[:, axis:axis + 1]
+            for axis, column in enumerate(self._columns)
+        )
+        similarity[candidates < 0] = -np.inf
+        best, best_similarity = _top_k(similarity, k)
+        return _similarity_to_chord(best_similarity), np.take_along_axis(candidates, best, axis=1)
+
+    def _full_search(self, queries, k):
+        """Score every station"""
+        best, best_similarity = _top_k(queries @ self._points.T, k)
+        return _similarity_to_chord(best_similarity), best
+
+    def degree_days(self, lat, lon, k=1, power=2):
+        """
+        HDD and CDD arrays for coordinates.
+
+        With k=1 the nearest station's values are returned; with k > 1 they
+        are inverse-distance weighted (weight = 1 / distance**power) across
+        the k nearest, and a station at (effectively) zero distance takes all
+        the weight. Coordinates without a station (see nearest) give NaN.
+        """
+        distance, position = self.nearest(lat, lon, k)
+        hdd = np.where(position >= 0, self.store.hdd[position], np.nan)
+        cdd = np.where(position >= 0, self.store.cdd[position], np.nan)
+        if distance.shape[1] == 1:
+            return hdd[:, 0], cdd[:, 0]
+
+        exact = distance <= EXACT_DISTANCE_KM
+        with np.errstate(divide='ignore'):
+            weights = 1.0 / np.maximum(distance, EXACT_DISTANCE_KM) ** power
+        weights = np.where(exact.any(axis=1, keepdims=True), exact.astype(float), weights)
+        weights /= weights.sum(axis=1, keepdims=True)
+        return (hdd * weights).sum(axis=1), (cdd * weights).sum(axis=1)
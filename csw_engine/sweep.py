@@ -0,0 +1,63 @@
+"""
+Sensitivity sweeps over operating hours (Office) or occupancy (Hotel)
+
+A sweep holds every input fixed except the interpolation position (and,
+optionally, the utility rates) and evaluates the whole range in one
+vectorized pass through calculate_savings_batch.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .batch import broadcast_frame, calculate_savings_batch
+from .constants import OPERATING_HOURS_RANGE, OCCUPANCY_RANGE
+from .cube import BREAKPOINTS
+
+# Input ranges offered by the wizard
+SWEEP_RANGES = {
+    'Office': ('operating_hours', *OPERATING_HOURS_RANGE),
+    'Hotel': ('occupancy_percent', *OCCUPANCY_RANGE),
+}
+
+DEFAULT_SWEEP_POINTS = 120
+
+def sweep_positions(building_type, points=DEFAULT_SWEEP_POINTS):
+    """Evenly spaced positions over the wizard range, plus the regression breakpoints"""
+    _, low, high = SWEEP_RANGES[building_type]
+    breakpoints = [b for b in BREAKPOINTS[building_type] if low <= b <= high]
+    return np.unique(np.concatenate([np.linspace(low, high, points), breakpoints]))
+
+def sensitivity_sweep(inputs, building_type, positions=None, electric_rates=None, gas_rates=None, index=None):
+    """
+    Results across operating hours or occupancy for one building.
+
+    positions defaults to sweep_positions(building_type). electric_rates and
+    gas_rates, when given, add every combination of rates to the sweep;
+    otherwise the rates in inputs are used. Returns a DataFrame with the
+    position and rate columns followed by the usual result columns, sorted
+    by rates and then position.
+    """
+    column, _, _ = SWEEP_RANGES[building_type]
+    if positions is None:
+        positions = sweep_positions(building_type)
+    if electric_rates is None:
+        electric_rates = [inputs['electric_rate']]
+    if gas_rates is None:
+        gas_rates = [inputs['gas_rate']]
+
+    electric, gas, position = (
+        grid.ravel() for grid in np.meshgrid(
+            np.asarray(electric_rates, dtype=float),
+            np.asarray(gas_rates, dtype=float),
+            np.asarray(positions, dtype=float),
+            indexing='ij',
+        )
+    )
+    n = len(position)
+    frame = broadcast_frame(inputs, n)
+    frame[column] = position
+    frame['electric_rate'] = electric
+    frame['gas_rate'] = gas
+
+    results = calculate_savings_batch(frame, building_type=building_type, index=index)
+    return pd.concat([frame[[column, 'electric_rate', 'gas_rate']], results], axis=1)
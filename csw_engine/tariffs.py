@@ -0,0 +1,418 @@
+"""
+Time-of-use, seasonal, demand and block tariffs for pricing savings
+
+The engine prices savings at one flat $/kWh and $/therm. A tariff instead
+prices them by when they happen, using the load shapes in load_shape.py.
+
+Tariffs are JSON files in the tariffs/ directory under the data directory.
+A file describes one fuel ("electric" or "gas") and has:
+
+- seasons: {name: [months]} used by the rules below
+- energy: hourly rates; the first rule matching an hour sets its $/unit
+- tiers: monthly blocks instead of energy, [[upper bound or null, $/unit]]
+- demand: $/kW on each month's peak within the rule's hours (optional)
+
+Rules select hours by season, days ("all", "weekdays", "weekends") and hours
+([start, end), wrapping past midnight). The typical year starts on a
+Monday and has no holidays.
+
+Each file compiles once into arrays: an 8,760-hour rate vector, a
+(months x blocks) table and one hour mask per demand charge. Each tariff
+then reduces a climate's hourly profiles to a few terms, cached per climate,
+so re-pricing is cheap enough for every sidebar edit and for whole
+portfolios. Energy charges are linear in
+the savings. Demand savings assume the building's monthly peak falls in the
+hour the savings peak. Block charges need the building's baseline
+consumption; without it, savings are priced at the last block, i.e. off
+the top of the bill.
+"""
+
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .data import data_path
+from .exceptions import TariffError
+from .load_shape import DAYS_PER_MONTH, HOURS_PER_YEAR, MONTH_STARTS, climate_shapes, result_array, savings_components
+
+TARIFF_DIR = 'tariffs'
+TARIFF_FUELS = {'electric': 'kWh', 'gas': 'therm'}
+
+TARIFF_COLUMNS = [
+    'electric_energy_cost_savings',
+    'demand_cost_savings',
+    'electric_cost_savings',
+    'gas_cost_savings',
+    'total_cost_savings',
+]
+
+# Climates (and buildings) handled per block, bounding the hourly arrays
+TARIFF_BLOCK = 256
+# Distinct climates whose pricing terms each tariff keeps
+CLIMATE_TERMS_CACHE_SIZE = 4096
+
+# Calendar of the typical year
+FIRST_WEEKDAY = 0  # Monday
+MONTH_OF_HOUR = np.repeat(np.arange(1, 13), np.array(DAYS_PER_MONTH) * 24)
+HOUR_OF_DAY = np.tile(np.arange(24), HOURS_PER_YEAR // 24)
+IS_WEEKDAY = (np.arange(HOURS_PER_YEAR) // 24 + FIRST_WEEKDAY) % 7 < 5
+HOURS_PER_MONTH = np.array(DAYS_PER_MONTH) * 24.0
+
+DAY_SELECTIONS = {
+    'all': np.ones(HOURS_PER_YEAR, dtype=bool),
+    'weekdays': IS_WEEKDAY,
+    'weekends': ~IS_WEEKDAY,
+}
+
+# ============================================================================
+# COMPILING DEFINITIONS
+# ============================================================================
+
+def _rule_mask(rule, seasons, where):
+    """Hours of the year a rule applies to"""
+    if not isinstance(rule, dict):
+        raise TariffError(f"{where}: must be an object")
+    mask = DAY_SELECTIONS.get(rule.get('days', 'all'))
+    if mask is None:
+        raise TariffError(f"{where}: days must be one of {', '.join(DAY_SELECTIONS)}")
+    if 'season' in rule:
+        if rule['season'] not in seasons:
+            raise TariffError(f"{where}: unknown season {rule['season']!r}")
+        mask = mask & np.isin(MONTH_OF_HOUR, seasons[rule['season']])
+    if 'hours' in rule:
+        try:
+            start, end = (int(hour) for hour in rule['hours'])
+        except (TypeError, ValueError):
+            raise TariffError(f"{where}: hours must be [start, end]") from None
+        if not (0 <= start <= 24 and 0 <= end <= 24):
+            raise TariffError(f"{where}: hours must be within 0-24")
+        in_window = (HOUR_OF_DAY >= start) & (HOUR_OF_DAY < end) if start <= end else \
+            (HOUR_OF_DAY >= start) | (HOUR_OF_DAY < end)
+        mask = mask & in_window
+    return mask
+
+def _rate(rule, where):
+    try:
+        return float(rule['rate'])
+    except (KeyError, TypeError, ValueError):
+        raise TariffError(f"{where}: rate must be a number") from None
+
+def _compile_seasons(definition, where):
+    seasons = definition.get('seasons', {})
+    if not isinstance(seasons, dict):
+        raise TariffError(f"{where}: seasons must map names to month lists")
+    for name, months in seasons.items():
+        if not isinstance(months, list) or not all(isinstance(m, int) and 1 <= m <= 12 for m in months):
+            raise TariffError(f"{where}: season {name!r} must list months 1-12")
+    return seasons
+
+def _compile_energy(rules, seasons, where):
+    """8760 $/unit rates; the first matching rule wins"""
+    if not isinstance(rules, list):
+        raise TariffError(f"{where}: energy must be a list of rules")
+    rates = np.full(HOURS_PER_YEAR, np.nan)
+    for i, rule in enumerate(rules):
+        rule_where = f"{where} energy[{i}]"
+        mask = _rule_mask(rule, seasons, rule_where) & np.isnan(rates)
+        rates[mask] = _rate(rule, rule_where)
+    if np.isnan(rates).any():
+        raise TariffError(f"{where}: {np.isnan(rates).sum()} hours have no energy rate")
+    return rates
+
+def _compile_tiers(schedules, seasons, where):
+    """(12, blocks) lower bounds, widths and rates; the first schedule covering a month wins"""
+    if not isinstance(schedules, list):
+        raise TariffError(f"{where}: tiers must be a list of block schedules")
+    months = [None] * 12
+    for i, schedule in enumerate(schedules):
+        schedule_where = f"{where} tiers[{i}]"
+        if not isinstance(schedule, dict):
+            raise TariffError(f"{schedule_where}: must be an object")
+        blocks = schedule.get('blocks')
+        if not isinstance(blocks, list) or not blocks:
+            raise TariffError(f"{schedule_where}: blocks must be a list of [upper bound, rate]")
+        lower, widths, rates = 0.0, [], []
+        for j, block in enumerate(blocks):
+            try:
+                bound, rate = block
+                upper = np.inf if bound is None else float(bound)
+                rates.append(float(rate))
+            except (TypeError, ValueError):
+                raise TariffError(f"{schedule_where}: block {j} must be [upper bound or null, rate]") from None
+            if upper <= lower or (np.isinf(upper) and j != len(blocks) - 1):
+                raise TariffError(f"{schedule_where}: block bounds must increase and only the last may be null")
+            widths.append(upper - lower)
+            lower = upper
+        if not np.isinf(lower):
+            raise TariffError(f"{schedule_where}: the last block must be open (null upper bound)")
+        if 'season' in schedule and schedule['season'] not in seasons:
+            raise TariffError(f"{schedule_where}: unknown season {schedule['season']!r}")
+        applies = seasons[schedule['season']] if 'season' in schedule else range(1, 13)
+        for month in applies:
+            if months[month - 1] is None:
+                months[month - 1] = (widths, rates)
+    if any(month is None for month in months):
+        raise TariffError(f"{where}: every month needs a block schedule")
+
+    size = max(len(widths) for widths, _ in months)
+    lower = np.zeros((12, size))
+    width = np.zeros((12, size))
+    rate = np.zeros((12, size))
+    last = np.zeros(12, dtype=int)
+    for m, (widths, rates) in enumerate(months):
+        n = len(widths)
+        width[m, :n] = widths
+        lower[m, 1:n] = np.cumsum(widths)[:-1]
+        rate[m, :n] = rates
+        last[m] = n - 1
+    return lower, width, rate, last
+
+class Tariff:
+    """One fuel's tariff compiled into hourly rates, block tables and demand masks"""
+
+    def __init__(self, definition, tariff_id):
+        where = f"tariff {tariff_id!r}"
+        if not isinstance(definition, dict):
+            raise TariffError(f"{where}: must be a JSON object")
+        self.id = tariff_id
+        self.name = definition.get('name', tariff_id)
+        self.description = definition.get('description', '')
+        self.fuel = definition.get('fuel')
+        if self.fuel not in TARIFF_FUELS:
+            raise TariffError(f"{where}: fuel must be one of {', '.join(TARIFF_FUELS)}")
+        self.unit = TARIFF_FUELS[self.fuel]
+        seasons = _compile_seasons(definition, where)
+
+        if ('energy' in definition) == ('tiers' in definition):
+            raise TariffError(f"{where}: give either energy (hourly) rates or tiers (monthly blocks)")
+        self.energy_rates = None
+        self.tier_lower = self.tier_width = self.tier_rates = self.tier_last = None
+        if 'energy' in definition:
+            self.energy_rates = _compile_energy(definition['energy'], seasons, where)
+        else:
+            self.tier_lower, self.tier_width, self.tier_rates, self.tier_last = \
+                _compile_tiers(definition['tiers'], seasons, where)
+
+        charges = definition.get('demand', [])
+        if not isinstance(charges, list):
+            raise TariffError(f"{where}: demand must be a list of charges")
+        self.demand_masks = np.array([_rule_mask(rule, seasons, f"{where} demand[{i}]")
+                                      for i, rule in enumerate(charges)], dtype=bool).reshape(-1, HOURS_PER_YEAR)
+        self.demand_rates = np.array([_rate(rule, f"{where} demand[{i}]") for i, rule in enumerate(charges)])
+        self._terms = {}
+
+    def __repr__(self):
+        return f"Tariff({self.id!r}, {self.fuel})"
+
+    def block_cost(self, monthly):
+        """Cost of (buildings, 12) monthly consumption through the blocks"""
+        filled = np.clip(monthly[:, :, None] - self.tier_lower, 0.0, self.tier_width)
+        return (filled * self.tier_rates).sum(axis=2).sum(axis=1)
+
+    def block_savings(self, savings, usage=None):
+        """
+        Value of (buildings, 12) monthly savings under the blocks.
+
+        usage is each building's annual baseline consumption, spread over
+        the months like its savings. Without it, savings are priced at each
+        month's last block.
+        """
+        if usage is None:
+            return (savings * self.tier_rates[np.arange(12), self.tier_last]).sum(axis=1)
+        total = savings.sum(axis=1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            share = np.where(total != 0, savings / total, HOURS_PER_MONTH / HOURS_PER_YEAR)
+        monthly = np.asarray(usage, dtype=float)[:, None] * share
+        return self.block_cost(monthly) - self.block_cost(monthly - savings)
+
+# ============================================================================
+# LOADING
+# ============================================================================
+
+def load_tariff(path):
+    """Compile one JSON tariff file; its id is the file name without .json"""
+    tariff_id = os.path.splitext(os.path.basename(path))[0]
+    try:
+        with open(path) as f:
+            definition = json.load(f)
+    except OSError as exc:
+        raise TariffError(f"Tariff file not readable: {path}") from exc
+    except json.JSONDecodeError as exc:
+        raise TariffError(f"tariff {tariff_id!r}: invalid JSON ({exc})") from exc
+    return Tariff(definition, tariff_id)
+
+def load_tariffs(directory=None):
+    """{id: Tariff} for every .json file in the tariff directory, by id"""
+    directory = directory or data_path(TARIFF_DIR)
+    if not os.path.isdir(directory):
+        return {}
+    names = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+    return {os.path.splitext(name)[0]: load_tariff(os.path.join(directory, name)) for name in names}
+
+@lru_cache(maxsize=None)
+def get_tariffs():
+    """Tariffs from the data directory, compiled once per process"""
+    return load_tariffs()
+
+def resolve_tariff(name):
+    """Tariff by id from the tariff directory, or from a path to a JSON file"""
+    if name.endswith('.json') and os.path.exists(name):
+        return load_tariff(name)
+    tariffs = get_tariffs()
+    if name not in tariffs:
+        raise TariffError(f"Unknown tariff {name!r}; available: {', '.join(tariffs) or 'none'}")
+    return tariffs[name]
+
+# ============================================================================
+# PRICING
+# ============================================================================
+
+def _window_extremes(shapes, mask):
+    """(climates, 12) largest and smallest positive shape value in the mask's hours, NaN where none"""
+    values = np.where(mask & (shapes > 0), shapes, np.nan)
+    return np.fmax.reduceat(values, MONTH_STARTS, axis=1), np.fmin.reduceat(values, MONTH_STARTS, axis=1)
+
+def _climate_terms(tariff, heating_shapes, cooling_shapes):
+    """
+    {name: (climates, ...) array} of everything pricing needs from a climate's profiles.
+
+    Heating and cooling degree-hours never fall in the same hour, so a
+    building's peak savings in a demand window is its largest heating or
+    cooling extreme there (or zero, for an hour with neither): the extremes
+    per charge and month stand in for the 8,760-hour series. Climates whose
+    profile was spread evenly do overlap; they are flagged for hourly pricing.
+    """
+    terms = {
+        'monthly': np.stack([np.add.reduceat(heating_shapes, MONTH_STARTS, axis=1),
+                             np.add.reduceat(cooling_shapes, MONTH_STARTS, axis=1)], axis=1),
+        'overlap': ((heating_shapes > 0) & (cooling_shapes > 0)).any(axis=1),
+    }
+    if tariff.energy_rates is not None:
+        terms['energy'] = np.stack([heating_shapes @ tariff.energy_rates, cooling_shapes @ tariff.energy_rates], axis=1)
+    if len(tariff.demand_rates):
+        neither = (heating_shapes == 0) & (cooling_shapes == 0)
+        extremes, idle = [], []
+        for mask in tariff.demand_masks:
+            extremes.append(np.stack(_window_extremes(heating_shapes, mask) + _window_extremes(cooling_shapes, mask),
+                                     axis=1))
+            idle.append(np.logical_or.reduceat(neither & mask, MONTH_STARTS, axis=1))
+        terms['extremes'] = np.stack(extremes, axis=1)  # (climates, charges, 4, 12)
+        terms['idle'] = np.stack(idle, axis=1)          # (climates, charges, 12)
+    return terms
+
+def climate_terms(tariff, climates):
+    """Pricing terms for (climates, 2) HDD/CDD rows, from the tariff's cache where possible"""
+    cache = tariff._terms
+    keys = [tuple(climate) for climate in climates.tolist()]
+    missing = [i for i, key in enumerate(keys) if key not in cache]
+    fresh = {}
+    for start in range(0, len(missing), TARIFF_BLOCK):
+        block = missing[start:start + TARIFF_BLOCK]
+        terms = _climate_terms(tariff, *climate_shapes(climates[block, 0], climates[block, 1]))
+        for j, i in enumerate(block):
+            fresh[i] = {name: values[j] for name, values in terms.items()}
+            # NaN keys never match, so unknown climates aren't kept
+            if len(cache) < CLIMATE_TERMS_CACHE_SIZE and not np.isnan(climates[i]).any():
+                cache[keys[i]] = fresh[i]
+    rows = [fresh[i] if i in fresh else cache[key] for i, key in enumerate(keys)]
+    return {name: np.stack([row[name] for row in rows]) for name in rows[0]}
+
+def _hourly_peaks(heating, cooling, heating_shapes, cooling_shapes, mask):
+    """(buildings, 12) peak hourly savings in the mask's hours, from full hourly series"""
+    hourly = heating[:, None] * heating_shapes + cooling[:, None] * cooling_shapes
+    peaks = np.maximum.reduceat(np.where(mask, hourly, -np.inf), MONTH_STARTS, axis=1)
+    peaks[np.isneginf(peaks)] = 0.0
+    return peaks
+
+def _demand_savings(tariff, heating, cooling, climates, codes, terms):
+    """Demand charge savings: each charge's rate on the monthly peaks of hourly savings in its hours"""
+    # kWh saved in an hour is the average kW saved over it
+    a, b = heating[:, None], cooling[:, None]
+    overlap = np.flatnonzero(terms['overlap'][codes])
+    demand = np.zeros(len(heating))
+    for j, rate in enumerate(tariff.demand_rates):
+        heating_max, heating_min, cooling_max, cooling_min = terms['extremes'][codes, j].transpose(1, 0, 2)
+        peaks = np.fmax(
+            np.fmax(np.where(a >= 0, a * heating_max, a * heating_min),
+                    np.where(b >= 0, b * cooling_max, b * cooling_min)),
+            np.where(terms['idle'][codes, j], 0.0, np.nan),
+        )
+        # NaN here is a month without hours in the window
+        peaks = np.nan_to_num(peaks, nan=0.0)
+        for first in range(0, len(overlap), TARIFF_BLOCK):
+            rows = overlap[first:first + TARIFF_BLOCK]
+            heating_shapes, cooling_shapes = climate_shapes(climates[codes[rows], 0], climates[codes[rows], 1])
+            peaks[rows] = _hourly_peaks(heating[rows], cooling[rows], heating_shapes, cooling_shapes,
+                                        tariff.demand_masks[j])
+        demand += rate * peaks.sum(axis=1)
+    demand[np.isnan(heating) | np.isnan(cooling)] = np.nan
+    return demand
+
+def _fuel_cost(tariff, heating, cooling, climates, codes, usage):
+    """(energy, demand) cost savings for one fuel's heating and cooling savings"""
+    terms = climate_terms(tariff, climates)
+    if tariff.energy_rates is not None:
+        energy = heating * terms['energy'][codes, 0] + cooling * terms['energy'][codes, 1]
+    else:
+        monthly = heating[:, None] * terms['monthly'][codes, 0] + cooling[:, None] * terms['monthly'][codes, 1]
+        energy = tariff.block_savings(monthly, usage)
+
+    demand = np.zeros(len(heating))
+    if len(tariff.demand_rates):
+        demand = _demand_savings(tariff, heating, cooling, climates, codes, terms)
+    return energy, demand
+
+def _usage(usage, n):
+    return None if usage is None else np.broadcast_to(np.asarray(usage, dtype=float), n)
+
+def _tariff_arrays(results, electric, gas, electric_usage, gas_usage):
+    """{column: array} for TARIFF_COLUMNS"""
+    electric_energy = result_array(results, 'electric_cost_savings').copy()
+    gas_cost = result_array(results, 'gas_cost_savings').copy()
+    n = len(electric_energy)
+    demand = np.zeros(n)
+
+    if electric is not None or gas is not None:
+        heating_kwh, cooling_kwh, gas_therms = savings_components(results)
+        climates = np.column_stack([result_array(results, 'hdd'), result_array(results, 'cdd')])
+        climates, codes = np.unique(climates, axis=0, return_inverse=True)
+        codes = codes.ravel()
+        if electric is not None:
+            electric_energy, demand = _fuel_cost(electric, heating_kwh, cooling_kwh, climates, codes,
+                                                 _usage(electric_usage, n))
+        if gas is not None:
+            energy, gas_demand = _fuel_cost(gas, gas_therms, np.zeros(n), climates, codes, _usage(gas_usage, n))
+            gas_cost = energy + gas_demand
+
+    electric_cost = electric_energy + demand
+    return {
+        'electric_energy_cost_savings': electric_energy,
+        'demand_cost_savings': demand,
+        'electric_cost_savings': electric_cost,
+        'gas_cost_savings': gas_cost,
+        'total_cost_savings': electric_cost + gas_cost,
+    }
+
+def tariff_costs(results, electric=None, gas=None, electric_usage=None, gas_usage=None):
+    """
+    TARIFF_COLUMNS for engine results priced under the tariffs.
+
+    results is a calculate_savings_batch frame (giving a frame) or one
+    results dict (giving a dict). A fuel without a tariff keeps its
+    flat-rate cost. electric_usage (kWh) and gas_usage (therms) are annual
+    baseline consumption, used by block tariffs.
+    """
+    columns = _tariff_arrays(results, electric, gas, electric_usage, gas_usage)
+    if isinstance(results, dict):
+        return {column: float(values[0]) for column, values in columns.items()}
+    return pd.DataFrame(columns, index=results.index)
+
+def apply_tariffs(results, electric=None, gas=None, electric_usage=None, gas_usage=None):
+    """results (dict or frame) with cost savings re-priced under the tariffs"""
+    costs = tariff_costs(results, electric, gas, electric_usage, gas_usage)
+    if isinstance(results, dict):
+        return {**results, **costs}
+    return results.assign(**{column: costs[column] for column in TARIFF_COLUMNS})
@@ -0,0 +1,104 @@
+"""
+Monte Carlo uncertainty ranges for savings
+
+Each draw perturbs the building's degree days (weather-year variability),
+utility rates (one year of escalation) and operating hours or occupancy,
+then runs through the regression model with calculate_savings_batch. Draws
+are generated in fixed-size chunks, each with its own child of one
+SeedSequence, so results are reproducible for a given seed and chunk size
+whatever the number of worker processes, and only the reported result
+columns are kept between chunks.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .batch import broadcast_frame, calculate_savings_batch
+from .sweep import SWEEP_RANGES
+
+UNCERTAINTY_METRICS = ['total_cost_savings', 'electric_savings_kwh', 'gas_savings_therms']
+PERCENTILES = {'P10': 10, 'P50': 50, 'P90': 90}
+
+DEFAULT_DRAWS = 100000
+DEFAULT_CHUNK_SIZE = 25000
+
+# Spread of each sampled input. Degree days vary by a coefficient of
+# variation (normal, floored at zero); rates by a one-year escalation
+# (normal, mean/sd as fractions); hours and occupancy by a standard deviation
+# in their own units, clipped to the wizard's range.
+DEFAULT_SPREAD = {
+    'hdd_cv': 0.10,
+    'cdd_cv': 0.15,
+    'electric_escalation_mean': 0.0,
+    'electric_escalation_sd': 0.05,
+    'gas_escalation_mean': 0.0,
+    'gas_escalation_sd': 0.10,
+    'hours_sd': 500.0,
+    'occupancy_sd': 10.0,
+}
+
+def draw_inputs(rng, n, inputs, building_type, spread):
+    """Sampled hdd, cdd, rates and hours/occupancy columns for n draws"""
+    column, low, high = SWEEP_RANGES[building_type]
+    position_sd = spread['hours_sd'] if building_type == 'Office' else spread['occupancy_sd']
+    hdd = float(inputs['hdd'])
+    cdd = float(inputs['cdd'])
+    electric_escalation = rng.normal(spread['electric_escalation_mean'], spread['electric_escalation_sd'], n)
+    gas_escalation = rng.normal(spread['gas_escalation_mean'], spread['gas_escalation_sd'], n)
+    return {
+        'hdd': np.maximum(rng.normal(hdd, spread['hdd_cv'] * hdd, n), 0.0),
+        'cdd': np.maximum(rng.normal(cdd, spread['cdd_cv'] * cdd, n), 0.0),
+        'electric_rate': inputs['electric_rate'] * np.maximum(1.0 + electric_escalation, 0.0),
+        'gas_rate': inputs['gas_rate'] * np.maximum(1.0 + gas_escalation, 0.0),
+        column: np.clip(rng.normal(float(inputs[column]), position_sd, n), low, high),
+    }
+
+def simulate_chunk(inputs, building_type, n, seed, spread, index=None):
+    """(metrics, n) array of results for one chunk of draws"""
+    rng = np.random.default_rng(seed)
+    frame = broadcast_frame(inputs, n)
+    for column, values in draw_inputs(rng, n, inputs, building_type, spread).items():
+        frame[column] = values
+    results = calculate_savings_batch(frame, building_type=building_type, index=index)
+    return results[UNCERTAINTY_METRICS].to_numpy().T
+
+def _chunk_sizes(draws, chunk_size):
+    full, rest = divmod(draws, chunk_size)
+    return [chunk_size] * full + ([rest] if rest else [])
+
+def monte_carlo_savings(inputs, building_type, draws=DEFAULT_DRAWS, seed=0,
+                        chunk_size=DEFAULT_CHUNK_SIZE, workers=1, index=None,
+                        return_samples=False, **spread):
+    """
+    P10/P50/P90 of annual savings under input uncertainty.
+
+    spread overrides entries of DEFAULT_SPREAD. Returns a DataFrame indexed
+    by P10/P50/P90 with a column per metric in UNCERTAINTY_METRICS; with
+    return_samples=True, also returns a DataFrame of every draw's results.
+    Pass workers > 1 to spread chunks over processes.
+    """
+    unknown = set(spread) - set(DEFAULT_SPREAD)
+    if unknown:
+        raise ValueError(f"Unknown spread parameters: {sorted(unknown)}")
+    spread = {**DEFAULT_SPREAD, **spread}
+    sizes = _chunk_sizes(draws, chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(inputs, building_type, n, child, spread) for n, child in zip(sizes, seeds)]
+
+    if workers <= 1:
+        chunks = [simulate_chunk(*chunk_args, index=index) for chunk_args in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(simulate_chunk, *zip(*args)))
+    samples = np.concatenate(chunks, axis=1)
+
+    summary = pd.DataFrame(
+        np.percentile(samples, list(PERCENTILES.values()), axis=1),
+        index=list(PERCENTILES),
+        columns=UNCERTAINTY_METRICS,
+    )
+    if return_samples:
+        return summary, pd.DataFrame(samples.T, columns=UNCERTAINTY_METRICS)
+    return summary
@@ -0,0 +1,161 @@
+"""
+Input validation for callers outside the wizard
+
+The wizard can only produce valid inputs: its widgets clamp numbers and only
+offer the products, HVAC systems and fuels the building allows. Programmatic
+callers get the same rules here. validate_inputs checks every field, fills
+the location from a weather station when degree days aren't given, and
+returns a clean inputs dict ready for calculate_savings.
+"""
+
+from numbers import Number
+
+from .constants import (
+    OFFICE_HVAC_SYSTEMS,
+    HOTEL_HVAC_SYSTEMS,
+    COOLING_OPTIONS,
+    WINDOW_TYPES,
+    BUILDING_AREA_RANGES,
+    NUM_FLOORS_RANGE,
+    MAX_CSW_AREA_FRACTION,
+    ELECTRIC_RATE_RANGE,
+    GAS_RATE_RANGE,
+    OPERATING_HOURS_RANGE,
+    OCCUPANCY_RANGE,
+    available_csw_types,
+    available_heating_fuels,
+)
+from .data import get_weather_store, get_station_locator
+from .exceptions import InputValidationError
+
+BUILDING_TYPES = ['Office', 'Hotel']
+
+# Caller-supplied degree days; comfortably beyond any station in the data
+DEGREE_DAY_RANGE = (0, 20000)
+
+_POSITION_RANGES = {
+    'Office': ('operating_hours', OPERATING_HOURS_RANGE),
+    'Hotel': ('occupancy_percent', OCCUPANCY_RANGE),
+}
+
+def _number(inputs, field, errors, low, high):
+    """Numeric field as float, recording an error when missing or out of range"""
+    value = inputs.get(field)
+    if value is None:
+        errors.append(f"{field}: required")
+        return None
+    # Exact types first; the Number ABC check is comparatively slow
+    if type(value) not in (int, float) and (isinstance(value, bool) or not isinstance(value, Number)):
+        errors.append(f"{field}: must be a number")
+        return None
+    value = float(value)
+    if not low <= value <= high:
+        errors.append(f"{field}: must be between {low:,g} and {high:,g}")
+        return None
+    return value
+
+def _choice(inputs, field, options, errors):
+    """String field that must be one of options"""
+    value = inputs.get(field)
+    if value is None:
+        errors.append(f"{field}: required")
+        return None
+    if value not in options:
+        errors.append(f"{field}: must be one of {', '.join(options)}")
+        return None
+    return value
+
+def _text(inputs, field, errors):
+    """Optional string field; None when absent or not a string"""
+    value = inputs.get(field)
+    if value is not None and not isinstance(value, str):
+        errors.append(f"{field}: must be a string")
+        return None
+    return value
+
+def _location(inputs, errors):
+    """state, city, hdd and cdd from degree days, coordinates or a city name"""
+    reported = len(errors)
+    state = _text(inputs, 'state', errors)
+    city = _text(inputs, 'city', errors)
+    if len(errors) > reported:
+        return None
+
+    if inputs.get('hdd') is not None or inputs.get('cdd') is not None:
+        hdd = _number(inputs, 'hdd', errors, *DEGREE_DAY_RANGE)
+        cdd = _number(inputs, 'cdd', errors, *DEGREE_DAY_RANGE)
+        return {'state': state, 'city': city, 'hdd': hdd, 'cdd': cdd}
+
+    store = get_weather_store()
+    if inputs.get('latitude') is not None or inputs.get('longitude') is not None:
+        lat = _number(inputs, 'latitude', errors, -90, 90)
+        lon = _number(inputs, 'longitude', errors, -180, 180)
+        if lat is None or lon is None:
+            return None
+        _, positions = get_station_locator().nearest(lat, lon)
+        i = positions[0, 0]
+        if i < 0:
+            errors.append("location: no weather station found for these coordinates")
+            return None
+    elif city is not None:
+        i = store.resolve(city, state)
+        if i is None:
+            errors.append(f"city: no weather station found for {city!r}")
+            return None
+    else:
+        errors.append("location: give hdd and cdd, latitude and longitude, or city (and state)")
+        return None
+    return {'state': store.states[i], 'city': store.cities[i], 'hdd': float(store.hdd[i]), 'cdd': float(store.cdd[i])}
+
+def validate_inputs(inputs, building_type):
+    """
+    Check inputs against the wizard's ranges and option rules.
+
+    Returns a new inputs dict with numbers as floats and state, city, hdd
+    and cdd filled in. Raises InputValidationError listing every problem.
+    """
+    if building_type not in BUILDING_TYPES:
+        raise InputValidationError([f"building_type: must be one of {', '.join(BUILDING_TYPES)}"])
+    errors = []
+
+    area_low, area_high = BUILDING_AREA_RANGES[building_type]
+    building_area = _number(inputs, 'building_area', errors, area_low, area_high)
+    num_floors = _number(inputs, 'num_floors', errors, *NUM_FLOORS_RANGE)
+    if num_floors is not None and not num_floors.is_integer():
+        errors.append("num_floors: must be a whole number")
+    csw_high = building_area * MAX_CSW_AREA_FRACTION if building_area is not None else area_high * MAX_CSW_AREA_FRACTION
+    csw_area = _number(inputs, 'csw_area', errors, 0, csw_high)
+    electric_rate = _number(inputs, 'electric_rate', errors, *ELECTRIC_RATE_RANGE)
+    gas_rate = _number(inputs, 'gas_rate', errors, *GAS_RATE_RANGE)
+    position_field, position_range = _POSITION_RANGES[building_type]
+    position = _number(inputs, position_field, errors, *position_range)
+
+    existing_window = _choice(inputs, 'existing_window', WINDOW_TYPES, errors)
+    csw_type = None
+    if existing_window is not None:
+        csw_type = _choice(inputs, 'csw_type', available_csw_types(existing_window), errors)
+    hvac_systems = OFFICE_HVAC_SYSTEMS if building_type == 'Office' else HOTEL_HVAC_SYSTEMS
+    hvac_system = _choice(inputs, 'hvac_system', hvac_systems, errors)
+    heating_fuel = None
+    if hvac_system is not None:
+        heating_fuel = _choice(inputs, 'heating_fuel', available_heating_fuels(building_type, hvac_system), errors)
+    cooling_installed = _choice(inputs, 'cooling_installed', COOLING_OPTIONS, errors)
+
+    location = _location(inputs, errors)
+    if errors:
+        raise InputValidationError(errors)
+
+    return {
+        **location,
+        'building_area': building_area,
+        'num_floors': int(num_floors),
+        'hvac_system': hvac_system,
+        'heating_fuel': heating_fuel,
+        'cooling_installed': cooling_installed,
+        'existing_window': existing_window,
+        'csw_type': csw_type,
+        'csw_area': csw_area,
+        'electric_rate': electric_rate,
+        'gas_rate': gas_rate,
+        position_field: position,
+    }
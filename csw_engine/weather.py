@@ -0,0 +1,232 @@
+"""
+Weather station store with exact, normalized and fuzzy city resolution
+
+Station data is held in NumPy columns. Lookups go through dict indexes built
+once at load: exact (state, city) labels, normalized names ("St. Louis" and
+"Saint Louis" both become "saint louis", trailing state codes like
+"Auburn AL" are dropped) and a character-trigram index for fuzzy matches.
+"""
+
+import re
+from bisect import bisect_left
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+STATE_ABBREVIATIONS = {
+    'AL': 'Alabama', 'AK': 'Alaska', 'AZ': 'Arizona', 'AR': 'Arkansas', 'CA': 'California',
+    'CO': 'Colorado', 'CT': 'Connecticut', 'DE': 'Delaware', 'FL': 'Florida', 'GA': 'Georgia',
+    'HI': 'Hawaii', 'ID': 'Idaho', 'IL': 'Illinois', 'IN': 'Indiana', 'IA': 'Iowa',
+    'KS': 'Kansas', 'KY': 'Kentucky', 'LA': 'Louisiana', 'ME': 'Maine', 'MD': 'Maryland',
+    'MA': 'Massachusetts', 'MI': 'Michigan', 'MN': 'Minnesota', 'MS': 'Mississippi',
+    'MO': 'Missouri', 'MT': 'Montana', 'NE': 'Nebraska', 'NV': 'Nevada', 'NH': 'New Hampshire',
+    'NJ': 'New Jersey', 'NM': 'New Mexico', 'NY': 'New York', 'NC': 'North Carolina',
+    'ND': 'North Dakota', 'OH': 'Ohio', 'OK': 'Oklahoma', 'OR': 'Oregon', 'PA': 'Pennsylvania',
+    'RI': 'Rhode Island', 'SC': 'South Carolina', 'SD': 'South Dakota', 'TN': 'Tennessee',
+    'TX': 'Texas', 'UT': 'Utah', 'VT': 'Vermont', 'VA': 'Virginia', 'WA': 'Washington',
+    'WV': 'West Virginia', 'WI': 'Wisconsin', 'WY': 'Wyoming',
+}
+
+# Token-level abbreviations expanded during normalization
+NAME_ABBREVIATIONS = {'st': 'saint', 'ste': 'sainte', 'ft': 'fort', 'mt': 'mount'}
+
+# Minimum trigram similarity for a fuzzy match to count
+FUZZY_THRESHOLD = 0.5
+FUZZY_CACHE_SIZE = 10000
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_STATE_CODES = {code.lower(): name.lower() for code, name in STATE_ABBREVIATIONS.items()}
+
+# ============================================================================
+# NORMALIZATION
+# ============================================================================
+
+def normalize_name(name):
+    """Lowercase, drop punctuation and expand St./Ft./Mt. abbreviations"""
+    tokens = _PUNCTUATION.sub(' ', str(name).replace("'", '')).lower().split()
+    return ' '.join(NAME_ABBREVIATIONS.get(token, token) for token in tokens)
+
+def normalize_state(state):
+    """Normalize a state name or two-letter code to its lowercase full name"""
+    key = ' '.join(str(state).lower().split())
+    return _STATE_CODES.get(key, key)
+
+def trigrams(text):
+    """Character trigrams of a normalized name, padded at word edges"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# ============================================================================
+# WEATHER STORE
+# ============================================================================
+
+class WeatherStore:
+    """Columnar HDD/CDD table with O(1) exact and normalized city lookup"""
+
+    def __init__(self, frame):
+        self.states = frame['State'].to_numpy(dtype=object)
+        self.cities = frame['Cities'].to_numpy(dtype=object)
+        self.hdd = frame['Heating Degree Days (HDD)'].to_numpy(dtype=float)
+        self.cdd = frame['Cooling Degree Days (CDD)'].to_numpy(dtype=float)
+        # Station coordinates (NaN where unknown), None for files without them
+        self.lat = frame['Latitude'].to_numpy(dtype=float) if 'Latitude' in frame else None
+        self.lon = frame['Longitude'].to_numpy(dtype=float) if 'Longitude' in frame else None
+
+        positions = range(len(self.states))
+        self._exact = dict(zip(zip(self.states.tolist(), self.cities.tolist()), positions))
+
+        self._state_keys = [normalize_state(state) for state in self.states.tolist()]
+        self._normalized = {}
+        self._by_name = defaultdict(list)
+        for i, (state_key, city) in enumerate(zip(self._state_keys, self.cities.tolist())):
+            for name in self._name_variants(city, state_key):
+                self._normalized.setdefault((state_key, name), i)
+                if i not in self._by_name[name]:
+                    self._by_name[name].append(i)
+        self._names = sorted(self._by_name)
+
+        self._trigrams = defaultdict(set)
+        self._gram_counts = {}
+        for name in self._names:
+            grams = trigrams(name)
+            self._gram_counts[name] = len(grams)
+            for gram in grams:
+                self._trigrams[gram].add(name)
+        self._fuzzy_cache = {}
+
+    @staticmethod
+    def _name_variants(city, state_key):
+        """Normalized name plus an alias without a trailing state code"""
+        name = normalize_name(city)
+        yield name
+        head, _, tail = name.rpartition(' ')
+        if head and _STATE_CODES.get(tail) == state_key:
+            yield head
+
+    def __len__(self):
+        return len(self.states)
+
+    # ------------------------------------------------------------------
+    # Single lookups
+    # ------------------------------------------------------------------
+
+    def get(self, state, city):
+        """Return {'HDD', 'CDD'} for an exact state/city label"""
+        i = self._exact[(state, city)]
+        return {'HDD': self.hdd[i], 'CDD': self.cdd[i]}
+
+    def resolve(self, city, state=None, fuzzy=True):
+        """Row position for a city (optionally within a state), or None"""
+        if not isinstance(city, str) or not (state is None or isinstance(state, str)):
+            return None
+        i = self._exact.get((state, city))
+        if i is not None:
+            return i
+        name = normalize_name(city)
+        if state is not None:
+            i = self._normalized.get((normalize_state(state), name))
+            if i is not None:
+                return i
+        elif name in self._by_name:
+            # Without a state, a name shared by several stations is ambiguous
+            matches = self._by_name[name]
+            return matches[0] if len(matches) == 1 else None
+        if fuzzy:
+            return self._fuzzy(name, None if state is None else normalize_state(state))
+        return None
+
+    def lookup(self, city, state=None, fuzzy=True):
+        """Resolve a city to {'State', 'City', 'HDD', 'CDD'}, or None"""
+        i = self.resolve(city, state, fuzzy)
+        if i is None:
+            return None
+        return {'State': self.states[i], 'City': self.cities[i], 'HDD': self.hdd[i], 'CDD': self.cdd[i]}
+
+    def search(self, query, state=None, limit=10):
+        """Stations whose normalized name starts with query, then fuzzy matches"""
+        name = normalize_name(query)
+        state_key = None if state is None else normalize_state(state)
+        found = []
+        start = bisect_left(self._names, name)
+        for candidate in self._names[start:]:
+            if not candidate.startswith(name):
+                break
+            found.extend(self._in_state(self._by_name[candidate], state_key))
+        for _, candidate in self._ranked(name):
+            found.extend(self._in_state(self._by_name[candidate], state_key))
+        unique = list(dict.fromkeys(found))[:limit]
+        return [(self.states[i], self.cities[i]) for i in unique]
+
+    def _in_state(self, positions, state_key):
+        if state_key is None:
+            return positions
+        return [i for i in positions if self._state_keys[i] == state_key]
+
+    def _ranked(self, name):
+        """Names ranked by trigram (Jaccard) similarity to name, best first"""
+        grams = trigrams(name)
+        shared = defaultdict(int)
+        for gram in grams:
+            for candidate in self._trigrams.get(gram, ()):
+                shared[candidate] += 1
+        scored = [
+            (count / (len(grams) + self._gram_counts[candidate] - count), candidate)
+            for candidate, count in shared.items()
+        ]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return scored
+
+    def _fuzzy(self, name, state_key):
+        """Best fuzzy match above FUZZY_THRESHOLD (None if ambiguous), memoized"""
+        key = (name, state_key)
+        if key not in self._fuzzy_cache:
+            if len(self._fuzzy_cache) >= FUZZY_CACHE_SIZE:
+                self._fuzzy_cache.clear()
+            self._fuzzy_cache[key] = None
+            for score, candidate in self._ranked(name):
+                if score < FUZZY_THRESHOLD:
+                    break
+                positions = self._in_state(self._by_name[candidate], state_key)
+                if positions:
+                    if len(positions) == 1:
+                        self._fuzzy_cache[key] = positions[0]
+                    break
+        return self._fuzzy_cache[key]
+
+    # ------------------------------------------------------------------
+    # Bulk lookups
+    # ------------------------------------------------------------------
+
+    def resolve_many(self, cities, states=None, fuzzy=True):
+        """
+        Row positions for arrays of cities (and states), -1 where unresolved.
+
+        Each distinct (state, city) pair is resolved once; rows are then
+        filled by array indexing, so repeated labels cost nothing extra.
+        """
+        cities = pd.Series(np.asarray(cities, dtype=object))
+        states = pd.Series(np.full(len(cities), None, dtype=object) if states is None
+                           else np.asarray(states, dtype=object))
+        codes, pairs = pd.MultiIndex.from_arrays([states, cities]).factorize()
+        resolved = np.array([
+            -1 if (i := self.resolve(city, state, fuzzy)) is None else i
+            for state, city in pairs
+        ], dtype=np.int64)
+        return resolved[codes] if len(resolved) else np.full(len(cities), -1, dtype=np.int64)
+
+    def degree_days(self, cities, states=None, fuzzy=True):
+        """HDD and CDD arrays for bulk lookups (NaN where unresolved)"""
+        positions = self.resolve_many(cities, states, fuzzy)
+        found = positions >= 0
+        hdd = np.where(found, self.hdd[positions], np.nan)
+        cdd = np.where(found, self.cdd[positions], np.nan)
+        return hdd, cdd
+
+    def to_nested_dict(self):
+        """{state: {city: {'HDD', 'CDD'}}}, the shape used by the app"""
+        weather_dict = {}
+        for state, city, hdd, cdd in zip(self.states.tolist(), self.cities.tolist(),
+                                         self.hdd.tolist(), self.cdd.tolist()):
+            weather_dict.setdefault(state, {})[city] = {'HDD': hdd, 'CDD': cdd}
+        return weather_dict
@@ -0,0 +1,296 @@
+"""
+Degree days from hourly typical-year weather files (EPW and TMY3)
+
+weather_information.csv has fixed annual HDD/CDD (base 65 °F) for 875
+cities. This module reads an hourly weather file for any other site and
+computes its degree days at any base temperature. The annual totals stand in
+for a station's HDD/CDD in the inputs, and so in calculate_from_regression.
+
+Degree days use the daily-mean method: each day's mean dry-bulb temperature
+against the base, summed over the year. Every base is reduced in one NumPy
+pass over a (days x 24) array, so a sweep of balance points costs no more
+than one.
+
+Only the dry-bulb column is parsed, which keeps a full-year file to a few
+milliseconds. Results are cached on the file's SHA-256 and the bases, in the
+host-wide cache when one is configured (see shared_cache.py).
+
+Ingest a directory of files with:
+    python -m csw_engine.weather_files weather/ --output stations.csv --workers 8
+"""
+
+import argparse
+import csv
+import hashlib
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .exceptions import WeatherFileError
+from .weather import STATE_ABBREVIATIONS
+
+DEFAULT_BASE_F = 65.0
+WEATHER_FILE_EXTENSIONS = ('.epw', '.csv')
+
+EPW_HEADER_LINES = 8
+EPW_DRY_BULB_FIELD = 6
+EPW_MISSING = 99.9
+TMY3_DRY_BULB_COLUMN = 'Dry-bulb (C)'
+
+# Hours in a typical year, and in a leap year
+FULL_YEAR_HOURS = (8760, 8784)
+# Gaps longer than this share of the year make a file unusable
+MAX_MISSING_FRACTION = 0.05
+
+HourlyWeather = namedtuple('HourlyWeather', [
+    'city', 'state', 'country', 'wmo', 'latitude', 'longitude', 'temperature_c',
+])
+
+SiteDegreeDays = namedtuple('SiteDegreeDays', [
+    'path', 'checksum', 'city', 'state', 'country', 'wmo', 'latitude', 'longitude',
+    'heating_base', 'cooling_base', 'hdd', 'cdd',
+])
+
+# ============================================================================
+# PARSING
+# ============================================================================
+
+def _float_or_nan(text):
+    try:
+        return float(text)
+    except ValueError:
+        return float('nan')
+
+def _dry_bulb(lines, field, missing=None):
+    """Hourly temperatures from one comma-separated field, with short gaps interpolated"""
+    try:
+        values = np.array([line.split(b',', field + 1)[field] for line in lines if line.strip()], dtype=float)
+    except (IndexError, ValueError) as exc:
+        raise WeatherFileError(f"Unreadable dry-bulb temperature: {exc}") from exc
+    if len(values) not in FULL_YEAR_HOURS:
+        raise WeatherFileError(f"Expected a full year of hourly rows, got {len(values)}")
+
+    bad = ~np.isfinite(values)
+    if missing is not None:
+        bad |= values >= missing
+    if bad.any():
+        if bad.mean() > MAX_MISSING_FRACTION:
+            raise WeatherFileError(f"{bad.sum()} of {len(values)} hourly temperatures are missing")
+        hours = np.arange(len(values))
+        values[bad] = np.interp(hours[bad], hours[~bad], values[~bad])
+    return values
+
+def parse_epw(data):
+    """HourlyWeather from the bytes of an EnergyPlus (EPW) file"""
+    lines = data.splitlines()
+    if len(lines) <= EPW_HEADER_LINES or not lines[0].startswith(b'LOCATION'):
+        raise WeatherFileError("Not an EPW file: the first line must be LOCATION")
+    location = next(csv.reader([lines[0].decode('latin-1')]))
+    location += [''] * (10 - len(location))
+    temperature = _dry_bulb(lines[EPW_HEADER_LINES:], EPW_DRY_BULB_FIELD, missing=EPW_MISSING)
+    return HourlyWeather(
+        city=location[1].strip(),
+        state=location[2].strip(),
+        country=location[3].strip(),
+        wmo=location[5].strip(),
+        latitude=_float_or_nan(location[6]),
+        longitude=_float_or_nan(location[7]),
+        temperature_c=temperature,
+    )
+
+def parse_tmy3(data):
+    """HourlyWeather from the bytes of an NSRDB TMY3 CSV file"""
+    lines = data.splitlines()
+    if len(lines) < 3:
+        raise WeatherFileError("Not a TMY3 file: expected a site line and a column header")
+    site, columns = csv.reader([lines[0].decode('latin-1'), lines[1].decode('latin-1')])
+    if TMY3_DRY_BULB_COLUMN not in columns:
+        raise WeatherFileError(f"Not a TMY3 file: no '{TMY3_DRY_BULB_COLUMN}' column")
+    site += [''] * (6 - len(site))
+    temperature = _dry_bulb(lines[2:], columns.index(TMY3_DRY_BULB_COLUMN))
+    return HourlyWeather(
+        city=site[1].strip(),
+        state=site[2].strip(),
+        country='USA',
+        wmo=site[0].strip(),
+        latitude=_float_or_nan(site[4]),
+        longitude=_float_or_nan(site[5]),
+        temperature_c=temperature,
+    )
+
+def _read_bytes(path):
+    """(bytes, SHA-256) of a weather file with a supported extension"""
+    if os.path.splitext(path)[1].lower() not in WEATHER_FILE_EXTENSIONS:
+        raise WeatherFileError(f"Unsupported weather file type: {path}")
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as exc:
+        raise WeatherFileError(f"Weather file not readable: {path}") from exc
+    return data, hashlib.sha256(data).hexdigest()
+
+def _parse(path, data):
+    return parse_epw(data) if path.lower().endswith('.epw') else parse_tmy3(data)
+
+def read_weather_file(path):
+    """(HourlyWeather, SHA-256 of the file) for an .epw or TMY3 .csv file"""
+    data, checksum = _read_bytes(path)
+    return _parse(path, data), checksum
+
+# ============================================================================
+# DEGREE DAYS
+# ============================================================================
+
+def degree_days(temperature_c, heating_base=DEFAULT_BASE_F, cooling_base=DEFAULT_BASE_F):
+    """
+    Annual (HDD, CDD) in °F-days from hourly temperatures in °C.
+
+    Bases are in °F and may be scalars or arrays; arrays give one total per
+    base, all from the same pass over the daily means.
+    """
+    daily_f = np.asarray(temperature_c, dtype=float).reshape(-1, 24).mean(axis=1) * 1.8 + 32.0
+    heating = np.asarray(heating_base, dtype=float)
+    cooling = np.asarray(cooling_base, dtype=float)
+    hdd = np.maximum(heating[..., None] - daily_f, 0.0).sum(axis=-1)
+    cdd = np.maximum(daily_f - cooling[..., None], 0.0).sum(axis=-1)
+    if hdd.ndim == 0 and cdd.ndim == 0:
+        return float(hdd), float(cdd)
+    return hdd, cdd
+
+@lru_cache(maxsize=None)
+def get_degree_day_cache():
+    """Process-wide cache of SiteDegreeDays, over the host-wide store when configured"""
+    from .shared_cache import open_cache
+    return open_cache('degree_days')
+
+def _base_key(base, name):
+    """A base as a float, or a 1-D array of bases as a tuple of floats"""
+    values = np.asarray(base, dtype=float)
+    if values.ndim == 0:
+        return float(values)
+    if values.ndim == 1:
+        return tuple(values.tolist())
+    raise ValueError(f"{name}: expected a number or a 1-D array of numbers")
+
+def site_degree_days(path, heating_base=DEFAULT_BASE_F, cooling_base=DEFAULT_BASE_F, cache=None):
+    """
+    SiteDegreeDays for one weather file, cached on its checksum and the bases.
+
+    The file is read once: its bytes are hashed for the key and, on a miss,
+    parsed. Array bases give arrays of HDD/CDD, with the bases as tuples.
+    """
+    cache = cache if cache is not None else get_degree_day_cache()
+    heating_base = _base_key(heating_base, 'heating_base')
+    cooling_base = _base_key(cooling_base, 'cooling_base')
+    data, checksum = _read_bytes(path)
+    key = (checksum, heating_base, cooling_base)
+
+    def compute():
+        weather = _parse(path, data)
+        hdd, cdd = degree_days(weather.temperature_c, heating_base, cooling_base)
+        return SiteDegreeDays(path, checksum, weather.city, weather.state, weather.country, weather.wmo,
+                              weather.latitude, weather.longitude, heating_base, cooling_base, hdd, cdd)
+
+    return cache.get_or_compute(key, compute)._replace(path=path)
+
+# ============================================================================
+# INGESTION
+# ============================================================================
+
+def iter_weather_files(paths):
+    """Weather files named in paths, expanding directories recursively (sorted)"""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, directories, files in os.walk(path):
+            directories.sort()
+            for name in sorted(files):
+                if name.lower().endswith(WEATHER_FILE_EXTENSIONS):
+                    yield os.path.join(root, name)
+
+def _ingest_one(path, heating_base, cooling_base):
+    try:
+        return path, site_degree_days(path, heating_base, cooling_base), None
+    except (OSError, WeatherFileError) as exc:
+        return path, None, str(exc)
+
+def ingest(paths, heating_base=DEFAULT_BASE_F, cooling_base=DEFAULT_BASE_F, workers=1):
+    """
+    (path, SiteDegreeDays or None, error or None) per file, in order.
+
+    Files are streamed, one at a time per worker; with workers > 1 they fan
+    out to a process pool with a bounded number in flight.
+    """
+    files = iter_weather_files(paths)
+    if workers <= 1:
+        for path in files:
+            yield _ingest_one(path, heating_base, cooling_base)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for path in files:
+            pending.append(pool.submit(_ingest_one, path, heating_base, cooling_base))
+            if len(pending) >= workers * 16:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+def stations_frame(records):
+    """SiteDegreeDays as rows in weather_information.csv's columns, plus WMO and source file"""
+    records = list(records)
+    return pd.DataFrame({
+        'State': [STATE_ABBREVIATIONS.get(r.state.upper(), r.state) for r in records],
+        'Cities': [r.city for r in records],
+        'Heating Degree Days (HDD)': [round(r.hdd) for r in records],
+        'Cooling Degree Days (CDD)': [round(r.cdd) for r in records],
+        'Latitude': [r.latitude for r in records],
+        'Longitude': [r.longitude for r in records],
+        'WMO': [r.wmo for r in records],
+        'Source': [r.path for r in records],
+    })
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compute annual degree days from EPW/TMY3 hourly weather files.')
+    parser.add_argument('paths', nargs='+', help='Weather files or directories (searched recursively)')
+    parser.add_argument('--heating-base', type=float, default=DEFAULT_BASE_F,
+                        help=f'HDD base temperature in °F (default: {DEFAULT_BASE_F:g})')
+    parser.add_argument('--cooling-base', type=float, default=DEFAULT_BASE_F,
+                        help=f'CDD base temperature in °F (default: {DEFAULT_BASE_F:g})')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes (default: 1)')
+    parser.add_argument('--output', help='Write stations CSV here (weather_information.csv columns) '
+                                         'instead of stdout')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    records, failures = [], 0
+    for path, record, error in ingest(args.paths, args.heating_base, args.cooling_base, args.workers):
+        if error is not None:
+            failures += 1
+            print(f"{path}: {error}", file=sys.stderr)
+        else:
+            records.append(record)
+
+    frame = stations_frame(records)
+    if args.output:
+        frame.to_csv(args.output, index=False)
+    else:
+        frame.to_csv(sys.stdout, index=False)
+    elapsed = time.perf_counter() - start
+    total = len(records) + failures
+    print(f"{len(records):,} of {total:,} files in {elapsed:.1f}s "
+          f"({total / elapsed * 60 if elapsed else 0:,.0f} files/min)", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
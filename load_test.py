@@ -0,0 +1,170 @@
+"""
+CSW Savings Calculator - API Load Test
+Drives a running api.py with concurrent keep-alive connections
+
+Usage:
+    python api.py --workers 4 &
+    python load_test.py --requests 20000 --concurrency 64
+    python load_test.py --bulk 500 --requests 200
+
+Each request posts a building drawn from a pool of random valid inputs (or a
+bulk list of them), so results aren't served from one cache entry. Reports
+throughput and latency percentiles; any non-200 response counts as an error.
+Uses only the standard library.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urlsplit
+
+from csw_engine import (
+    BUILDING_AREA_RANGES,
+    COOLING_OPTIONS,
+    OCCUPANCY_RANGE,
+    OFFICE_HVAC_SYSTEMS,
+    HOTEL_HVAC_SYSTEMS,
+    OPERATING_HOURS_RANGE,
+    WINDOW_TYPES,
+    available_csw_types,
+    available_heating_fuels,
+    get_weather_store,
+)
+
+# ============================================================================
+# PAYLOADS
+# ============================================================================
+
+def random_building(rng, store):
+    """A random building the wizard could have produced"""
+    building_type = rng.choice(['Office', 'Hotel'])
+    hvac_systems = OFFICE_HVAC_SYSTEMS if building_type == 'Office' else HOTEL_HVAC_SYSTEMS
+    hvac_system = rng.choice(hvac_systems)
+    existing_window = rng.choice(WINDOW_TYPES)
+    building_area = rng.randrange(*BUILDING_AREA_RANGES[building_type], 1000)
+    station = rng.randrange(len(store))
+    building = {
+        'building_type': building_type,
+        'state': store.states[station],
+        'city': store.cities[station],
+        'building_area': building_area,
+        'num_floors': rng.randint(1, 20),
+        'hvac_system': hvac_system,
+        'heating_fuel': rng.choice(available_heating_fuels(building_type, hvac_system)),
+        'cooling_installed': rng.choice(COOLING_OPTIONS),
+        'existing_window': existing_window,
+        'csw_type': rng.choice(available_csw_types(existing_window)),
+        'csw_area': rng.randrange(0, building_area // 2, 100),
+        'electric_rate': round(rng.uniform(0.06, 0.30), 3),
+        'gas_rate': round(rng.uniform(0.40, 2.00), 2),
+    }
+    if building_type == 'Office':
+        building['operating_hours'] = rng.randrange(*OPERATING_HOURS_RANGE, 10)
+    else:
+        building['occupancy_percent'] = rng.randint(*OCCUPANCY_RANGE)
+    return building
+
+def build_requests(host, path, bodies):
+    """Raw HTTP/1.1 keep-alive POST requests, one per body"""
+    requests = []
+    for body in bodies:
+        payload = json.dumps(body).encode()
+        head = (
+            f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n"
+        ).encode()
+        requests.append(head + payload)
+    return requests
+
+# ============================================================================
+# CLIENT
+# ============================================================================
+
+async def read_response(reader):
+    """Status code of one response, consuming its body"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('server closed the connection')
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+async def worker(host, port, requests, counter, total, latencies, errors):
+    """One keep-alive connection sending requests until the total is reached"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while counter[0] < total:
+            i = counter[0]
+            counter[0] += 1
+            start = time.perf_counter()
+            writer.write(requests[i % len(requests)])
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+async def run(url, total, concurrency, bulk, pool, seed):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    rng = random.Random(seed)
+    store = get_weather_store()
+    if bulk:
+        path = '/calculate/bulk'
+        bodies = [{'buildings': [random_building(rng, store) for _ in range(bulk)]} for _ in range(min(pool, 50))]
+    else:
+        path = '/calculate'
+        bodies = [random_building(rng, store) for _ in range(pool)]
+    requests = build_requests(parts.netloc, path, bodies)
+
+    counter, latencies, errors = [0], [], []
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        worker(host, port, requests, counter, total, latencies, errors) for _ in range(concurrency)
+    ])
+    return time.perf_counter() - start, latencies, errors
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q / 100 * len(sorted_values)))]
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the CSW savings API.')
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='API base URL (default: http://127.0.0.1:8000)')
+    parser.add_argument('--requests', type=int, default=10000, help='Total requests (default: 10000)')
+    parser.add_argument('--concurrency', type=int, default=32, help='Open connections (default: 32)')
+    parser.add_argument('--bulk', type=int, default=0, help='Buildings per bulk request (default: single requests)')
+    parser.add_argument('--pool', type=int, default=1000, help='Distinct request bodies (default: 1000)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the bodies (default: 0)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    elapsed, latencies, errors = asyncio.run(
+        run(args.url, args.requests, args.concurrency, args.bulk, args.pool, args.seed)
+    )
+    latencies.sort()
+    buildings = len(latencies) * (args.bulk or 1)
+    print(f"{len(latencies):,} requests in {elapsed:.2f}s: {len(latencies) / elapsed:,.0f} req/s"
+          + (f", {buildings / elapsed:,.0f} buildings/s" if args.bulk else ''))
+    print('latency ms: ' + '  '.join(
+        f"p{q} {percentile(latencies, q) * 1000:.1f}" for q in (50, 90, 99)
+    ) + f"  max {latencies[-1] * 1000:.1f}")
+    if errors:
+        print(f"{len(errors):,} errors (status {sorted(set(errors))})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+"""
+CSW Savings Calculator - Command-Line Batch Runner
+Streams building inputs from CSV or Parquet through the calculation engine
+
+Usage:
+    python run_batch.py buildings.csv results.csv
+    python run_batch.py buildings.parquet results.parquet --building-type Office --workers 4
+    python run_batch.py buildings.csv results.csv --load-shape shapes.npy --load-shape-resolution monthly
+
+Input columns match the app's inputs dict (building_area, num_floors,
+hvac_system, heating_fuel, cooling_installed, existing_window, csw_type,
+csw_area, electric_rate, gas_rate, hdd, cdd and operating_hours or
+occupancy_percent), plus building_type unless --building-type is given.
+Without hdd/cdd columns, degree days come from the nearest weather station to
+latitude/longitude columns, or else from city (and state) columns, tolerating
+spelling variants like "St. Louis"/"Saint Louis". With --cube those
+station-resolved rows are read from the precomputed savings cube
+(python -m csw_engine.cube).
+
+With --lifecycle YEARS, NPV, IRR and payback columns are appended; optional
+installed_cost_per_sf, electric_escalation, gas_escalation, discount_rate
+and degradation columns override the default financial assumptions per row.
+
+With --load-shape PATH, each building's heating, cooling and gas savings are
+also spread over the hours (or months) of a typical year and streamed to
+PATH: long-format Parquet for .parquet, otherwise a .npy array of records,
+row for row with the output.
+
+--electric-tariff and --gas-tariff price savings under a time-of-use,
+demand or block tariff (an id from tariffs/ or a JSON path) instead of the
+flat rates; optional electric_usage_kwh and gas_usage_therms columns give
+each building's annual consumption for block tariffs.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from csw_engine import (
+    LIFECYCLE_COLUMNS,
+    LIFECYCLE_YEARS_RANGE,
+    LOAD_SHAPE_RESOLUTIONS,
+    LoadShapeWriter,
+    TARIFF_COLUMNS,
+    TariffError,
+    apply_tariffs,
+    RESULT_COLUMNS,
+    calculate_lifecycle_batch,
+    calculate_savings_batch,
+    get_regression_index,
+    get_savings_cube,
+    get_station_locator,
+    get_weather_store,
+    resolve_tariff,
+)
+
+DEFAULT_CHUNK_SIZE = 50000
+
+# ============================================================================
+# INPUT / OUTPUT
+# ============================================================================
+
+def is_parquet(path):
+    """Treat .parquet/.pq paths as Parquet, everything else as CSV"""
+    return os.path.splitext(path)[1].lower() in ('.parquet', '.pq')
+
+def import_parquet():
+    """Import pyarrow.parquet with a readable error when it is missing"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        sys.exit("Parquet support requires pyarrow (pip install pyarrow)")
+    return pq
+
+def iter_chunks(path, chunk_size):
+    """Yield the input file as DataFrames of at most chunk_size rows"""
+    if is_parquet(path):
+        parquet_file = import_parquet().ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        # Keep 'None' (a valid heating fuel) and 'N/A' as strings, not NaN
+        yield from pd.read_csv(path, chunksize=chunk_size, keep_default_na=False, na_values=[''])
+
+class ResultWriter:
+    """Append result chunks to a CSV or Parquet file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = is_parquet(path)
+        self._writer = None
+        self._started = False
+
+    def write(self, frame):
+        if self.parquet:
+            import pyarrow as pa
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = import_parquet().ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table.cast(self._writer.schema))
+        else:
+            frame.to_csv(self.path, mode='a' if self._started else 'w', header=not self._started, index=False)
+        self._started = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+# ============================================================================
+# PROCESSING
+# ============================================================================
+
+def attach_degree_days(chunk, nearest_k=1):
+    """Fill hdd/cdd from coordinates, or from city (and state), when not given"""
+    if 'hdd' in chunk.columns:
+        return chunk
+    if 'latitude' in chunk.columns and 'longitude' in chunk.columns:
+        hdd, cdd = get_station_locator().degree_days(chunk['latitude'], chunk['longitude'], k=nearest_k)
+    elif 'city' in chunk.columns:
+        states = chunk['state'] if 'state' in chunk.columns else None
+        hdd, cdd = get_weather_store().degree_days(chunk['city'], states)
+    else:
+        return chunk
+    return chunk.assign(hdd=hdd, cdd=cdd)
+
+def resolve_stations(chunk):
+    """Weather store row per input row from coordinates or city, or None"""
+    if 'latitude' in chunk.columns and 'longitude' in chunk.columns:
+        _, positions = get_station_locator().nearest(chunk['latitude'], chunk['longitude'])
+        return positions[:, 0]
+    if 'city' in chunk.columns:
+        states = chunk['state'] if 'state' in chunk.columns else None
+        return get_weather_store().resolve_many(chunk['city'], states)
+    return None
+
+def process_chunk(chunk, building_type=None, results_only=False, nearest_k=1, use_cube=False, lifecycle_years=None,
+                  tariffs=None):
+    """Calculate one chunk; unmatched configurations produce NaN results"""
+    stations = None
+    if use_cube and nearest_k == 1 and 'hdd' not in chunk.columns:
+        stations = resolve_stations(chunk)
+    if stations is not None:
+        # Station-resolved rows read straight from the precomputed cube
+        results = get_savings_cube().calculate_batch(chunk, stations, building_type)
+    else:
+        chunk = attach_degree_days(chunk, nearest_k)
+        results = calculate_savings_batch(chunk, building_type=building_type, errors='coerce')
+    if tariffs is not None:
+        electric, gas = tariffs
+        usage = {name: chunk[name] if name in chunk.columns else None
+                 for name in ('electric_usage_kwh', 'gas_usage_therms')}
+        results = apply_tariffs(results, electric, gas, usage['electric_usage_kwh'], usage['gas_usage_therms'])
+    if lifecycle_years:
+        results = pd.concat([results, calculate_lifecycle_batch(chunk, results, lifecycle_years)], axis=1)
+    if results_only:
+        return results
+    computed = RESULT_COLUMNS + TARIFF_COLUMNS + LIFECYCLE_COLUMNS
+    passthrough = chunk.drop(columns=[c for c in computed if c in chunk.columns])
+    return pd.concat([passthrough, results], axis=1)
+
+def _init_worker(use_cube=False):
+    """Compile the regression index and weather store once per worker process"""
+    get_regression_index()
+    get_weather_store()
+    get_station_locator()
+    if use_cube:
+        get_savings_cube()
+
+def iter_results(chunks, building_type, results_only, workers, nearest_k=1, use_cube=False, lifecycle_years=None,
+                 tariffs=None):
+    """Process chunks in order, fanning out to a process pool when workers > 1"""
+    if workers <= 1:
+        for chunk in chunks:
+            yield process_chunk(chunk, building_type, results_only, nearest_k, use_cube, lifecycle_years, tariffs)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(use_cube,)) as pool:
+        # Keep a bounded window of chunks in flight so memory stays flat
+        pending = []
+        for chunk in chunks:
+            pending.append(pool.submit(process_chunk, chunk, building_type, results_only, nearest_k, use_cube,
+                                       lifecycle_years, tariffs))
+            if len(pending) >= workers * 2:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+def run(input_path, output_path, building_type=None, chunk_size=DEFAULT_CHUNK_SIZE,
+        workers=1, results_only=False, quiet=False, nearest_k=1, use_cube=False, lifecycle_years=None,
+        load_shape_path=None, load_shape_resolution='hourly', tariffs=None):
+    """Stream input_path through the engine into output_path; returns row count"""
+    if use_cube and get_savings_cube() is None:
+        sys.exit("No savings cube found; build one with: python -m csw_engine.cube")
+    if load_shape_path and is_parquet(load_shape_path):
+        import_parquet()
+    writer = ResultWriter(output_path)
+    shapes = LoadShapeWriter(load_shape_path, load_shape_resolution) if load_shape_path else None
+    rows = 0
+    start = time.perf_counter()
+    try:
+        chunks = iter_chunks(input_path, chunk_size)
+        for results in iter_results(chunks, building_type, results_only, workers, nearest_k, use_cube,
+                                    lifecycle_years, tariffs):
+            writer.write(results)
+            if shapes is not None:
+                shapes.write(results)
+            rows += len(results)
+            if not quiet:
+                elapsed = time.perf_counter() - start
+                print(f"{rows:,} rows  {elapsed:.1f}s  {rows / elapsed:,.0f} rows/s", file=sys.stderr)
+    finally:
+        writer.close()
+        if shapes is not None:
+            shapes.close()
+    return rows
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Calculate CSW savings for a file of buildings.')
+    parser.add_argument('input', help='Input CSV or Parquet file')
+    parser.add_argument('output', help='Output CSV or Parquet file')
+    parser.add_argument('--building-type', choices=['Office', 'Hotel'],
+                        help='Building type for every row (default: building_type column)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'Rows per chunk (default: {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes (default: 1)')
+    parser.add_argument('--nearest-k', type=int, default=1,
+                        help='Stations to inverse-distance weight for latitude/longitude rows (default: 1)')
+    parser.add_argument('--cube', action='store_true',
+                        help='Read station-resolved rows from the precomputed savings cube')
+    parser.add_argument('--lifecycle', type=int, metavar='YEARS',
+                        choices=range(LIFECYCLE_YEARS_RANGE[0], LIFECYCLE_YEARS_RANGE[1] + 1),
+                        help='Append NPV, IRR and payback over YEARS years '
+                             f'({LIFECYCLE_YEARS_RANGE[0]}-{LIFECYCLE_YEARS_RANGE[1]})')
+    parser.add_argument('--electric-tariff', metavar='TARIFF',
+                        help='Price electric savings under this tariff (id in tariffs/ or JSON path)')
+    parser.add_argument('--gas-tariff', metavar='TARIFF',
+                        help='Price gas savings under this tariff (id in tariffs/ or JSON path)')
+    parser.add_argument('--load-shape', metavar='PATH',
+                        help='Also write per-building savings profiles here (.parquet, else .npy)')
+    parser.add_argument('--load-shape-resolution', choices=list(LOAD_SHAPE_RESOLUTIONS), default='hourly',
+                        help='Periods per load shape (default: hourly)')
+    parser.add_argument('--results-only', action='store_true', help='Write result columns only')
+    parser.add_argument('--quiet', action='store_true', help='Suppress progress output')
+    return parser.parse_args(argv)
+
+def load_tariff_args(args):
+    """(electric, gas) tariffs named on the command line, or None for flat rates"""
+    if not args.electric_tariff and not args.gas_tariff:
+        return None
+    tariffs = []
+    for name, fuel in ((args.electric_tariff, 'electric'), (args.gas_tariff, 'gas')):
+        if not name:
+            tariffs.append(None)
+            continue
+        try:
+            tariff = resolve_tariff(name)
+        except TariffError as exc:
+            sys.exit(str(exc))
+        if tariff.fuel != fuel:
+            sys.exit(f"Tariff {name!r} is for {tariff.fuel}, not {fuel}")
+        tariffs.append(tariff)
+    return tuple(tariffs)
+
+def main(argv=None):
+    args = parse_args(argv)
+    tariffs = load_tariff_args(args)
+    start = time.perf_counter()
+    rows = run(args.input, args.output, args.building_type, args.chunk_size,
+               args.workers, args.results_only, args.quiet, args.nearest_k, args.cube, args.lifecycle,
+               args.load_shape, args.load_shape_resolution, tariffs)
+    if not args.quiet:
+        elapsed = time.perf_counter() - start
+        print(f"Done: {rows:,} rows in {elapsed:.1f}s -> {args.output}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+CSW Savings Calculator - Startup Report
+Measures the app's cold start step by step, each run in a fresh interpreter
+
+Usage:
+    python startup_report.py
+    python startup_report.py --runs 5 --output startup.json
+
+Each run starts a new Python process, imports Streamlit, then renders the
+building type page, the location page and the results page headlessly with
+AppTest, in the order a user reaches them. For every phase the report gives
+the median and fastest seconds across runs, and which heavy modules (NumPy,
+pandas, plotly) were loaded by its end. Streamlit itself brings in NumPy and
+plotly; pandas and the data tables should wait for the location page.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(ROOT, 'app.py')
+
+STEPS = [0, 1, 4]
+HEAVY_MODULES = ['numpy', 'pandas', 'plotly']
+
+# Session state a user would have by each step
+STEP_STATE = {
+    0: {},
+    1: {'building_type': 'Office'},
+    4: {'building_type': 'Office', 'hvac_system': 'Other'},
+}
+
+# ============================================================================
+# CHILD PROCESS
+# ============================================================================
+
+def run_child(steps):
+    """Time each phase in this (fresh) process; prints one JSON line"""
+    phases = {}
+    start = time.perf_counter()
+    import logging
+    from streamlit.testing.v1 import AppTest
+    for name in ('streamlit.deprecation_util', 'streamlit.runtime.scriptrunner_utils.script_run_context'):
+        logging.getLogger(name).disabled = True
+    phases['import_streamlit'] = {'seconds': time.perf_counter() - start,
+                                  'modules': [m for m in HEAVY_MODULES if m in sys.modules]}
+
+    app = AppTest.from_file(APP, default_timeout=120)
+    for step in steps:
+        app.session_state.step = step
+        for key, value in STEP_STATE[step].items():
+            app.session_state[key] = value
+        start = time.perf_counter()
+        app.run()
+        if app.exception:
+            raise RuntimeError(f"step {step} raised: {app.exception[0].message}")
+        phases[f'step_{step}'] = {'seconds': time.perf_counter() - start,
+                                  'modules': [m for m in HEAVY_MODULES if m in sys.modules]}
+    print(json.dumps(phases))
+
+# ============================================================================
+# REPORT
+# ============================================================================
+
+def measure_startup(runs=3, steps=STEPS):
+    """One {phase: {'seconds', 'modules'}} dict per fresh-process run"""
+    results = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', '--steps', *map(str, steps)],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        elapsed = time.perf_counter() - start
+        if completed.returncode:
+            raise RuntimeError(f"startup run failed:\n{completed.stderr[-2000:]}")
+        phases = json.loads(completed.stdout.strip().splitlines()[-1])
+        phases['process_total'] = {'seconds': elapsed, 'modules': phases[f'step_{steps[-1]}']['modules']}
+        results.append(phases)
+    return results
+
+def summarize(results):
+    """{phase: {'median', 'min', 'modules'}} across runs"""
+    summary = {}
+    for phase in results[0]:
+        seconds = [run[phase]['seconds'] for run in results]
+        summary[phase] = {
+            'median': float(np.median(seconds)),
+            'min': min(seconds),
+            'modules': results[0][phase]['modules'],
+        }
+    return summary
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Report the CSW app cold start time per step.')
+    parser.add_argument('--runs', type=int, default=3, help='Fresh-process runs (default: 3)')
+    parser.add_argument('--steps', type=int, nargs='+', default=STEPS, choices=STEPS,
+                        help='Steps to render, in order (default: 0 1 4)')
+    parser.add_argument('--output', help='Also write the per-run timings and summary as JSON')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        run_child(args.steps)
+        return
+
+    results = measure_startup(args.runs, args.steps)
+    summary = summarize(results)
+    print(f"{'phase':<18} {'median':>9} {'min':>9}  loaded")
+    for phase, stats in summary.items():
+        print(f"{phase:<18} {stats['median']:>8.3f}s {stats['min']:>8.3f}s  {', '.join(stats['modules']) or '-'}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'summary': summary, 'runs': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
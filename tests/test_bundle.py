@@ -0,0 +1,25 @@
+"""DataBundle tables over the mapped file"""
+
+import numpy as np
+import pandas as pd
+
+from csw_engine.bundle import DataBundle
+
+def saved_bundle(tmp_path):
+    frame = pd.DataFrame({'hdd': [1.5, 2.5, 3.5], 'city': ['A', None, 'C']})
+    path = DataBundle.from_frames({'weather': frame}).save(str(tmp_path / 'bundle.bin'))
+    return DataBundle.load(path)
+
+def test_numeric_columns_share_the_map(tmp_path):
+    bundle = saved_bundle(tmp_path)
+    table = bundle.table('weather')
+    assert np.shares_memory(table['hdd'].to_numpy(), bundle._tables['weather']['hdd'])
+    assert table['city'].isna().tolist() == [False, True, False]
+
+def test_modifying_a_table_leaves_the_bundle_alone(tmp_path):
+    bundle = saved_bundle(tmp_path)
+    table = bundle.table('weather')
+    table.loc[0, 'hdd'] = -1.0
+    table['hdd'] *= 2
+    assert table['hdd'].tolist() == [-2.0, 5.0, 7.0]
+    assert bundle.table('weather')['hdd'].tolist() == [1.5, 2.5, 3.5]
@@ -0,0 +1,40 @@
+"""SQLiteCache versions and stored values"""
+
+from csw_engine.shared_cache import SQLiteCache, cache_version, code_fingerprint, data_version
+
+def test_computed_namespaces_include_the_engine_code(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    assert SQLiteCache(path, 'dataset').version == data_version()
+    for namespace in ('intensity', 'sweep', 'compare', 'uncertainty', 'degree_days'):
+        version = SQLiteCache(path, namespace).version
+        assert version == cache_version(namespace) != data_version()
+
+def test_a_code_change_misses_computed_entries_only(tmp_path, monkeypatch):
+    path = str(tmp_path / 'cache.sqlite')
+    SQLiteCache(path, 'dataset').put('weather', 'table')
+    SQLiteCache(path, 'intensity').put('key', 'result')
+    monkeypatch.setattr('csw_engine.shared_cache.code_fingerprint', lambda: 'edited')
+    assert SQLiteCache(path, 'dataset').get('weather') == 'table'
+    assert SQLiteCache(path, 'intensity').get('key') is None
+
+def test_purge_keeps_each_namespace_current_version(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    current = SQLiteCache(path, 'intensity')
+    current.put('key', 'result')
+    SQLiteCache(path, 'dataset').put('weather', 'table')
+    SQLiteCache(path, 'intensity', version='old').put('key', 'stale')
+    SQLiteCache(path, 'intensity', version=data_version()).put('key', 'stale')
+    assert current.purge_versions() == 2
+    assert current.get('key') == 'result'
+    assert SQLiteCache(path, 'dataset').get('weather') == 'table'
+    assert len(code_fingerprint()) == 16
+
+def test_a_value_that_fails_to_unpickle_is_a_deleted_miss(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite'), 'intensity')
+    cache.put('key', 'result')
+    cache._connection().execute("UPDATE entries SET value = X'80059501'")
+    assert cache.get('key') is None
+    assert len(cache) == 0
+    assert cache.stats().misses == 1
+    assert cache.get_or_compute('key', lambda: 'again') == 'again'
+    assert cache.get('key') == 'again'
@@ -0,0 +1,48 @@
+"""Nearest-station lookup for missing and out-of-range coordinates"""
+
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from csw_engine import calculate_savings_batch, get_station_locator, get_weather_store
+from load_test import random_building
+from run_batch import attach_degree_days, process_chunk
+
+# Chicago, then coordinates no station should answer for
+LATITUDES = [41.88, np.nan, 95.0, 41.88, -91.0]
+LONGITUDES = [-87.63, -87.63, -87.63, np.nan, 200.0]
+
+
+@pytest.mark.parametrize('k', [1, 3, 12])
+def test_invalid_coordinates_have_no_station(k):
+    distance, position = get_station_locator().nearest(LATITUDES, LONGITUDES, k=k)
+    assert (position[0] >= 0).all() and np.isfinite(distance[0]).all()
+    assert (position[1:] == -1).all()
+    assert np.isnan(distance[1:]).all()
+
+    hdd, cdd = get_station_locator().degree_days(LATITUDES, LONGITUDES, k=k)
+    assert np.isfinite(hdd[0]) and np.isfinite(cdd[0])
+    assert np.isnan(hdd[1:]).all() and np.isnan(cdd[1:]).all()
+
+
+def _buildings():
+    rng = random.Random(0)
+    store = get_weather_store()
+    frame = pd.DataFrame([random_building(rng, store) for _ in LATITUDES]).drop(columns=['city', 'state'])
+    return frame.assign(latitude=LATITUDES, longitude=LONGITUDES)
+
+
+@pytest.mark.parametrize('k', [1, 3])
+def test_batch_rows_without_station_are_nan(k):
+    frame = attach_degree_days(_buildings(), nearest_k=k)
+    results = calculate_savings_batch(frame, errors='coerce')
+    assert results['total_cost_savings'].iloc[1:].isna().all()
+    assert results['hdd'].iloc[1:].isna().all()
+
+
+def test_cube_rows_without_station_are_nan():
+    results = process_chunk(_buildings(), use_cube=True)
+    assert results['total_cost_savings'].iloc[1:].isna().all()
+    assert results['hdd'].iloc[1:].isna().all()
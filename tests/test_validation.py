@@ -0,0 +1,42 @@
+"""validate_inputs location fields"""
+
+import pytest
+
+from csw_engine import InputValidationError, get_weather_store, validate_inputs
+
+BUILDING = {
+    'building_area': 75000,
+    'num_floors': 5,
+    'hvac_system': 'Other',
+    'heating_fuel': 'Electric',
+    'cooling_installed': 'Yes',
+    'existing_window': 'Single pane',
+    'csw_type': 'Winsert Lite',
+    'csw_area': 12000,
+    'electric_rate': 0.12,
+    'gas_rate': 0.8,
+    'operating_hours': 2912,
+}
+
+
+@pytest.mark.parametrize('location, message', [
+    ({'city': 'Anniston', 'state': ['x']}, 'state: must be a string'),
+    ({'city': {'a': 1}, 'state': 'AL'}, 'city: must be a string'),
+    ({'city': 123}, 'city: must be a string'),
+    ({'hdd': 2585, 'cdd': 1713, 'state': {'a': 1}}, 'state: must be a string'),
+])
+def test_non_string_city_or_state_is_rejected(location, message):
+    with pytest.raises(InputValidationError) as excinfo:
+        validate_inputs({**BUILDING, **location}, 'Office')
+    assert message in excinfo.value.errors
+
+
+def test_string_city_and_state_resolve():
+    inputs = validate_inputs({**BUILDING, 'city': 'Anniston', 'state': 'AL'}, 'Office')
+    assert (inputs['city'], inputs['hdd'], inputs['cdd']) == ('Anniston', 2585.0, 1713.0)
+
+
+def test_resolve_ignores_non_string_labels():
+    store = get_weather_store()
+    assert store.resolve('Anniston', ['x']) is None
+    assert store.resolve({'a': 1}) is None
@@ -0,0 +1,45 @@
+"""site_degree_days on an EPW file"""
+
+import builtins
+
+import numpy as np
+import pytest
+
+from csw_engine import ResultCache, WeatherFileError, degree_days, read_weather_file, site_degree_days
+
+def write_epw(path):
+    hours = np.arange(8760)
+    temperature = 10 - 12 * np.cos(2 * np.pi * hours / 8760) + 4 * np.sin(2 * np.pi * hours / 24)
+    lines = ['LOCATION,Testville,MN,USA,TMY3,726580,44.88,-93.23,-6.0,254.0']
+    lines += ['HEADER'] * 7
+    lines += [f"1999,1,1,1,0,?,{t:.1f},0" for t in temperature]
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+def test_the_file_is_read_once(tmp_path, monkeypatch):
+    path = write_epw(tmp_path / 'site.epw')
+    opened = []
+    real_open = builtins.open
+    monkeypatch.setattr(builtins, 'open', lambda name, *args, **kwargs: (
+        opened.append(name), real_open(name, *args, **kwargs))[1])
+    site = site_degree_days(path, 60, 70, cache=ResultCache())
+    assert opened == [path]
+    weather, checksum = read_weather_file(path)
+    assert site.checksum == checksum and site.city == 'Testville'
+    assert (site.hdd, site.cdd) == degree_days(weather.temperature_c, 60, 70)
+
+def test_array_bases_are_cached_per_tuple(tmp_path):
+    path = write_epw(tmp_path / 'site.epw')
+    cache = ResultCache()
+    site = site_degree_days(path, np.array([55, 65]), [70, 75], cache=cache)
+    assert site.heating_base == (55.0, 65.0) and site.cooling_base == (70.0, 75.0)
+    assert np.allclose(site.hdd, [site_degree_days(path, base, 70, cache=cache).hdd for base in (55, 65)])
+    assert np.allclose(site.cdd, [site_degree_days(path, 65, base, cache=cache).cdd for base in (70, 75)])
+    assert site_degree_days(path, (55, 65), (70, 75), cache=cache).hdd is site.hdd
+
+def test_bad_bases_and_files_raise_clear_errors(tmp_path):
+    path = write_epw(tmp_path / 'site.epw')
+    with pytest.raises(ValueError, match='heating_base'):
+        site_degree_days(path, np.zeros((2, 2)), cache=ResultCache())
+    with pytest.raises(WeatherFileError, match='not readable'):
+        site_degree_days(str(tmp_path / 'missing.epw'), cache=ResultCache())